@@ -5,11 +5,13 @@ from typing import Optional, Dict, Any
 from app.schemas.schemas import UserRegister, UserLogin, TokenResponse, UserResponse
 from app.core.security import hash_password, verify_password, create_access_token, blacklist_token
 from app.core.config import JWT_ACCESS_TOKEN_EXPIRE_MINUTES, RATE_LIMIT_AUTH, RATE_LIMIT_GENERAL
-from app.core.dependencies import get_current_user
+from app.core.dependencies import get_current_user, check_admission
 from app.core.redis import redis_client
+from app.core.cache_warmer import cache_warmer
 from app.core.logging import auth_logger
 from app.core.rate_limit import limiter
 from app.database.connection import database
+from app.database.sharding import shards
 
 router = APIRouter(prefix="/api/v1/auth", tags=["authentication"])
 security: HTTPBearer = HTTPBearer()
@@ -22,7 +24,7 @@ async def validate_user_availability(username: str, email: str) -> Optional[dict
     )
     return existing_user
 
-@router.post("/register", response_model=UserResponse, status_code=status.HTTP_201_CREATED)
+@router.post("/register", response_model=UserResponse, status_code=status.HTTP_201_CREATED, dependencies=[Depends(check_admission)])
 @limiter.limit(RATE_LIMIT_AUTH)
 async def register_user(request: Request, user_data: UserRegister) -> UserResponse:
     auth_logger.info("user_registration_attempt", extra={"username": user_data.username})
@@ -51,6 +53,11 @@ async def register_user(request: Request, user_data: UserRegister) -> UserRespon
         "user",
         True
     )
+    try:
+        await shards.ensure_user(user)
+    except Exception as e:
+        # The first task insert on the shard copies the row again
+        auth_logger.warning("user_shard_copy_failed", extra={"user_id": user["id"], "error": str(e)})
     
     auth_logger.info("user_registered_successfully", extra={"user_id": user["id"], "username": user["username"]})
     
@@ -104,6 +111,9 @@ async def login_user(request: Request, credentials: UserLogin) -> TokenResponse:
     
     auth_logger.info("login_successful", extra={"user_id": user["id"], "username": user["username"]})
     
+    # The dashboard's first requests read these, prefetch them while the client stores the token
+    cache_warmer.schedule(user["id"], user=dict(user))
+    
     return TokenResponse(
         access_token=access_token,
         token_type="bearer",
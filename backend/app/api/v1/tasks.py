@@ -1,37 +1,43 @@
-﻿from fastapi import APIRouter, HTTPException, status, Depends, Query, Request
-from typing import List, Optional, Dict, Any
+﻿from fastapi import APIRouter, HTTPException, status, Depends, Query, Request, Response, Header
+from fastapi.responses import StreamingResponse
+from typing import List, Optional, Dict, Any, AsyncIterator
+import asyncio
 import json
-from app.schemas.schemas import TaskCreate, TaskUpdate, TaskResponse
-from app.database.connection import database
-from app.core.dependencies import get_current_user, get_admin_user
+from app.schemas.schemas import TaskCreate, TaskUpdate, TaskResponse, TaskSummary, TaskStatus, TaskPriority, TaskBatchRequest, TaskBatchItem, TaskEventResponse
+from app.database.sharding import shards
+from app.core.dependencies import get_current_user, get_admin_user, check_admission
+from app.core.admission import admission_controller
 from app.core.redis import redis_client
-from app.core.config import CACHE_TASKS_TTL, RATE_LIMIT_TASKS
+from app.core.jobs import defer
+from app.core.cache import (
+    TASK_FIELDS, TASK_COLUMNS, task_page_query, task_page_key, serialize_task, cache_task_page, cache_task_id_page,
+    read_task_id_page, load_tasks, invalidate_task_cache, stale_page_key
+)
+from app.core.insert_batcher import task_insert_batcher
+from app.core.task_events import task_event_buffer
+from app.core.job_handlers import compute_admin_stats, ADMIN_STATS_KEY, ADMIN_STATS_LAST_KEY
+from app.core.config import CACHE_SUMMARY_TTL, CACHE_TASKS_STALE_TTL, TASK_BATCH_MAX_IDS, RATE_LIMIT_TASKS, TASK_STREAM_KEEPALIVE, TASK_STREAM_BUFFER_SIZE, ADMISSION_RETRY_AFTER, JOBS_ENABLED
 from app.core.logging import task_logger, cache_logger
 from app.core.rate_limit import limiter
+from app.core.change_stream import SentIds, task_change_broker
 
 router = APIRouter(prefix="/api/v1/tasks", tags=["tasks"])
 
 async def verify_task_ownership(task_id: int, user_id: int) -> Optional[Dict[str, Any]]:
-    task: Optional[Dict[str, Any]] = await database.fetchrow(
+    task: Optional[Dict[str, Any]] = await shards.for_user(user_id).fetchrow(
         "SELECT id FROM tasks WHERE id = $1 AND user_id = $2",
         task_id,
         user_id
     )
     return task
 
-async def invalidate_user_tasks_cache(user_id: int) -> None:
-    keys = await redis_client.client.keys(f"tasks:{user_id}:page:*")
-    if keys:
-        for key in keys:
-            await redis_client.delete(key)
+def format_sse(event: Dict[str, Any]) -> str:
+    return f"id: {event['id']}\nevent: task_{event['op']}\ndata: {json.dumps(event)}\n\n"
 
-@router.post("", response_model=TaskResponse, status_code=status.HTTP_201_CREATED)
+@router.post("", response_model=TaskResponse, status_code=status.HTTP_201_CREATED, dependencies=[Depends(check_admission)])
 @limiter.limit(RATE_LIMIT_TASKS)
 async def create_task(request: Request, task_data: TaskCreate, current_user: Dict[str, Any] = Depends(get_current_user)) -> TaskResponse:
-    task: Dict[str, Any] = await database.fetchrow(
-        """INSERT INTO tasks (user_id, title, description, status, priority)
-           VALUES ($1, $2, $3, $4, $5)
-           RETURNING id, user_id, title, description, status, priority, created_at, updated_at""",
+    task: Dict[str, Any] = await task_insert_batcher.insert(
         current_user["id"],
         task_data.title,
         task_data.description,
@@ -39,58 +45,264 @@ async def create_task(request: Request, task_data: TaskCreate, current_user: Dic
         task_data.priority.value
     )
     
-    await invalidate_user_tasks_cache(current_user["id"])
+    await task_event_buffer.record(task["id"], current_user["id"], "created", task_data.model_dump(mode="json"))
     
-    task_logger.info("task_created", extra={"task_id": task["id"], "user_id": current_user["id"]})
     return TaskResponse(**task)
 
+def parse_task_fields(fields: Optional[str]) -> Optional[List[str]]:
+    """Validate a ?fields= list, returned in column order so equal sets share a cache key"""
+    if fields is None:
+        return None
+    requested = {field.strip() for field in fields.split(",") if field.strip()}
+    unknown = requested - set(TASK_FIELDS)
+    if not requested or unknown:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=f"fields must be a comma-separated subset of: {', '.join(TASK_FIELDS)}"
+        )
+    return [field for field in TASK_FIELDS if field in requested]
+
+def json_response(content: str, headers: Optional[Dict[str, str]] = None) -> Response:
+    return Response(content=content, media_type="application/json", headers=headers)
+
+def task_list_response(tasks: List[Dict[str, Any]], selected_fields: Optional[List[str]]) -> Any:
+    """Full pages go through the response model, sparse pages are encoded as they are"""
+    if selected_fields is None:
+        return [TaskResponse(**task) for task in tasks]
+    return json_response(json.dumps([{field: task[field] for field in selected_fields} for task in tasks]))
+
 @router.get("", response_model=List[TaskResponse])
 @limiter.limit(RATE_LIMIT_TASKS)
 async def list_tasks(
     request: Request,
+    response: Response,
     current_user: Dict[str, Any] = Depends(get_current_user),
     skip: int = Query(0, ge=0, description="Number of tasks to skip"),
-    limit: int = Query(50, ge=1, le=100, description="Max tasks to return (max 100)")
+    limit: int = Query(50, ge=1, le=100, description="Max tasks to return (max 100)"),
+    include_archived: bool = Query(False, description="Also return archived completed tasks"),
+    fields: Optional[str] = Query(None, description=f"Comma-separated subset of task fields to return: {', '.join(TASK_FIELDS)}")
 ) -> List[TaskResponse]:
-    cache_key: str = f"tasks:{current_user['id']}:page:{skip}:{limit}"
+    selected_fields: Optional[List[str]] = parse_task_fields(fields)
+    cache_key: str = task_page_key(current_user["id"], skip, limit)
+    if include_archived:
+        cache_key += ":archived"
+    # Full-body copies (archived pages, stale fallbacks) are kept per field set
+    view_key: str = cache_key if selected_fields is None else f"{cache_key}:fields:{','.join(selected_fields)}"
+    
+    if include_archived:
+        # Archived rows stay out of the per-task cache, so these pages hold whole bodies
+        tasks_data: Optional[List[Dict[str, Any]]] = await redis_client.get_value(view_key)
+        if tasks_data is not None and selected_fields is not None:
+            cache_logger.info("cache_hit", extra={"key": view_key, "user_id": current_user["id"]})
+            return json_response(json.dumps(tasks_data))
+    else:
+        # Pages hold task ids, bodies come from the write-through task:{id} keys
+        tasks_data = await read_task_id_page(cache_key, current_user["id"])
+    if tasks_data is not None:
+        cache_logger.info("cache_hit", extra={"key": view_key, "user_id": current_user["id"], "count": len(tasks_data)})
+        return task_list_response(tasks_data, selected_fields)
     
-    cached_tasks = await redis_client.get(cache_key)
-    if cached_tasks:
-        tasks_data: List[Dict[str, Any]] = json.loads(cached_tasks)
-        cache_logger.info("cache_hit", extra={"key": cache_key, "user_id": current_user["id"], "count": len(tasks_data)})
+    if admission_controller.is_overloaded():
+        # Serve the last known page rather than queueing on the saturated pool
+        tasks_data = await redis_client.get_value(stale_page_key(view_key))
+        if tasks_data is None:
+            raise admission_controller.reject(request.url.path)
+        if selected_fields is not None:
+            cache_logger.info("cache_stale_hit", extra={"key": view_key, "user_id": current_user["id"]})
+            return json_response(json.dumps(tasks_data), headers={"X-Cache": "stale"})
+        response.headers["X-Cache"] = "stale"
+        cache_logger.info("cache_stale_hit", extra={"key": view_key, "user_id": current_user["id"], "count": len(tasks_data)})
         return [TaskResponse(**task) for task in tasks_data]
     
-    tasks: List[Dict[str, Any]] = await database.fetch(
-        """SELECT id, user_id, title, description, status, priority, created_at, updated_at
-           FROM tasks WHERE user_id = $1 ORDER BY created_at DESC LIMIT $2 OFFSET $3""",
-        current_user["id"],
-        limit,
-        skip
+    # Field names come from TASK_FIELDS, never from the raw query string. The id is
+    # always selected so a sparse read can still record page membership
+    columns: str = TASK_COLUMNS
+    if selected_fields is not None:
+        columns = ", ".join(field for field in TASK_FIELDS if field in selected_fields or field == "id")
+    tasks: List[Dict[str, Any]] = await shards.for_user(current_user["id"]).fetch(
+        task_page_query(columns, include_archived), current_user["id"], limit, skip
     )
+    tasks_data = [serialize_task(task) for task in tasks]
     
-    if tasks:
-        tasks_serializable = [{**dict(task), 'created_at': task['created_at'].isoformat(), 'updated_at': task['updated_at'].isoformat()} for task in tasks]
-        await redis_client.set(cache_key, json.dumps(tasks_serializable), expire=CACHE_TASKS_TTL)
-        cache_logger.info("cache_set", extra={"key": cache_key, "user_id": current_user["id"], "ttl": CACHE_TASKS_TTL})
+    if tasks and include_archived:
+        await cache_task_page(view_key, current_user["id"], tasks_data if selected_fields is None else [
+            {field: task[field] for field in selected_fields} for task in tasks_data
+        ])
+    elif tasks:
+        await cache_task_id_page(cache_key, current_user["id"], tasks)
+        if selected_fields is not None:
+            await redis_client.set_value(
+                stale_page_key(view_key),
+                [{field: task[field] for field in selected_fields} for task in tasks_data],
+                expire=CACHE_TASKS_STALE_TTL
+            )
     
     task_logger.info("tasks_listed", extra={"user_id": current_user["id"], "count": len(tasks), "skip": skip, "limit": limit})
-    return [TaskResponse(**task) for task in tasks]
+    return task_list_response(tasks_data, selected_fields)
 
-@router.get("/{task_id}", response_model=TaskResponse)
-async def get_task(task_id: int, current_user: Dict[str, Any] = Depends(get_current_user)) -> TaskResponse:
-    task: Optional[Dict[str, Any]] = await database.fetchrow(
-        """SELECT id, user_id, title, description, status, priority, created_at, updated_at
-           FROM tasks WHERE id = $1 AND user_id = $2""",
-        task_id,
+@router.get("/stream")
+async def stream_task_changes(
+    current_user: Dict[str, Any] = Depends(get_current_user),
+    last_event_id: Optional[int] = Header(None, alias="Last-Event-ID")
+) -> StreamingResponse:
+    """Server-Sent Events stream of create/update/delete events for the current user's tasks"""
+    subscription = task_change_broker.subscribe(current_user["id"])
+    if subscription is None:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Too many open streams",
+            headers={"Retry-After": str(ADMISSION_RETRY_AFTER)}
+        )
+
+    async def event_stream() -> AsyncIterator[str]:
+        # Replays are at most one buffer long, so every replayed id is still remembered
+        sent = SentIds(TASK_STREAM_BUFFER_SIZE)
+        try:
+            if last_event_id is not None:
+                missed = task_change_broker.replay(current_user["id"], last_event_id)
+                if missed is None:
+                    # Buffer no longer reaches back that far, the client must refetch its list
+                    yield "event: reset\ndata: {}\n\n"
+                    return
+                for event in missed:
+                    sent.add(event["id"])
+                    yield format_sse(event)
+
+            while not subscription.needs_reset.is_set():
+                try:
+                    event = await asyncio.wait_for(subscription.queue.get(), TASK_STREAM_KEEPALIVE)
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+                    continue
+                # Events replayed from the buffer may also have been queued
+                if not sent.add(event["id"]):
+                    continue
+                yield format_sse(event)
+
+            yield "event: reset\ndata: {}\n\n"
+        finally:
+            task_change_broker.unsubscribe(subscription)
+
+    task_logger.info("task_stream_opened", extra={"user_id": current_user["id"], "last_event_id": last_event_id})
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@router.get("/summary", response_model=TaskSummary, dependencies=[Depends(check_admission)])
+async def get_task_summary(current_user: Dict[str, Any] = Depends(get_current_user)) -> TaskSummary:
+    """Task counts per status and priority, read from the user's counter row"""
+    cache_key: str = f"tasks:{current_user['id']}:summary"
+
+    cached_summary = await redis_client.get_value(cache_key)
+    if cached_summary:
+        cache_logger.info("cache_hit", extra={"key": cache_key, "user_id": current_user["id"]})
+        return TaskSummary(**cached_summary)
+
+    counts: Optional[Dict[str, Any]] = await shards.for_user(current_user["id"]).fetchrow(
+        """SELECT pending, in_progress, completed, low, medium, high, last_updated_at
+           FROM task_counts WHERE user_id = $1""",
         current_user["id"]
     )
+
+    by_status = {s.value: counts[s.value] if counts else 0 for s in TaskStatus}
+    by_priority = {p.value: counts[p.value] if counts else 0 for p in TaskPriority}
+    summary = TaskSummary(
+        total=sum(by_status.values()),
+        by_status=by_status,
+        by_priority=by_priority,
+        last_updated_at=counts["last_updated_at"] if counts else None
+    )
+
+    await redis_client.set_value(cache_key, summary.model_dump(mode="json"), expire=CACHE_SUMMARY_TTL)
+    cache_logger.info("cache_set", extra={"key": cache_key, "user_id": current_user["id"], "ttl": CACHE_SUMMARY_TTL})
+    return summary
+
+async def fetch_tasks_by_ids(task_ids: List[int], user_id: int) -> List[TaskBatchItem]:
+    """Resolve ids from the per-task cache, then one query for the misses, keeping request order"""
+    found: Dict[int, Dict[str, Any]] = await load_tasks(task_ids, user_id)
+    return [
+        TaskBatchItem(id=task_id, found=task_id in found, task=TaskResponse(**found[task_id]) if task_id in found else None)
+        for task_id in task_ids
+    ]
+
+@router.get("/batch", response_model=List[TaskBatchItem], dependencies=[Depends(check_admission)])
+async def get_tasks_batch(
+    current_user: Dict[str, Any] = Depends(get_current_user),
+    ids: str = Query(..., description=f"Comma-separated task IDs (max {TASK_BATCH_MAX_IDS})")
+) -> List[TaskBatchItem]:
+    """Fetch several tasks in one request, in the order given"""
+    try:
+        task_ids: List[int] = [int(task_id) for task_id in ids.split(",") if task_id.strip()]
+    except ValueError:
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail="ids must be comma-separated integers")
+    if not task_ids or len(task_ids) > TASK_BATCH_MAX_IDS:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=f"Between 1 and {TASK_BATCH_MAX_IDS} ids are required"
+        )
+    return await fetch_tasks_by_ids(task_ids, current_user["id"])
+
+@router.post("/batch", response_model=List[TaskBatchItem], dependencies=[Depends(check_admission)])
+async def post_tasks_batch(batch: TaskBatchRequest, current_user: Dict[str, Any] = Depends(get_current_user)) -> List[TaskBatchItem]:
+    """Same as GET /batch, for id lists too long for a query string"""
+    return await fetch_tasks_by_ids(batch.ids, current_user["id"])
+
+@router.get("/{task_id}", response_model=TaskResponse, dependencies=[Depends(check_admission)])
+async def get_task(
+    task_id: int,
+    current_user: Dict[str, Any] = Depends(get_current_user),
+    include_archived: bool = Query(False, description="Also look up archived completed tasks")
+) -> TaskResponse:
+    task: Optional[Dict[str, Any]] = (await load_tasks([task_id], current_user["id"])).get(task_id)
+    
+    if not task and include_archived:
+        task = await shards.for_user(current_user["id"]).fetchrow(
+            """SELECT id, user_id, title, description, status, priority, created_at, updated_at
+               FROM tasks_archive WHERE id = $1 AND user_id = $2""",
+            task_id,
+            current_user["id"]
+        )
     
     if not task:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Task not found")
     
     return TaskResponse(**task)
 
-@router.put("/{task_id}", response_model=TaskResponse)
+@router.get("/{task_id}/history", response_model=List[TaskEventResponse], dependencies=[Depends(check_admission)])
+async def get_task_history(
+    task_id: int,
+    current_user: Dict[str, Any] = Depends(get_current_user),
+    limit: int = Query(100, ge=1, le=1000, description="Maximum number of events to return")
+) -> List[TaskEventResponse]:
+    """Changes to a task, oldest first. Kept after the task is deleted or archived"""
+    shard = shards.for_user(current_user["id"])
+    events: List[Dict[str, Any]] = await shard.fetch(
+        """SELECT id, task_id, event, changes, created_at FROM task_events
+           WHERE task_id = $1 AND user_id = $2
+           ORDER BY created_at, id
+           LIMIT $3""",
+        task_id,
+        current_user["id"],
+        limit
+    )
+
+    # Events may still be buffered, predate migration 008 or be turned off
+    if not events and not await shard.fetchval(
+        """SELECT EXISTS (SELECT 1 FROM tasks WHERE id = $1 AND user_id = $2)
+               OR EXISTS (SELECT 1 FROM tasks_archive WHERE id = $1 AND user_id = $2)""",
+        task_id,
+        current_user["id"]
+    ):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Task not found")
+
+    return [
+        TaskEventResponse(**{**event, "changes": json.loads(event["changes"]) if event["changes"] else None})
+        for event in events
+    ]
+
+@router.put("/{task_id}", response_model=TaskResponse, dependencies=[Depends(check_admission)])
 async def update_task(task_id: int, task_data: TaskUpdate, current_user: Dict[str, Any] = Depends(get_current_user)) -> TaskResponse:
     existing_task: Optional[Dict[str, Any]] = await verify_task_ownership(task_id, current_user["id"])
     
@@ -122,11 +334,13 @@ async def update_task(task_id: int, task_data: TaskUpdate, current_user: Dict[st
         param_count += 1
     
     if not update_fields:
-        existing_data: Dict[str, Any] = await database.fetchrow(
+        existing_data: Optional[Dict[str, Any]] = await shards.for_user(current_user["id"]).fetchrow(
             "SELECT id, user_id, title, description, status, priority, created_at, updated_at FROM tasks WHERE id = $1 AND user_id = $2",
             task_id,
             current_user["id"]
         )
+        if existing_data is None:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Task not found")
         return TaskResponse(**existing_data)
     
     update_fields.append("updated_at = CURRENT_TIMESTAMP")
@@ -136,49 +350,52 @@ async def update_task(task_id: int, task_data: TaskUpdate, current_user: Dict[st
                 WHERE id = ${param_count} AND user_id = ${param_count + 1}
                 RETURNING id, user_id, title, description, status, priority, created_at, updated_at"""
     
-    task: Dict[str, Any] = await database.fetchrow(query, *update_values)
-    await invalidate_user_tasks_cache(current_user["id"])
+    task: Optional[Dict[str, Any]] = await shards.for_write(current_user["id"]).fetchrow(query, *update_values)
+    if task is None:
+        # Deleted or archived since the ownership check
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Task not found")
+    # Updates never change page membership, so id pages stay valid once the body is dropped.
+    # Not written through: a concurrent delete's invalidation could run first and the body would come back
+    await invalidate_task_cache([task_id])
+    await defer("invalidate_user_task_contents_cache", user_id=current_user["id"])
+    await task_event_buffer.record(task_id, current_user["id"], "updated", task_data.model_dump(mode="json", exclude_none=True))
     
     return TaskResponse(**task)
 
-@router.delete("/{task_id}", status_code=status.HTTP_204_NO_CONTENT)
+@router.delete("/{task_id}", status_code=status.HTTP_204_NO_CONTENT, dependencies=[Depends(check_admission)])
 async def delete_task(task_id: int, current_user: Dict[str, Any] = Depends(get_current_user)) -> None:
     existing_task: Optional[Dict[str, Any]] = await verify_task_ownership(task_id, current_user["id"])
     
     if not existing_task:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Task not found")
     
-    await database.execute("DELETE FROM tasks WHERE id = $1 AND user_id = $2", task_id, current_user["id"])
-    await invalidate_user_tasks_cache(current_user["id"])
+    await shards.for_write(current_user["id"]).execute("DELETE FROM tasks WHERE id = $1 AND user_id = $2", task_id, current_user["id"])
+    await invalidate_task_cache([task_id])
+    await defer("invalidate_user_tasks_cache", user_id=current_user["id"])
+    await task_event_buffer.record(task_id, current_user["id"], "deleted")
 
-@router.get("/admin/stats", tags=["admin"])
+@router.get("/admin/stats", tags=["admin"], dependencies=[Depends(check_admission)])
 async def get_admin_stats(admin_user: Dict[str, Any] = Depends(get_admin_user)) -> Dict[str, Any]:
     """Get statistics on all tasks and users. Admin only."""
-    cache_key = "admin:stats"
+    cache_key = ADMIN_STATS_KEY
     
     # Try to get from cache first
     cached_stats = await redis_client.get(cache_key)
     if cached_stats:
         cache_logger.info("cache_hit", extra={"key": cache_key})
         stats_dict = json.loads(cached_stats)
-        stats_dict["cached"] = True
+        stats_dict.update({"admin_id": admin_user["id"], "cached": True})
         return stats_dict
     
-    # If not cached, fetch from database
-    total_tasks = await database.fetchval("SELECT COUNT(*) FROM tasks")
-    total_users = await database.fetchval("SELECT COUNT(*) FROM users")
-    completed_tasks = await database.fetchval("SELECT COUNT(*) FROM tasks WHERE status = 'completed'")
-    
-    stats = {
-        "total_users": total_users,
-        "total_tasks": total_tasks,
-        "completed_tasks": completed_tasks,
-        "admin_id": admin_user["id"],
-        "cached": False
-    }
-    
-    # Cache for 5 minutes (300 seconds)
-    await redis_client.set(cache_key, json.dumps(stats), expire=300)
-    cache_logger.info("cache_set", extra={"key": cache_key, "ttl": 300})
+    # With the job queue on, serve the last known stats and let a worker recount
+    if JOBS_ENABLED:
+        last_stats = await redis_client.get(ADMIN_STATS_LAST_KEY)
+        if last_stats:
+            await defer("refresh_admin_stats")
+            stats_dict = json.loads(last_stats)
+            stats_dict.update({"admin_id": admin_user["id"], "cached": True})
+            return stats_dict
     
+    stats = await compute_admin_stats()
+    stats.update({"admin_id": admin_user["id"], "cached": False})
     return stats
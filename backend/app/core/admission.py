@@ -0,0 +1,48 @@
+from typing import List
+from fastapi import HTTPException, status
+from app.core.config import (
+    ADMISSION_CONTROL_ENABLED, ADMISSION_MAX_POOL_WAITERS, ADMISSION_MAX_ACQUIRE_WAIT_MS, ADMISSION_RETRY_AFTER
+)
+from app.core.logging import request_logger
+from app.database.connection import Database, database
+from app.database.sharding import shards
+
+def pools() -> List[Database]:
+    """The primary pool and every shard pool, task traffic mostly waits on the shards"""
+    return [database, *(shard for shard in shards.all() if shard is not database)]
+
+class AdmissionController:
+    def __init__(self, max_waiters: int, max_acquire_wait_ms: float, retry_after: int, enabled: bool = True) -> None:
+        self.max_waiters = max_waiters
+        self.max_acquire_wait_ms = max_acquire_wait_ms
+        self.retry_after = retry_after
+        self.enabled = enabled
+        self.shed_count = 0
+
+    def is_overloaded(self) -> bool:
+        """True when any DB pool has too many waiters or recent acquires were slow"""
+        if not self.enabled:
+            return False
+        return any(self._pool_overloaded(pool) for pool in pools())
+
+    def _pool_overloaded(self, pool: Database) -> bool:
+        if pool.waiting >= self.max_waiters:
+            return True
+        return pool.recent_acquire_wait() * 1000 >= self.max_acquire_wait_ms
+
+    def reject(self, path: str) -> HTTPException:
+        self.shed_count += 1
+        request_logger.warning("request_shed", extra={
+            "path": path,
+            "pool_waiters": max(pool.waiting for pool in pools()),
+            "acquire_wait_ms": round(max(pool.recent_acquire_wait() for pool in pools()) * 1000, 2)
+        })
+        return HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Service overloaded, retry later",
+            headers={"Retry-After": str(self.retry_after)}
+        )
+
+admission_controller = AdmissionController(
+    ADMISSION_MAX_POOL_WAITERS, ADMISSION_MAX_ACQUIRE_WAIT_MS, ADMISSION_RETRY_AFTER, ADMISSION_CONTROL_ENABLED
+)
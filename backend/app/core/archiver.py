@@ -0,0 +1,103 @@
+import asyncio
+import time
+from typing import Optional
+from app.core.cache import invalidate_user_tasks_cache, invalidate_task_cache
+from app.core.config import ARCHIVE_AFTER_DAYS, ARCHIVE_BATCH_SIZE, ARCHIVE_INTERVAL, ARCHIVE_BATCH_PAUSE
+from app.core.logging import db_logger
+from app.core.metrics import metrics
+from app.database.connection import Database
+from app.database.sharding import shards
+
+# pg advisory lock key, only one worker across the deployment moves a batch on a shard at a time
+ARCHIVE_LOCK_ID = 7_340_034
+
+MOVE_BATCH = """
+WITH candidates AS (
+    SELECT id, user_id FROM tasks
+    WHERE status = 'completed' AND updated_at < LOCALTIMESTAMP - make_interval(days => $1)
+        AND user_id <> ALL($3::int[])
+    ORDER BY updated_at
+    LIMIT $2
+    FOR UPDATE SKIP LOCKED
+), moved AS (
+    DELETE FROM tasks t USING candidates c
+    WHERE t.id = c.id AND t.user_id = c.user_id
+    RETURNING t.id, t.user_id, t.title, t.description, t.status, t.priority, t.created_at, t.updated_at
+)
+INSERT INTO tasks_archive (id, user_id, title, description, status, priority, created_at, updated_at)
+SELECT id, user_id, title, description, status, priority, created_at, updated_at FROM moved
+RETURNING id, user_id
+"""
+
+tasks_archived = metrics.counter("tasks_archived_total", "Tasks moved to tasks_archive")
+archive_batches = metrics.counter("archive_batches_total", "Archive batches committed")
+archive_lock_seconds = metrics.counter("archive_lock_seconds_total", "Time archive batches held row locks")
+archive_last_batch_seconds = metrics.gauge("archive_last_batch_seconds", "Row lock time of the last archive batch")
+
+class TaskArchiver:
+    """Moves tasks completed more than N days ago into tasks_archive in bounded batches"""
+
+    def __init__(self, after_days: int, batch_size: int, interval: float, pause: float) -> None:
+        self.after_days = after_days
+        self.batch_size = batch_size
+        self.interval = interval
+        self.pause = pause
+        self._task: Optional[asyncio.Task] = None
+
+    async def run_batch(self, shard: Database) -> int:
+        start = time.perf_counter()
+        async with shard.acquire() as connection:
+            async with connection.transaction():
+                if not await connection.fetchval("SELECT pg_try_advisory_xact_lock($1)", ARCHIVE_LOCK_ID):
+                    return 0
+                # Tells the notify/counter triggers this is a move, not a task change
+                await connection.execute("SET LOCAL app.archiving = 'on'")
+                # Users being moved between shards are left alone, shard_tool.py copies their rows
+                # while they are flagged and a task archived mid-copy would be lost or duplicated
+                rows = await connection.fetch(MOVE_BATCH, self.after_days, self.batch_size, list(shards.moving))
+        lock_seconds = time.perf_counter() - start
+
+        if rows:
+            tasks_archived.inc(len(rows))
+            archive_batches.inc()
+            archive_lock_seconds.inc(lock_seconds)
+            archive_last_batch_seconds.set(lock_seconds)
+            await invalidate_task_cache([row["id"] for row in rows])
+            for user_id in {row["user_id"] for row in rows}:
+                await invalidate_user_tasks_cache(user_id)
+            db_logger.info("tasks_archived", extra={"count": len(rows), "lock_ms": round(lock_seconds * 1000, 2)})
+        return len(rows)
+
+    async def run_once(self) -> int:
+        """Move batches on each shard until a short one shows its backlog is drained"""
+        total = 0
+        for shard in shards.all():
+            while True:
+                moved = await self.run_batch(shard)
+                total += moved
+                if moved < self.batch_size:
+                    break
+                await asyncio.sleep(self.pause)
+        return total
+
+    async def _loop(self) -> None:
+        while True:
+            try:
+                await self.run_once()
+            except Exception as e:
+                db_logger.error("archive_failed", extra={"error": str(e), "error_type": type(e).__name__})
+            await asyncio.sleep(self.interval)
+
+    def start(self) -> None:
+        self._task = asyncio.get_running_loop().create_task(self._loop())
+
+    async def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+task_archiver = TaskArchiver(ARCHIVE_AFTER_DAYS, ARCHIVE_BATCH_SIZE, ARCHIVE_INTERVAL, ARCHIVE_BATCH_PAUSE)
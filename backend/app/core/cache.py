@@ -0,0 +1,109 @@
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+from app.core.config import CACHE_TASKS_TTL, CACHE_TASKS_STALE_TTL, CACHE_TASK_TTL
+from app.core.logging import cache_logger
+from app.core.redis import redis_client
+from app.database.sharding import shards
+
+TASK_FIELDS = ("id", "user_id", "title", "description", "status", "priority", "created_at", "updated_at")
+TASK_COLUMNS = ", ".join(TASK_FIELDS)
+
+TASKS_BY_IDS_QUERY = f"SELECT {TASK_COLUMNS} FROM tasks WHERE id = ANY($1::int[]) AND user_id = $2"
+
+def task_page_query(columns: str = TASK_COLUMNS, include_archived: bool = False) -> str:
+    """Newest-first page of a user's tasks, $1 user id, $2 limit, $3 offset"""
+    if not include_archived:
+        return f"""SELECT {columns}
+           FROM tasks WHERE user_id = $1 ORDER BY created_at DESC LIMIT $2 OFFSET $3"""
+    # Each branch can use its (user_id, created_at DESC) index and stop after skip + limit rows
+    return f"""SELECT {columns} FROM (
+                   (SELECT {TASK_COLUMNS}
+                    FROM tasks WHERE user_id = $1 ORDER BY created_at DESC LIMIT $2 + $3)
+                   UNION ALL
+                   (SELECT {TASK_COLUMNS}
+                    FROM tasks_archive WHERE user_id = $1 ORDER BY created_at DESC LIMIT $2 + $3)
+               ) AS combined ORDER BY created_at DESC LIMIT $2 OFFSET $3"""
+
+TASK_PAGE_QUERY = task_page_query()
+
+def task_page_key(user_id: int, skip: int, limit: int) -> str:
+    return f"tasks:{user_id}:page:{skip}:{limit}"
+
+def stale_page_key(cache_key: str) -> str:
+    # Outside tasks:{uid}:page:* so page invalidation leaves the fallback in place, it only expires
+    return cache_key.replace(":page:", ":stale:", 1)
+
+def task_key(task_id: int) -> str:
+    return f"task:{task_id}"
+
+def serialize_task(task: Dict[str, Any]) -> Dict[str, Any]:
+    # Sparse rows may lack either timestamp
+    return {key: value.isoformat() if isinstance(value, datetime) else value for key, value in dict(task).items()}
+
+async def cache_task_page(cache_key: str, user_id: int, tasks: List[Dict[str, Any]]) -> None:
+    """Store a task page and its longer-lived stale copy"""
+    rows = [dict(task) for task in tasks]
+    await redis_client.set_value(cache_key, rows, expire=CACHE_TASKS_TTL)
+    await redis_client.set_value(stale_page_key(cache_key), rows, expire=CACHE_TASKS_STALE_TTL)
+    cache_logger.info("cache_set", extra={"key": cache_key, "user_id": user_id, "ttl": CACHE_TASKS_TTL})
+
+async def cache_task_id_page(cache_key: str, user_id: int, tasks: List[Dict[str, Any]]) -> None:
+    """Store page membership as task ids, with the bodies and a stale copy when the rows are complete"""
+    await redis_client.set_value(cache_key, [task["id"] for task in tasks], expire=CACHE_TASKS_TTL)
+    if tasks and all(field in tasks[0] for field in TASK_FIELDS):
+        await cache_tasks(tasks)
+        await redis_client.set_value(stale_page_key(cache_key), [dict(task) for task in tasks], expire=CACHE_TASKS_STALE_TTL)
+    cache_logger.info("cache_set", extra={"key": cache_key, "user_id": user_id, "ttl": CACHE_TASKS_TTL})
+
+async def read_task_id_page(cache_key: str, user_id: int) -> Optional[List[Dict[str, Any]]]:
+    """Resolve a cached id page to task bodies, None when the page is missing or out of date"""
+    task_ids: Optional[List[int]] = await redis_client.get_value(cache_key)
+    if not task_ids:
+        return None
+    found = await load_tasks(task_ids, user_id)
+    if len(found) < len(task_ids):
+        # A listed task is gone, let the caller rebuild the page
+        return None
+    return [found[task_id] for task_id in task_ids]
+
+async def invalidate_user_tasks_cache(user_id: int) -> None:
+    """Drop every cached task page and the summary for a user"""
+    await redis_client.delete_matching(f"tasks:{user_id}:page:*")
+    await redis_client.delete(f"tasks:{user_id}:summary")
+
+async def invalidate_user_task_contents_cache(user_id: int) -> None:
+    """After an update: id pages keep their membership, drop what embeds task bodies or counts"""
+    await redis_client.delete_matching(f"tasks:{user_id}:page:*:archived*")
+    await redis_client.delete(f"tasks:{user_id}:summary")
+
+async def get_cached_tasks(task_ids: List[int]) -> List[Optional[Dict[str, Any]]]:
+    """Read per-task cache entries with one MGET, None for misses"""
+    return await redis_client.get_values([task_key(task_id) for task_id in task_ids])
+
+async def load_tasks(task_ids: List[int], user_id: int) -> Dict[int, Dict[str, Any]]:
+    """The user's tasks among task_ids, from the per-task cache and one query for the misses"""
+    unique_ids: List[int] = list(dict.fromkeys(task_ids))
+    found: Dict[int, Dict[str, Any]] = {}
+    for task_id, task in zip(unique_ids, await get_cached_tasks(unique_ids)):
+        # Another user's cached task is a miss, the query below then leaves it out
+        if task is not None and task["user_id"] == user_id:
+            found[task_id] = task
+    if found:
+        cache_logger.info("cache_hit", extra={"key": "task:*", "user_id": user_id, "count": len(found)})
+
+    missing: List[int] = [task_id for task_id in unique_ids if task_id not in found]
+    if missing:
+        tasks = await shards.for_user(user_id).fetch(TASKS_BY_IDS_QUERY, missing, user_id)
+        if tasks:
+            await cache_tasks(tasks)
+        found.update({task["id"]: serialize_task(task) for task in tasks})
+    return found
+
+async def cache_tasks(tasks: List[Dict[str, Any]]) -> None:
+    """Write tasks through to the per-task cache in one round trip"""
+    await redis_client.set_values({task_key(task["id"]): dict(task) for task in tasks}, expire=CACHE_TASK_TTL)
+
+async def invalidate_task_cache(task_ids: List[int]) -> None:
+    """Drop per-task cache entries after a delete or archive"""
+    if task_ids:
+        await redis_client.delete(*(task_key(task_id) for task_id in task_ids))
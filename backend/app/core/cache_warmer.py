@@ -0,0 +1,110 @@
+import asyncio
+import contextvars
+from typing import Any, Dict, List, Optional, Set
+from app.core.admission import admission_controller
+from app.core.cache import TASK_PAGE_QUERY, task_key, task_page_key, cache_task_id_page
+from app.core.config import (
+    CACHE_USER_TTL, CACHE_WARM_ENABLED, CACHE_WARM_PAGES, CACHE_WARM_PAGE_SIZE, CACHE_WARM_MAX_IN_FLIGHT
+)
+from app.core.logging import cache_logger
+from app.core.metrics import metrics
+from app.core.redis import redis_client
+from app.database.sharding import shards
+
+USER_CACHE_FIELDS = ("id", "username", "email", "role", "is_active")
+# Passes a warm makes while writes keep invalidating it before it gives up
+MAX_WARM_PASSES = 3
+
+cache_warms = metrics.counter("cache_warm_total", "Background cache warm attempts by result")
+
+class CacheWarmer:
+    """Prefetches a user's cache entries in the background, backing off under load"""
+
+    def __init__(self, pages: int, page_size: int, max_in_flight: int, enabled: bool = True) -> None:
+        self.pages = pages
+        self.page_size = page_size
+        self.max_in_flight = max_in_flight
+        self.enabled = enabled
+        self._warming: Set[int] = set()
+        # Users invalidated while their warm was running, what it read may predate the write
+        self._dirty: Set[int] = set()
+        self._tasks: Set[asyncio.Task] = set()
+
+    def schedule(self, user_id: int, user: Optional[Dict[str, Any]] = None) -> bool:
+        """Start warming a user's cache unless disabled, already running or the system is under pressure"""
+        if not self.enabled:
+            return False
+        if user_id in self._warming:
+            self._dirty.add(user_id)
+            cache_warms.inc(result="duplicate")
+            return False
+        # Nothing to warm into while the Redis breaker is open, it would only add DB load
+        if len(self._tasks) >= self.max_in_flight or admission_controller.is_overloaded() or not redis_client.available:
+            cache_warms.inc(result="skipped")
+            return False
+        self._warming.add(user_id)
+        # Fresh context: the warm must not inherit, or outlive, the triggering request's deadline
+        task = asyncio.get_running_loop().create_task(self._warm(user_id, user), context=contextvars.Context())
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return True
+
+    async def _warm(self, user_id: int, user: Optional[Dict[str, Any]]) -> None:
+        try:
+            if user is not None:
+                await redis_client.set_value(
+                    f"user:{user['username']}", {field: user[field] for field in USER_CACHE_FIELDS}, expire=CACHE_USER_TTL
+                )
+            for _ in range(MAX_WARM_PASSES):
+                self._dirty.discard(user_id)
+                written = await self._warm_pages(user_id)
+                if written is None:
+                    cache_warms.inc(result="aborted")
+                    return
+                if user_id not in self._dirty:
+                    cache_warms.inc(result="warmed")
+                    return
+                # A write was invalidated mid-pass and its schedule was folded into this warm:
+                # drop what this pass stored, it may have been read before that write
+                if written:
+                    await redis_client.delete(*written)
+                cache_warms.inc(result="rerun")
+            cache_warms.inc(result="superseded")
+        except Exception as e:
+            cache_warms.inc(result="failed")
+            cache_logger.warning("cache_warm_failed", extra={"user_id": user_id, "error": str(e)})
+        finally:
+            self._warming.discard(user_id)
+            self._dirty.discard(user_id)
+
+    async def _warm_pages(self, user_id: int) -> Optional[List[str]]:
+        """Cache the first pages not already cached, returns the keys written or None when aborted"""
+        written: List[str] = []
+        for page in range(self.pages):
+            cache_key = task_page_key(user_id, page * self.page_size, self.page_size)
+            if await redis_client.exists(cache_key):
+                continue
+            # Re-check between pages, a warm should never be what tips the pool over
+            if admission_controller.is_overloaded():
+                return None
+            tasks = await shards.for_user(user_id).fetch(TASK_PAGE_QUERY, user_id, self.page_size, page * self.page_size)
+            if tasks:
+                await cache_task_id_page(cache_key, user_id, tasks)
+                written += [cache_key, *(task_key(task["id"]) for task in tasks)]
+            if len(tasks) < self.page_size:
+                break
+        return written
+
+    async def stop(self) -> None:
+        """Cancel warms still in flight"""
+        for task in list(self._tasks):
+            task.cancel()
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+
+cache_warmer = CacheWarmer(
+    pages=CACHE_WARM_PAGES,
+    page_size=CACHE_WARM_PAGE_SIZE,
+    max_in_flight=CACHE_WARM_MAX_IN_FLIGHT,
+    enabled=CACHE_WARM_ENABLED
+)
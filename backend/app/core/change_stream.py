@@ -0,0 +1,165 @@
+import asyncio
+import functools
+import json
+import asyncpg
+from collections import defaultdict, deque
+from typing import Any, Deque, Dict, List, Optional, Set
+from app.core.config import DATABASE_SCHEMA, TASK_STREAM_QUEUE_SIZE, TASK_STREAM_BUFFER_SIZE, TASK_STREAM_MAX_SUBSCRIBERS
+from app.core.logging import db_logger
+from app.database.sharding import PRIMARY, shards
+
+TASK_CHANGES_CHANNEL = "task_changes"
+
+def task_changes_channel(schema: str) -> str:
+    """NOTIFY channels are database-wide, the trigger suffixes them with the table's schema (migration 010)"""
+    return f"{TASK_CHANGES_CHANNEL}:{schema}"
+
+class Subscription:
+    """One open stream: a bounded queue of events for a single user"""
+
+    def __init__(self, user_id: int, max_queue: int) -> None:
+        self.user_id = user_id
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max_queue)
+        # Set when events were lost (slow client or listener reconnect), the client must refetch
+        self.needs_reset = asyncio.Event()
+
+class SentIds:
+    """The last few event ids sent on a stream, for dropping events that were both replayed and queued.
+
+    Ids are taken when a row is written but NOTIFY arrives in commit order, so
+    a lower id can legitimately follow a higher one and a high-water mark
+    would drop it.
+    """
+
+    def __init__(self, size: int) -> None:
+        self.order: Deque[int] = deque()
+        self.ids: Set[int] = set()
+        self.size = size
+
+    def add(self, event_id: int) -> bool:
+        """Remember event_id, False if it was already sent"""
+        if event_id in self.ids:
+            return False
+        self.order.append(event_id)
+        self.ids.add(event_id)
+        if len(self.order) > self.size:
+            self.ids.discard(self.order.popleft())
+        return True
+
+class ChangeStreamBroker:
+    """Fans out task change notifications from one LISTEN connection per shard per worker"""
+
+    def __init__(self, queue_size: int, buffer_size: int, max_subscribers: int) -> None:
+        self.queue_size = queue_size
+        self.max_subscribers = max_subscribers
+        self.connections: Dict[str, asyncpg.Connection] = {}
+        self.subscribers: Dict[int, Set[Subscription]] = defaultdict(set)
+        self.subscriber_count = 0
+        # Recent events per shard in delivery (commit) order, used to resume from Last-Event-ID.
+        # Event ids come from each shard's own sequence and are not sorted in this order
+        self.recent: Dict[str, Deque[Dict[str, Any]]] = defaultdict(lambda: deque(maxlen=buffer_size))
+        self._reconnect_tasks: Dict[str, asyncio.Task] = {}
+        self._stopping = False
+
+    async def start(self) -> None:
+        self._stopping = False
+        await asyncio.gather(*(self._listen(name, shard.url) for name, shard in shards.shards.items()))
+        if self.reset_users not in shards.on_move:
+            shards.on_move.append(self.reset_users)
+
+    async def _listen(self, shard: str, url: str) -> None:
+        connection = await asyncpg.connect(
+            url.replace("+asyncpg", ""),
+            server_settings={"search_path": DATABASE_SCHEMA} if DATABASE_SCHEMA else None
+        )
+        # The schema the pools resolve tasks in, so workers on other schemas stay out
+        channel = task_changes_channel(await connection.fetchval("SELECT current_schema()"))
+        await connection.add_listener(channel, functools.partial(self._on_notify, shard))
+        connection.add_termination_listener(functools.partial(self._on_terminated, shard))
+        self.connections[shard] = connection
+        db_logger.info("change_stream_listening", extra={"channel": channel, "shard": shard})
+
+    async def stop(self) -> None:
+        self._stopping = True
+        for task in self._reconnect_tasks.values():
+            task.cancel()
+        self._reconnect_tasks.clear()
+        for connection in self.connections.values():
+            if not connection.is_closed():
+                await connection.close()
+        self.connections.clear()
+
+    def subscribe(self, user_id: int) -> Optional[Subscription]:
+        """Register a stream, None when the worker is at TASK_STREAM_MAX_SUBSCRIBERS"""
+        if self.subscriber_count >= self.max_subscribers:
+            return None
+        subscription = Subscription(user_id, self.queue_size)
+        self.subscribers[user_id].add(subscription)
+        self.subscriber_count += 1
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        user_subscriptions = self.subscribers.get(subscription.user_id)
+        if user_subscriptions and subscription in user_subscriptions:
+            user_subscriptions.discard(subscription)
+            self.subscriber_count -= 1
+            if not user_subscriptions:
+                del self.subscribers[subscription.user_id]
+
+    def replay(self, user_id: int, last_event_id: int) -> Optional[List[Dict[str, Any]]]:
+        """Events delivered after last_event_id, None if it is no longer buffered"""
+        recent = list(self.recent.get(shards.shard_name(user_id), ()))
+        position = next((index for index, event in enumerate(recent) if event["id"] == last_event_id), None)
+        if position is None:
+            return None
+        return [event for event in recent[position + 1:] if event["user_id"] == user_id]
+
+    def reset_users(self, user_ids: Set[int]) -> None:
+        """Make streams of users moved to another shard resync, their event ids restart from its sequence"""
+        for user_id in user_ids:
+            for subscription in self.subscribers.get(user_id, ()):
+                subscription.needs_reset.set()
+
+    def publish(self, event: Dict[str, Any], shard: str = PRIMARY) -> None:
+        self.recent[shard].append(event)
+        for subscription in self.subscribers.get(event["user_id"], ()):
+            try:
+                subscription.queue.put_nowait(event)
+            except asyncio.QueueFull:
+                # Never block the listener on a slow client, make it resync instead
+                subscription.needs_reset.set()
+
+    def _on_notify(self, shard: str, connection: asyncpg.Connection, pid: int, channel: str, payload: str) -> None:
+        try:
+            event = json.loads(payload)
+        except ValueError:
+            db_logger.warning("change_stream_bad_payload", extra={"payload": payload[:200], "shard": shard})
+            return
+        self.publish(event, shard)
+
+    def _on_terminated(self, shard: str, connection: asyncpg.Connection) -> None:
+        if self._stopping:
+            return
+        db_logger.warning("change_stream_disconnected", extra={"shard": shard})
+        self._reconnect_tasks[shard] = asyncio.get_running_loop().create_task(self._reconnect(shard))
+
+    async def _reconnect(self, shard: str) -> None:
+        delay = 0.5
+        while not self._stopping:
+            try:
+                await self._listen(shard, shards.shards[shard].url)
+                break
+            except (OSError, asyncpg.PostgresError) as e:
+                db_logger.warning("change_stream_reconnect_failed", extra={"error": str(e), "retry_in": delay, "shard": shard})
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, 30)
+        self._reconnect_tasks.pop(shard, None)
+        # Notifications sent while disconnected are gone, streams of this shard's users have to resync
+        self.recent.pop(shard, None)
+        for user_id, user_subscriptions in self.subscribers.items():
+            if shards.shard_name(user_id) != shard:
+                continue
+            for subscription in user_subscriptions:
+                subscription.needs_reset.set()
+
+task_change_broker = ChangeStreamBroker(TASK_STREAM_QUEUE_SIZE, TASK_STREAM_BUFFER_SIZE, TASK_STREAM_MAX_SUBSCRIBERS)
@@ -0,0 +1,75 @@
+import time
+from typing import Callable, Optional
+from app.core.logging import cache_logger
+from app.core.metrics import metrics
+
+CLOSED = "closed"
+HALF_OPEN = "half_open"
+OPEN = "open"
+STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+breaker_state = metrics.gauge("circuit_breaker_state", "Breaker state: 0 closed, 1 half-open, 2 open")
+breaker_transitions = metrics.counter("circuit_breaker_transitions_total", "Breaker state changes by target state")
+breaker_rejected = metrics.counter("circuit_breaker_rejected_total", "Calls short-circuited while the breaker was open")
+
+class CircuitBreaker:
+    """Opens after consecutive failures and lets a single probe through once the reset timeout passes"""
+
+    def __init__(self, name: str, failure_threshold: int, reset_timeout: float,
+                 on_close: Optional[Callable[[], None]] = None) -> None:
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.on_close = on_close
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._probing = False
+        breaker_state.set(STATE_VALUES[CLOSED], name=name)
+
+    @property
+    def is_closed(self) -> bool:
+        return self.state == CLOSED
+
+    def allow(self) -> bool:
+        """Whether a call may go out now, claiming the probe slot when half-open"""
+        if self.state == CLOSED:
+            return True
+        if self.state == OPEN:
+            if time.monotonic() - self.opened_at < self.reset_timeout:
+                breaker_rejected.inc(name=self.name)
+                return False
+            self._transition(HALF_OPEN)
+        if self._probing:
+            breaker_rejected.inc(name=self.name)
+            return False
+        self._probing = True
+        return True
+
+    def record_success(self) -> None:
+        self._probing = False
+        self.failures = 0
+        if self.state != CLOSED:
+            self._transition(CLOSED)
+            if self.on_close is not None:
+                self.on_close()
+
+    def record_failure(self) -> None:
+        self._probing = False
+        self.failures += 1
+        if self.state == HALF_OPEN or (self.state == CLOSED and self.failures >= self.failure_threshold):
+            self.opened_at = time.monotonic()
+            self._transition(OPEN)
+
+    def release(self) -> None:
+        """Give the probe slot back when a call ended without telling us anything (e.g. cancelled)"""
+        self._probing = False
+
+    def _transition(self, state: str) -> None:
+        previous, self.state = self.state, state
+        breaker_state.set(STATE_VALUES[state], name=self.name)
+        breaker_transitions.inc(name=self.name, to=state)
+        log = cache_logger.warning if state == OPEN else cache_logger.info
+        log("circuit_breaker_transition", extra={
+            "breaker": self.name, "from": previous, "to": state, "failures": self.failures
+        })
@@ -0,0 +1,130 @@
+import json
+import struct
+from datetime import datetime, timedelta
+from typing import Any, Callable, Optional
+import msgpack
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - only needed with CACHE_COMPRESSION=zstd
+    zstandard = None
+
+try:
+    import lz4.frame as lz4_frame
+except ImportError:  # pragma: no cover - only needed with CACHE_COMPRESSION=lz4
+    lz4_frame = None
+
+# First byte of a binary cache value. JSON text never starts with these, so
+# readers handle old JSON entries and new binary ones during a rollout
+FORMAT_MSGPACK = 0x01
+FORMAT_MSGPACK_ZSTD = 0x02
+FORMAT_MSGPACK_LZ4 = 0x03
+
+# msgpack extension types
+EXT_DATETIME = 1
+EXT_TABLE = 2
+
+EPOCH = datetime(1970, 1, 1)
+
+def _json_default(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"Cannot cache value of type {type(value).__name__}")
+
+def _msgpack_default(value: Any) -> Any:
+    if isinstance(value, datetime):
+        if value.tzinfo is not None:
+            return value.isoformat()
+        # 8 bytes of microseconds instead of a 26 character ISO string
+        return msgpack.ExtType(EXT_DATETIME, struct.pack(">q", (value - EPOCH) // timedelta(microseconds=1)))
+    raise TypeError(f"Cannot cache value of type {type(value).__name__}")
+
+def _pack(value: Any) -> bytes:
+    return msgpack.packb(value, default=_msgpack_default, use_bin_type=True)
+
+def _columnar(value: Any) -> Any:
+    """A list of same-shaped dicts as one key list and rows of values, so field names are stored once"""
+    if not isinstance(value, list) or len(value) < 2 or not all(isinstance(row, dict) for row in value):
+        return value
+    keys = list(value[0])
+    if any(len(row) != len(keys) or any(key not in row for key in keys) for row in value):
+        return value
+    return msgpack.ExtType(EXT_TABLE, _pack([keys, [[row[key] for key in keys] for row in value]]))
+
+def _ext_hook(code: int, data: bytes) -> Any:
+    if code == EXT_DATETIME:
+        # Same ISO text the JSON codec stores, readers see one representation
+        return (EPOCH + timedelta(microseconds=struct.unpack(">q", data)[0])).isoformat()
+    if code == EXT_TABLE:
+        keys, rows = _unpack(data)
+        return [dict(zip(keys, row)) for row in rows]
+    return msgpack.ExtType(code, data)
+
+def _unpack(data: bytes) -> Any:
+    return msgpack.unpackb(data, ext_hook=_ext_hook, raw=False)
+
+def decode(data: bytes) -> Any:
+    """Decode a value written by any codec, datetimes come back as ISO strings"""
+    if not data:
+        return None
+    header = data[0]
+    if header == FORMAT_MSGPACK:
+        return _unpack(data[1:])
+    if header == FORMAT_MSGPACK_ZSTD:
+        if zstandard is None:
+            raise RuntimeError("zstandard is required to read zstd-compressed cache values")
+        return _unpack(zstandard.ZstdDecompressor().decompress(data[1:]))
+    if header == FORMAT_MSGPACK_LZ4:
+        if lz4_frame is None:
+            raise RuntimeError("lz4 is required to read lz4-compressed cache values")
+        return _unpack(lz4_frame.decompress(data[1:]))
+    return json.loads(data)
+
+class JsonCodec:
+    """JSON text, what the cache held before the binary codecs"""
+
+    name = "json"
+
+    def encode(self, value: Any) -> bytes:
+        return json.dumps(value, default=_json_default).encode()
+
+    def decode(self, data: bytes) -> Any:
+        return decode(data)
+
+class MsgpackCodec:
+    """msgpack with columnar lists of dicts, compressed when the packed value reaches min_size bytes"""
+
+    def __init__(self, compression: str = "none", min_size: int = 512) -> None:
+        self.compression = compression
+        self.min_size = min_size
+        self.name = "msgpack" if compression == "none" else f"msgpack+{compression}"
+        self._compress: Optional[Callable[[bytes], bytes]] = None
+        self._header = FORMAT_MSGPACK
+        if compression == "zstd":
+            if zstandard is None:
+                raise RuntimeError("CACHE_COMPRESSION=zstd needs the zstandard package")
+            self._compress = zstandard.ZstdCompressor(level=3).compress
+            self._header = FORMAT_MSGPACK_ZSTD
+        elif compression == "lz4":
+            if lz4_frame is None:
+                raise RuntimeError("CACHE_COMPRESSION=lz4 needs the lz4 package")
+            self._compress = lz4_frame.compress
+            self._header = FORMAT_MSGPACK_LZ4
+        elif compression != "none":
+            raise ValueError(f"Unknown cache compression {compression!r}, expected none, zstd or lz4")
+
+    def encode(self, value: Any) -> bytes:
+        packed = _pack(_columnar(value))
+        if self._compress is not None and len(packed) >= self.min_size:
+            return bytes([self._header]) + self._compress(packed)
+        return bytes([FORMAT_MSGPACK]) + packed
+
+    def decode(self, data: bytes) -> Any:
+        return decode(data)
+
+def build_codec(name: str, compression: str = "none", min_size: int = 512) -> Any:
+    if name == "json":
+        return JsonCodec()
+    if name == "msgpack":
+        return MsgpackCodec(compression, min_size)
+    raise ValueError(f"Unknown cache codec {name!r}, expected json or msgpack")
@@ -10,6 +10,18 @@ class Environment(str, Enum):
     production = "production"
 
 ENVIRONMENT = Environment(os.getenv("ENVIRONMENT", "development"))
+# Event loop lag monitor: a tick every interval, stacks logged when the loop is blocked past the threshold
+LOOP_MONITOR_ENABLED = os.getenv("LOOP_MONITOR_ENABLED", "true").lower() == "true"
+LOOP_MONITOR_INTERVAL_MS = float(os.getenv("LOOP_MONITOR_INTERVAL_MS", "100"))
+LOOP_BLOCK_THRESHOLD_MS = float(os.getenv("LOOP_BLOCK_THRESHOLD_MS", "100"))
+
+# Admin profiling: sampling runs on demand, per-request cProfile needs a signing key
+PROFILE_MAX_SECONDS = float(os.getenv("PROFILE_MAX_SECONDS", "30"))
+PROFILE_SAMPLE_INTERVAL_MS = float(os.getenv("PROFILE_SAMPLE_INTERVAL_MS", "5"))
+PROFILE_SIGNING_KEY = os.getenv("PROFILE_SIGNING_KEY")
+PROFILE_HEADER_MAX_TTL = int(os.getenv("PROFILE_HEADER_MAX_TTL", "600"))
+PROFILE_DIR = os.getenv("PROFILE_DIR", "/tmp/task-api-profiles")
+
 DEBUG = ENVIRONMENT == Environment.development
 
 POSTGRES_USER = os.getenv("POSTGRES_USER", "postgres")
@@ -21,14 +33,72 @@ POSTGRES_PORT = os.getenv("POSTGRES_PORT", "5432")
 DATABASE_URL = os.getenv("DATABASE_URL", f"postgresql+asyncpg://{POSTGRES_USER}:{POSTGRES_PASSWORD}@{POSTGRES_HOST}:{POSTGRES_PORT}/{POSTGRES_DB}")
 DATABASE_POOL_MIN_SIZE = int(os.getenv("DATABASE_POOL_MIN_SIZE", "10"))
 DATABASE_POOL_MAX_SIZE = int(os.getenv("DATABASE_POOL_MAX_SIZE", "50"))
+
+# Number of worker processes sharing this host's connection budget (set by serve.py)
+WEB_WORKERS = int(os.getenv("WEB_WORKERS", "1"))
+# Total Postgres connections for all workers of this process group, summed over every database
+DATABASE_CONNECTION_BUDGET = int(os.getenv("DATABASE_CONNECTION_BUDGET", "0"))
+DATABASE_POOL_CLOSE_TIMEOUT = float(os.getenv("DATABASE_POOL_CLOSE_TIMEOUT", "10"))
 DATABASE_COMMAND_TIMEOUT = int(os.getenv("DATABASE_COMMAND_TIMEOUT", "60"))
+DATABASE_POOL_ACQUIRE_TIMEOUT = float(os.getenv("DATABASE_POOL_ACQUIRE_TIMEOUT", "5"))
+# Schema to resolve tables in, tests give each xdist worker its own
+DATABASE_SCHEMA = os.getenv("DATABASE_SCHEMA")
+# Task shards as comma-separated "<name>=<url>" pairs, empty keeps every table on DATABASE_URL.
+# Append new shards at the end, a shard's position is its task id residue (see shard_tool.py)
+DATABASE_SHARD_URLS = {
+    name.strip(): url.strip()
+    for name, url in (
+        item.split("=", 1) for item in os.getenv("DATABASE_SHARD_URLS", "").split(",") if "=" in item
+    )
+}
+SHARD_VIRTUAL_NODES = int(os.getenv("SHARD_VIRTUAL_NODES", "64"))
+# Each worker holds one pool per distinct database (the primary plus shards on other URLs)
+# and one LISTEN connection per shard for the change stream, so every pool gets
+# (budget / workers - listen connections) / pools
+DATABASE_POOLS_PER_WORKER = 1 + len({url for url in DATABASE_SHARD_URLS.values() if url != DATABASE_URL})
+DATABASE_LISTEN_CONNECTIONS = max(1, len(DATABASE_SHARD_URLS))
+if DATABASE_CONNECTION_BUDGET > 0:
+    DATABASE_POOL_MAX_SIZE = max(1, (
+        DATABASE_CONNECTION_BUDGET // WEB_WORKERS - DATABASE_LISTEN_CONNECTIONS
+    ) // DATABASE_POOLS_PER_WORKER)
+    DATABASE_POOL_MIN_SIZE = min(DATABASE_POOL_MIN_SIZE, DATABASE_POOL_MAX_SIZE)
+# How often workers reload shard_directory (users pinned to a shard or being moved)
+SHARD_DIRECTORY_REFRESH = float(os.getenv("SHARD_DIRECTORY_REFRESH", "5"))
 
 REDIS_HOST = os.getenv("REDIS_HOST", "localhost")
 REDIS_PORT = int(os.getenv("REDIS_PORT", "6379"))
 REDIS_URL = os.getenv("REDIS_URL", f"redis://{REDIS_HOST}:{REDIS_PORT}")
+REDIS_POOL_MAX_SIZE = int(os.getenv("REDIS_POOL_MAX_SIZE", "50"))
+REDIS_POOL_TIMEOUT = float(os.getenv("REDIS_POOL_TIMEOUT", "5"))
+REDIS_SOCKET_TIMEOUT = float(os.getenv("REDIS_SOCKET_TIMEOUT", "0.5"))
+REDIS_CONNECT_TIMEOUT = float(os.getenv("REDIS_CONNECT_TIMEOUT", "1"))
+REDIS_HEALTH_CHECK_INTERVAL = int(os.getenv("REDIS_HEALTH_CHECK_INTERVAL", "30"))
+REDIS_RETRY_ATTEMPTS = int(os.getenv("REDIS_RETRY_ATTEMPTS", "2"))
+REDIS_RETRY_BASE_MS = float(os.getenv("REDIS_RETRY_BASE_MS", "10"))
+REDIS_RETRY_CAP_MS = float(os.getenv("REDIS_RETRY_CAP_MS", "100"))
+# Breaker opens after this many consecutive failures and probes again after the reset timeout
+REDIS_BREAKER_FAILURE_THRESHOLD = int(os.getenv("REDIS_BREAKER_FAILURE_THRESHOLD", "5"))
+REDIS_BREAKER_RESET_TIMEOUT = float(os.getenv("REDIS_BREAKER_RESET_TIMEOUT", "5"))
+# Invalidations and revocations kept for replay while the breaker is open
+REDIS_PENDING_WRITES_MAX = int(os.getenv("REDIS_PENDING_WRITES_MAX", "10000"))
+REVOCATION_CACHE_SIZE = int(os.getenv("REVOCATION_CACHE_SIZE", "10000"))
+
+# Cache value encoding: json, or msgpack with optional zstd/lz4 above CACHE_COMPRESS_MIN_BYTES
+CACHE_CODEC = os.getenv("CACHE_CODEC", "json")
+CACHE_COMPRESSION = os.getenv("CACHE_COMPRESSION", "none")
+CACHE_COMPRESS_MIN_BYTES = int(os.getenv("CACHE_COMPRESS_MIN_BYTES", "512"))
 
 CACHE_USER_TTL = 300
 CACHE_TASKS_TTL = 60
+CACHE_TASKS_STALE_TTL = 600
+CACHE_SUMMARY_TTL = 60
+CACHE_TASK_TTL = 300
+
+# Prefetch the user and first task pages after login and after writes invalidate them
+CACHE_WARM_ENABLED = os.getenv("CACHE_WARM_ENABLED", "true").lower() == "true"
+CACHE_WARM_PAGES = int(os.getenv("CACHE_WARM_PAGES", "1"))
+CACHE_WARM_PAGE_SIZE = int(os.getenv("CACHE_WARM_PAGE_SIZE", "50"))
+CACHE_WARM_MAX_IN_FLIGHT = int(os.getenv("CACHE_WARM_MAX_IN_FLIGHT", "20"))
 
 if ENVIRONMENT == Environment.production:
     jwt_secret = os.getenv("JWT_SECRET_KEY")
@@ -47,9 +117,67 @@ RATE_LIMIT_AUTH = "5/minute"
 RATE_LIMIT_GENERAL = "100/minute"
 RATE_LIMIT_TASKS = "50/minute"
 
+TASK_BATCH_MAX_IDS = int(os.getenv("TASK_BATCH_MAX_IDS", "200"))
+
+TASK_STREAM_QUEUE_SIZE = int(os.getenv("TASK_STREAM_QUEUE_SIZE", "100"))
+TASK_STREAM_BUFFER_SIZE = int(os.getenv("TASK_STREAM_BUFFER_SIZE", "1000"))
+TASK_STREAM_MAX_SUBSCRIBERS = int(os.getenv("TASK_STREAM_MAX_SUBSCRIBERS", "10000"))
+TASK_STREAM_KEEPALIVE = float(os.getenv("TASK_STREAM_KEEPALIVE", "15"))
+
+# Deferred work (cache invalidation, stats refresh, audit) goes through the Redis Streams queue
+JOBS_ENABLED = os.getenv("JOBS_ENABLED", "false").lower() == "true"
+JOBS_BATCH_SIZE = int(os.getenv("JOBS_BATCH_SIZE", "100"))
+JOBS_BLOCK_MS = int(os.getenv("JOBS_BLOCK_MS", "1000"))
+JOBS_MAX_ATTEMPTS = int(os.getenv("JOBS_MAX_ATTEMPTS", "5"))
+JOBS_CLAIM_IDLE_MS = int(os.getenv("JOBS_CLAIM_IDLE_MS", "60000"))
+# The stream is only trimmed up to the oldest unacked entry, past this length workers warn about the backlog
+JOBS_STREAM_WARN_LENGTH = int(os.getenv("JOBS_STREAM_WARN_LENGTH", "100000"))
+# Failed jobs are re-queued after a jittered, doubling delay, capped below JOBS_CLAIM_IDLE_MS
+JOBS_RETRY_BASE_MS = float(os.getenv("JOBS_RETRY_BASE_MS", "500"))
+JOBS_RETRY_MAX_MS = float(os.getenv("JOBS_RETRY_MAX_MS", "30000"))
+
+# Group commit: concurrent task inserts within the window share one multi-row INSERT
+TASK_INSERT_BATCHING_ENABLED = os.getenv("TASK_INSERT_BATCHING_ENABLED", "false").lower() == "true"
+TASK_INSERT_BATCH_WINDOW_MS = float(os.getenv("TASK_INSERT_BATCH_WINDOW_MS", "2"))
+TASK_INSERT_BATCH_MAX_ROWS = int(os.getenv("TASK_INSERT_BATCH_MAX_ROWS", "100"))
+
+# Task history: events are buffered per worker and COPYed into task_events every window or max rows.
+# Requests wait for room once the queue is full
+TASK_EVENTS_ENABLED = os.getenv("TASK_EVENTS_ENABLED", "true").lower() == "true"
+TASK_EVENTS_FLUSH_MS = float(os.getenv("TASK_EVENTS_FLUSH_MS", "200"))
+TASK_EVENTS_FLUSH_ROWS = int(os.getenv("TASK_EVENTS_FLUSH_ROWS", "500"))
+TASK_EVENTS_QUEUE_SIZE = int(os.getenv("TASK_EVENTS_QUEUE_SIZE", "10000"))
+
+ARCHIVE_ENABLED = os.getenv("ARCHIVE_ENABLED", "true").lower() == "true"
+ARCHIVE_AFTER_DAYS = int(os.getenv("ARCHIVE_AFTER_DAYS", "30"))
+ARCHIVE_BATCH_SIZE = int(os.getenv("ARCHIVE_BATCH_SIZE", "1000"))
+ARCHIVE_INTERVAL = float(os.getenv("ARCHIVE_INTERVAL", "300"))
+ARCHIVE_BATCH_PAUSE = float(os.getenv("ARCHIVE_BATCH_PAUSE", "0.1"))
+
+ADMISSION_CONTROL_ENABLED = os.getenv("ADMISSION_CONTROL_ENABLED", "true").lower() == "true"
+ADMISSION_MAX_POOL_WAITERS = int(os.getenv("ADMISSION_MAX_POOL_WAITERS", "100"))
+ADMISSION_MAX_ACQUIRE_WAIT_MS = float(os.getenv("ADMISSION_MAX_ACQUIRE_WAIT_MS", "250"))
+ADMISSION_RETRY_AFTER = int(os.getenv("ADMISSION_RETRY_AFTER", "2"))
+
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+# Comma-separated "<logger or message>=<rate>" pairs, e.g. "cache_hit=0.01,app.cache=0.1"
+LOG_SAMPLE_RATES = {
+    name.strip(): float(rate)
+    for name, rate in (
+        item.split("=", 1) for item in os.getenv("LOG_SAMPLE_RATES", "cache_hit=0.01").split(",") if "=" in item
+    )
+}
+
 DEBUG = ENVIRONMENT == Environment.development
 MAX_REQUEST_SIZE = 10_000_000
-REQUEST_TIMEOUT = 60
+REQUEST_TIMEOUT = float(os.getenv("REQUEST_TIMEOUT", "60"))
+# Comma-separated "<path prefix>=<seconds>" pairs, the longest matching prefix wins
+REQUEST_TIMEOUT_OVERRIDES = {
+    prefix.strip(): float(seconds)
+    for prefix, seconds in (
+        item.split("=", 1) for item in os.getenv("REQUEST_TIMEOUT_OVERRIDES", "").split(",") if "=" in item
+    )
+}
 
 ALLOWED_ORIGINS = os.getenv("ALLOWED_ORIGINS", "*")
 if ALLOWED_ORIGINS != "*":
@@ -0,0 +1,144 @@
+import asyncio
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Awaitable, Dict, Iterator, Optional
+from fastapi.responses import JSONResponse
+from app.core.config import REQUEST_TIMEOUT, REQUEST_TIMEOUT_OVERRIDES
+from app.core.logging import request_logger
+
+class DeadlineExceeded(Exception):
+    """Raised when the request budget is used up before or during a backend call"""
+
+    def __init__(self, stage: str) -> None:
+        super().__init__(f"Request deadline exceeded during {stage}")
+        self.stage = stage
+
+class Deadline:
+    def __init__(self, timeout: float) -> None:
+        self.timeout = timeout
+        self.expires_at = time.monotonic() + timeout
+        self.current_stage = "handler"
+        self.stage_times: Dict[str, float] = defaultdict(float)
+
+    def remaining(self) -> float:
+        return self.expires_at - time.monotonic()
+
+    def slowest_stage(self) -> str:
+        if not self.stage_times:
+            return self.current_stage
+        return max(self.stage_times, key=self.stage_times.get)
+
+_current_deadline: ContextVar[Optional[Deadline]] = ContextVar("request_deadline", default=None)
+
+def current_deadline() -> Optional[Deadline]:
+    return _current_deadline.get()
+
+def remaining_budget(stage_name: str, cap: Optional[float] = None) -> Optional[float]:
+    """Seconds left for a backend call, None when there is no deadline and no cap"""
+    deadline = _current_deadline.get()
+    if deadline is None:
+        return cap
+    remaining = deadline.remaining()
+    if remaining <= 0:
+        raise DeadlineExceeded(stage_name)
+    return remaining if cap is None else min(remaining, cap)
+
+@contextmanager
+def stage(name: str) -> Iterator[None]:
+    """Attribute time spent in the block to a named stage of the current request"""
+    deadline = _current_deadline.get()
+    if deadline is None:
+        yield
+        return
+    previous = deadline.current_stage
+    deadline.current_stage = name
+    start = time.monotonic()
+    try:
+        yield
+    except asyncio.TimeoutError:
+        if deadline.remaining() <= 0:
+            raise DeadlineExceeded(name)
+        raise
+    finally:
+        deadline.stage_times[name] += time.monotonic() - start
+        deadline.current_stage = previous
+
+async def run_with_deadline(awaitable: Awaitable[Any], stage_name: str) -> Any:
+    """Await a backend call bounded by the remaining request budget"""
+    if _current_deadline.get() is None:
+        return await awaitable
+    try:
+        timeout = remaining_budget(stage_name)
+    except DeadlineExceeded:
+        if asyncio.iscoroutine(awaitable):
+            awaitable.close()
+        raise
+    with stage(stage_name):
+        async with asyncio.timeout(timeout):
+            return await awaitable
+
+def timeout_for_path(path: str) -> float:
+    """Longest matching prefix in REQUEST_TIMEOUT_OVERRIDES, else REQUEST_TIMEOUT"""
+    matches = [prefix for prefix in REQUEST_TIMEOUT_OVERRIDES if path.startswith(prefix)]
+    if not matches:
+        return REQUEST_TIMEOUT
+    return REQUEST_TIMEOUT_OVERRIDES[max(matches, key=len)]
+
+def log_deadline_overrun(path: str, deadline: Deadline) -> None:
+    request_logger.warning("deadline_exceeded", extra={
+        "path": path,
+        "timeout_s": deadline.timeout,
+        "stage": deadline.current_stage,
+        "slowest_stage": deadline.slowest_stage(),
+        "stage_ms": {name: round(seconds * 1000, 2) for name, seconds in deadline.stage_times.items()}
+    })
+
+def deadline_response() -> JSONResponse:
+    return JSONResponse(
+        status_code=504,
+        content={"error": "Request timed out", "detail": "Request deadline exceeded"}
+    )
+
+class DeadlineMiddleware:
+    """Cancel the handler when its per-route budget runs out and answer 504"""
+
+    def __init__(self, app) -> None:
+        self.app = app
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        deadline = Deadline(timeout_for_path(scope["path"]))
+        token = _current_deadline.set(deadline)
+        response_started = False
+
+        timeout = asyncio.timeout(deadline.timeout)
+
+        async def send_wrapper(message) -> None:
+            nonlocal response_started
+            if message["type"] == "http.response.start":
+                response_started = True
+                # Event streams are long-lived by design, the budget only covers time to first byte
+                if any(
+                    name == b"content-type" and value.startswith(b"text/event-stream")
+                    for name, value in message.get("headers", [])
+                ):
+                    timeout.reschedule(None)
+                    deadline.expires_at = float("inf")
+            await send(message)
+
+        try:
+            async with timeout:
+                await self.app(scope, receive, send_wrapper)
+        except (asyncio.TimeoutError, DeadlineExceeded):
+            if deadline.remaining() > 0:
+                raise
+            log_deadline_overrun(scope["path"], deadline)
+            if not response_started:
+                await deadline_response()(scope, receive, send)
+        finally:
+            _current_deadline.reset(token)
@@ -1,12 +1,12 @@
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, HTTPException, Request, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from typing import Dict, Any, Optional
 from app.core.security import decode_access_token, is_token_blacklisted
 from app.core.redis import redis_client
 from app.core.config import CACHE_USER_TTL
 from app.core.logging import cache_logger
+from app.core.admission import admission_controller
 from app.database.connection import database
-import json
 
 security: HTTPBearer = HTTPBearer()
 
@@ -40,10 +40,10 @@ async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(s
         )
     
     # Try to get user from cache first
-    cached_user = await redis_client.get(f"user:{username}")
+    cached_user = await redis_client.get_value(f"user:{username}")
     if cached_user:
         cache_logger.info("cache_hit", extra={"key": f"user:{username}"})
-        return json.loads(cached_user)
+        return cached_user
     
     # If not in cache, fetch from database
     user: Optional[Dict[str, Any]] = await database.fetchrow(
@@ -64,9 +64,9 @@ async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(s
             detail="Inactive user"
         )
     
-    # Convert asyncpg Record to dict for JSON serialization
+    # Convert asyncpg Record to dict for the cache codec
     user_dict = dict(user)
-    await redis_client.set_json(f"user:{username}", user_dict, expire=CACHE_USER_TTL)
+    await redis_client.set_value(f"user:{username}", user_dict, expire=CACHE_USER_TTL)
     
     return user_dict
 
@@ -78,3 +78,8 @@ async def get_admin_user(current_user: Dict[str, Any] = Depends(get_current_user
             detail="Only administrators can access this resource"
         )
     return current_user
+
+async def check_admission(request: Request) -> None:
+    """Shed non-critical requests with 503 while the DB pool is saturated"""
+    if admission_controller.is_overloaded():
+        raise admission_controller.reject(request.url.path)
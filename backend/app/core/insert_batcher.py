@@ -0,0 +1,149 @@
+import asyncio
+import contextvars
+from collections import defaultdict
+from typing import Any, Dict, List, Optional, Set, Tuple
+import asyncpg
+from app.core.config import (
+    TASK_INSERT_BATCHING_ENABLED, TASK_INSERT_BATCH_WINDOW_MS, TASK_INSERT_BATCH_MAX_ROWS
+)
+from app.core.cache import TASK_COLUMNS, cache_tasks
+from app.core.jobs import defer
+from app.core.logging import db_logger
+from app.core.metrics import metrics
+from app.database.connection import Database
+from app.database.sharding import shards
+
+INSERT_ONE = f"""
+    INSERT INTO tasks (user_id, title, description, status, priority)
+    VALUES ($1, $2, $3, $4, $5)
+    RETURNING {TASK_COLUMNS}
+"""
+
+# ORDER BY ord makes the SERIAL ids follow submission order, so sorting the
+# returned rows by id lines them up with the waiting requests
+INSERT_BATCH = f"""
+    INSERT INTO tasks (user_id, title, description, status, priority)
+    SELECT user_id, title, description, status, priority
+    FROM unnest($1::int[], $2::text[], $3::text[], $4::task_status[], $5::task_priority[])
+        WITH ORDINALITY AS batch(user_id, title, description, status, priority, ord)
+    ORDER BY ord
+    RETURNING {TASK_COLUMNS}
+"""
+
+TaskRow = Tuple[int, str, Optional[str], str, str]
+
+insert_batches = metrics.counter("task_insert_batches_total", "Multi-row task INSERT statements issued")
+insert_batch_rows = metrics.counter("task_insert_batch_rows_total", "Task rows written through the insert batcher")
+
+async def insert_one(shard: Database, row: TaskRow) -> Any:
+    try:
+        return await shard.fetchrow(INSERT_ONE, *row)
+    except asyncpg.ForeignKeyViolationError:
+        # The user's row never reached this shard (seeded, or registration's copy failed)
+        await shards.ensure_users([row[0]])
+        return await shard.fetchrow(INSERT_ONE, *row)
+
+class TaskInsertBatcher:
+    """Coalesces concurrent task inserts into one multi-row INSERT per shard per window"""
+
+    def __init__(self, window_ms: float, max_rows: int, enabled: bool = True) -> None:
+        self.window = window_ms / 1000
+        self.max_rows = max_rows
+        self.enabled = enabled
+        self._pending: List[Tuple[TaskRow, asyncio.Future]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._flushes: Set[asyncio.Task] = set()
+
+    async def insert(self, user_id: int, title: str, description: Optional[str],
+                     status: str, priority: str) -> Dict[str, Any]:
+        """Insert a task and return its row, sharing the round trip with concurrent inserts"""
+        row: TaskRow = (user_id, title, description, status, priority)
+        shard = shards.for_write(user_id)
+        if not self.enabled:
+            task = await insert_one(shard, row)
+            await cache_tasks([task])
+            await defer("invalidate_user_tasks_cache", user_id=user_id)
+            return dict(task)
+
+        loop = asyncio.get_running_loop()
+        future: asyncio.Future = loop.create_future()
+        self._pending.append((row, future))
+        if len(self._pending) >= self.max_rows:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window, self._flush)
+        # A cancelled caller leaves its row in the batch, as with a cancelled single INSERT
+        return await future
+
+    def _flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        if not batch:
+            return
+        # Run outside the submitting request's context so its deadline does not bound the batch
+        flush = asyncio.get_running_loop().create_task(self._write(batch), context=contextvars.Context())
+        self._flushes.add(flush)
+        flush.add_done_callback(self._flushes.discard)
+
+    async def _write(self, batch: List[Tuple[TaskRow, asyncio.Future]]) -> None:
+        rows = [row for row, _ in batch]
+        results: List[Any] = [None] * len(rows)
+        by_shard: Dict[Database, List[int]] = defaultdict(list)
+        for index, row in enumerate(rows):
+            by_shard[shards.for_user(row[0])].append(index)
+        await asyncio.gather(*(
+            self._write_shard(shard, indexes, rows, results) for shard, indexes in by_shard.items()
+        ))
+
+        inserted = [result for result in results if not isinstance(result, BaseException)]
+        for outcome in await asyncio.gather(
+            cache_tasks(inserted),
+            *(defer("invalidate_user_tasks_cache", user_id=user_id) for user_id in {task["user_id"] for task in inserted}),
+            return_exceptions=True
+        ):
+            if isinstance(outcome, Exception):
+                db_logger.warning("task_insert_cache_update_failed", extra={"error": str(outcome)})
+
+        for (_, future), result in zip(batch, results):
+            if future.done():
+                continue
+            if isinstance(result, BaseException):
+                future.set_exception(result)
+            else:
+                future.set_result(dict(result))
+
+    async def _write_shard(self, shard: Database, indexes: List[int], rows: List[TaskRow], results: List[Any]) -> None:
+        """Insert one shard's share of the batch, filling results at the rows' positions"""
+        shard_rows = [rows[index] for index in indexes]
+        try:
+            inserted: List[Any] = await self._insert_batch(shard, shard_rows)
+        except asyncpg.PostgresError as e:
+            # One bad row (e.g. a user deleted mid-request) must not fail its neighbours
+            db_logger.warning("task_insert_batch_failed", extra={"rows": len(shard_rows), "error": str(e)})
+            inserted = await asyncio.gather(*(insert_one(shard, row) for row in shard_rows), return_exceptions=True)
+        except Exception as e:
+            inserted = [e] * len(shard_rows)
+        for index, result in zip(indexes, inserted):
+            results[index] = result
+
+    async def _insert_batch(self, shard: Database, rows: List[TaskRow]) -> List[Any]:
+        if len(rows) == 1:
+            return [await insert_one(shard, rows[0])]
+        inserted = await shard.fetch(INSERT_BATCH, *(list(column) for column in zip(*rows)))
+        insert_batches.inc()
+        insert_batch_rows.inc(len(inserted))
+        return sorted(inserted, key=lambda task: task["id"])
+
+    async def drain(self) -> None:
+        """Write anything still pending and wait for in-flight batches"""
+        self._flush()
+        if self._flushes:
+            await asyncio.gather(*self._flushes, return_exceptions=True)
+
+task_insert_batcher = TaskInsertBatcher(
+    window_ms=TASK_INSERT_BATCH_WINDOW_MS,
+    max_rows=TASK_INSERT_BATCH_MAX_ROWS,
+    enabled=TASK_INSERT_BATCHING_ENABLED
+)
@@ -0,0 +1,54 @@
+from typing import Any, Dict
+from app.core.cache import invalidate_user_tasks_cache, invalidate_user_task_contents_cache
+from app.core.cache_warmer import cache_warmer
+from app.core.jobs import job_handler
+from app.core.logging import audit_logger, cache_logger
+from app.core.redis import redis_client
+from app.database.connection import database
+from app.database.sharding import shards
+import asyncio
+import json
+
+ADMIN_STATS_KEY = "admin:stats"
+# Last computed stats, served while a refresh job is queued
+ADMIN_STATS_LAST_KEY = "admin:stats:last"
+ADMIN_STATS_TTL = 300
+ADMIN_STATS_LAST_TTL = 3600
+
+TASK_TOTALS_QUERY = "SELECT COUNT(*) AS total, COUNT(*) FILTER (WHERE status = 'completed') AS completed FROM tasks"
+
+async def compute_admin_stats() -> Dict[str, Any]:
+    """Count users and tasks and refresh both admin stats cache keys"""
+    # Users are counted on the primary, task totals on every shard in parallel
+    total_users, task_totals = await asyncio.gather(
+        database.fetchval("SELECT COUNT(*) FROM users"),
+        shards.fan_out("fetchrow", TASK_TOTALS_QUERY)
+    )
+    stats = {
+        "total_users": total_users,
+        "total_tasks": sum(row["total"] for row in task_totals),
+        "completed_tasks": sum(row["completed"] for row in task_totals),
+    }
+    stats_json = json.dumps(stats)
+    await redis_client.set(ADMIN_STATS_KEY, stats_json, expire=ADMIN_STATS_TTL)
+    await redis_client.set(ADMIN_STATS_LAST_KEY, stats_json, expire=ADMIN_STATS_LAST_TTL)
+    cache_logger.info("cache_set", extra={"key": ADMIN_STATS_KEY, "ttl": ADMIN_STATS_TTL})
+    return stats
+
+@job_handler("invalidate_user_tasks_cache")
+async def invalidate_user_tasks_cache_job(payload: Dict[str, Any]) -> None:
+    await invalidate_user_tasks_cache(payload["user_id"])
+    cache_warmer.schedule(payload["user_id"])
+
+@job_handler("invalidate_user_task_contents_cache")
+async def invalidate_user_task_contents_cache_job(payload: Dict[str, Any]) -> None:
+    await invalidate_user_task_contents_cache(payload["user_id"])
+
+@job_handler("refresh_admin_stats")
+async def refresh_admin_stats_job(payload: Dict[str, Any]) -> None:
+    await compute_admin_stats()
+
+@job_handler("audit")
+async def audit_job(payload: Dict[str, Any]) -> None:
+    event = payload.pop("event")
+    audit_logger.info(event, extra=payload)
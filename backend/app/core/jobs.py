@@ -0,0 +1,212 @@
+import asyncio
+import json
+import os
+import random
+import socket
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set, Tuple
+from redis.exceptions import ResponseError
+from app.core.config import (
+    JOBS_ENABLED, JOBS_BATCH_SIZE, JOBS_BLOCK_MS, JOBS_MAX_ATTEMPTS, JOBS_CLAIM_IDLE_MS, JOBS_STREAM_WARN_LENGTH,
+    JOBS_RETRY_BASE_MS, JOBS_RETRY_MAX_MS
+)
+from app.core.logging import jobs_logger
+from app.core.metrics import metrics
+from app.core.redis import redis_client
+
+JOBS_STREAM = "jobs"
+DEAD_LETTER_STREAM = "jobs:dead"
+CONSUMER_GROUP = "job_workers"
+# How often a worker trims acked entries off the head of the stream
+TRIM_INTERVAL_SECONDS = 5.0
+
+JobHandler = Callable[[Dict[str, Any]], Awaitable[None]]
+_handlers: Dict[str, JobHandler] = {}
+
+jobs_processed = metrics.counter("jobs_processed_total", "Jobs handled successfully")
+jobs_retried = metrics.counter("jobs_retried_total", "Jobs re-enqueued after a failure")
+jobs_dead = metrics.counter("jobs_dead_lettered_total", "Jobs moved to the dead-letter stream")
+jobs_inline = metrics.counter("jobs_run_inline_total", "Deferred jobs run in the request because Redis was unavailable")
+jobs_stream_length = metrics.gauge("jobs_stream_length", "Entries left in the jobs stream after the last trim")
+
+def stream_id_key(entry_id: str) -> Tuple[int, int]:
+    ms, _, seq = entry_id.partition("-")
+    return int(ms), int(seq or 0)
+
+def retry_delay(attempts: int) -> float:
+    """Seconds before retry number `attempts`, with full jitter like the Redis client's retries"""
+    # A retry still waiting when JOBS_CLAIM_IDLE_MS passes would be claimed and run twice
+    cap = min(JOBS_RETRY_MAX_MS, JOBS_CLAIM_IDLE_MS / 2)
+    return random.uniform(0, min(cap, JOBS_RETRY_BASE_MS * 2 ** (attempts - 1))) / 1000
+
+def job_handler(job_type: str) -> Callable[[JobHandler], JobHandler]:
+    """Register the coroutine that runs jobs of this type"""
+    def register(handler: JobHandler) -> JobHandler:
+        _handlers[job_type] = handler
+        return handler
+    return register
+
+async def enqueue(job_type: str, attempts: int = 0, **payload: Any) -> Optional[str]:
+    """Append a job to the stream, returns the stream entry id or None while Redis is unavailable"""
+    if job_type not in _handlers:
+        raise ValueError(f"Unknown job type: {job_type}")
+    fields = {"type": job_type, "payload": json.dumps(payload), "attempts": str(attempts)}
+    # No MAXLEN, it would drop entries nobody has read yet, workers trim acked ones instead
+    return await redis_client.xadd(JOBS_STREAM, fields)
+
+async def defer(job_type: str, **payload: Any) -> None:
+    """Queue work off the request path, or run it inline when the job queue is disabled or unreachable"""
+    if JOBS_ENABLED and await enqueue(job_type, **payload) is not None:
+        return
+    if JOBS_ENABLED:
+        # The caller's write is already committed, doing the work now beats failing the request
+        jobs_inline.inc(type=job_type)
+    await _handlers[job_type](payload)
+
+class JobWorker:
+    """Consumes the jobs stream in batches through a consumer group"""
+
+    def __init__(self) -> None:
+        self.consumer = f"{socket.gethostname()}-{os.getpid()}"
+        self._stopping = asyncio.Event()
+        # Failed jobs waiting out their delay, their entries stay pending until re-queued
+        self._retries: Set[asyncio.Task] = set()
+        self._trimmed_at = 0.0
+
+    async def ensure_group(self) -> None:
+        try:
+            await redis_client.client.xgroup_create(JOBS_STREAM, CONSUMER_GROUP, id="0", mkstream=True)
+        except ResponseError as e:
+            if "BUSYGROUP" not in str(e):
+                raise
+
+    async def run(self) -> None:
+        jobs_logger.info("job_worker_started", extra={"consumer": self.consumer})
+        group_ready = False
+        failures = 0
+        while not self._stopping.is_set():
+            try:
+                if not group_ready:
+                    await self.ensure_group()
+                    group_ready = True
+                # Entries left pending by a crashed consumer come first
+                claimed = await self._claim_stale()
+                batch = claimed or await self._read_batch()
+                if batch:
+                    await self.process_batch(batch)
+                if time.monotonic() - self._trimmed_at >= TRIM_INTERVAL_SECONDS:
+                    await self.trim_acked()
+                failures = 0
+            except Exception as e:
+                # Unacked entries stay pending and are picked up again once Redis is back
+                failures += 1
+                delay = min(0.5 * 2 ** (failures - 1), 30)
+                jobs_logger.error("job_worker_error", extra={"error": str(e), "error_type": type(e).__name__, "retry_in": delay})
+                await self._wait(delay)
+        for task in self._retries:
+            # Their entries are still pending and get reclaimed after JOBS_CLAIM_IDLE_MS
+            task.cancel()
+        jobs_logger.info("job_worker_stopped", extra={"consumer": self.consumer})
+
+    async def _wait(self, seconds: float) -> None:
+        try:
+            await asyncio.wait_for(self._stopping.wait(), seconds)
+        except asyncio.TimeoutError:
+            pass
+
+    def stop(self) -> None:
+        self._stopping.set()
+
+    async def trim_acked(self) -> None:
+        """Drop entries before the oldest one the group has not acked, unread and pending entries stay"""
+        self._trimmed_at = time.monotonic()
+        # Read the delivery position first: anything delivered before it and not acked
+        # is still pending when XPENDING runs next
+        groups = await redis_client.client.xinfo_groups(JOBS_STREAM)
+        min_id = next(group["last-delivered-id"] for group in groups if group["name"] == CONSUMER_GROUP)
+        pending = await redis_client.client.xpending(JOBS_STREAM, CONSUMER_GROUP)
+        if pending["pending"] and stream_id_key(pending["min"]) < stream_id_key(min_id):
+            min_id = pending["min"]
+        await redis_client.client.xtrim(JOBS_STREAM, minid=min_id, approximate=True)
+        length = await redis_client.client.xlen(JOBS_STREAM)
+        jobs_stream_length.set(length)
+        if length > JOBS_STREAM_WARN_LENGTH:
+            jobs_logger.warning("jobs_stream_backlog", extra={"length": length, "oldest_unacked": min_id})
+
+    async def _read_batch(self) -> List[Tuple[str, Dict[str, str]]]:
+        response = await redis_client.client.xreadgroup(
+            CONSUMER_GROUP, self.consumer, {JOBS_STREAM: ">"}, count=JOBS_BATCH_SIZE, block=JOBS_BLOCK_MS
+        )
+        return response[0][1] if response else []
+
+    async def _claim_stale(self) -> List[Tuple[str, Dict[str, str]]]:
+        result = await redis_client.client.xautoclaim(
+            JOBS_STREAM, CONSUMER_GROUP, self.consumer, min_idle_time=JOBS_CLAIM_IDLE_MS, count=JOBS_BATCH_SIZE
+        )
+        # Entries deleted from the stream come back without fields, ack them so they stop being claimed
+        gone = [entry_id for entry_id, fields in result[1] if not fields and entry_id is not None]
+        if gone:
+            await redis_client.client.xack(JOBS_STREAM, CONSUMER_GROUP, *gone)
+        return [entry for entry in result[1] if entry[1]]
+
+    async def process_batch(self, entries: List[Tuple[str, Dict[str, str]]]) -> None:
+        # Identical jobs in one batch (e.g. repeated cache invalidations for a user) run once
+        unique: Dict[Tuple[str, str], List[Tuple[str, Dict[str, str]]]] = {}
+        for entry_id, fields in entries:
+            unique.setdefault((fields["type"], fields["payload"]), []).append((entry_id, fields))
+
+        results = await asyncio.gather(
+            *(self._run_job(job_type, payload) for job_type, payload in unique),
+            return_exceptions=True
+        )
+
+        done: List[str] = []
+        for (job_type, payload), result in zip(unique, results):
+            group = unique[(job_type, payload)]
+            if not isinstance(result, BaseException):
+                jobs_processed.inc(len(group), type=job_type)
+                done.extend(entry_id for entry_id, _ in group)
+            elif await self._handle_failure(job_type, payload, group, result):
+                done.extend(entry_id for entry_id, _ in group)
+        if done:
+            await redis_client.client.xack(JOBS_STREAM, CONSUMER_GROUP, *done)
+
+    async def _run_job(self, job_type: str, payload: str) -> None:
+        handler: Optional[JobHandler] = _handlers.get(job_type)
+        if handler is None:
+            raise ValueError(f"Unknown job type: {job_type}")
+        await handler(json.loads(payload))
+
+    async def _handle_failure(self, job_type: str, payload: str, group: List[Tuple[str, Dict[str, str]]],
+                              error: BaseException) -> bool:
+        """Dead-letter or schedule a retry, True when the entries can be acked now"""
+        attempts = max(int(fields.get("attempts", "0")) for _, fields in group) + 1
+        if attempts >= JOBS_MAX_ATTEMPTS:
+            await redis_client.client.xadd(DEAD_LETTER_STREAM, {
+                "type": job_type, "payload": payload, "attempts": str(attempts), "error": repr(error)[:500]
+            })
+            jobs_dead.inc(type=job_type)
+            jobs_logger.error("job_dead_lettered", extra={"type": job_type, "attempts": attempts, "error": str(error)})
+            return True
+        delay = retry_delay(attempts)
+        task = asyncio.get_running_loop().create_task(
+            self._retry_later(job_type, payload, [entry_id for entry_id, _ in group], attempts, delay)
+        )
+        self._retries.add(task)
+        task.add_done_callback(self._retries.discard)
+        jobs_logger.warning("job_retry_scheduled", extra={
+            "type": job_type, "attempts": attempts, "retry_in": round(delay, 3), "error": str(error)
+        })
+        return False
+
+    async def _retry_later(self, job_type: str, payload: str, entry_ids: List[str], attempts: int, delay: float) -> None:
+        """Re-queue a failed job after its delay, then ack the entries it replaces"""
+        await asyncio.sleep(delay)
+        try:
+            await redis_client.client.xadd(JOBS_STREAM, {"type": job_type, "payload": payload, "attempts": str(attempts)})
+            await redis_client.client.xack(JOBS_STREAM, CONSUMER_GROUP, *entry_ids)
+        except Exception as e:
+            # The entries are still pending and will be reclaimed
+            jobs_logger.error("job_retry_failed", extra={"type": job_type, "attempts": attempts, "error": str(e)})
+            return
+        jobs_retried.inc(type=job_type)
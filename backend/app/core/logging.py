@@ -1,10 +1,17 @@
 ﻿import logging
 import logging.config
-import json
+import atexit
+import copy
+import queue
+import random
+import sys
 import warnings
 from datetime import datetime
+from logging.handlers import QueueHandler, QueueListener
+from typing import Dict, Optional, TextIO
+import orjson
 from pythonjsonlogger import jsonlogger
-from app.core.config import DEBUG, ENVIRONMENT
+from app.core.config import DEBUG, ENVIRONMENT, LOG_QUEUE_SIZE, LOG_SAMPLE_RATES
 
 # Suppress passlib/bcrypt compatibility warning
 warnings.filterwarnings("ignore", message=".*bcrypt version.*")
@@ -13,30 +20,105 @@ logging.getLogger('passlib.handlers.bcrypt').setLevel(logging.ERROR)
 class CustomJsonFormatter(jsonlogger.JsonFormatter):
     def add_fields(self, log_record, record, message_dict):
         super(CustomJsonFormatter, self).add_fields(log_record, record, message_dict)
-        log_record['timestamp'] = datetime.utcnow().isoformat()
-        log_record['environment'] = ENVIRONMENT
+        # Use the record's creation time, formatting may happen later on the listener thread
+        log_record['timestamp'] = datetime.utcfromtimestamp(record.created).isoformat()
+        log_record['environment'] = ENVIRONMENT.value
         log_record['level'] = record.levelname
         log_record['logger'] = record.name
 
-def setup_logging():
+    def jsonify_log_record(self, log_record):
+        """Serialize with orjson, falling back to str() for unknown types"""
+        return orjson.dumps(log_record, default=str).decode()
+
+class SamplingFilter(logging.Filter):
+    """Keep only a fraction of INFO/DEBUG records, keyed by logger name or message"""
+
+    def __init__(self, rates: Dict[str, float]) -> None:
+        super().__init__()
+        self.rates = rates
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if not self.rates or record.levelno >= logging.WARNING:
+            return True
+        rate = self.rates.get(record.msg if isinstance(record.msg, str) else "")
+        if rate is None:
+            rate = self.rates.get(record.name)
+        if rate is None:
+            return True
+        return random.random() < rate
+
+class NonBlockingQueueHandler(QueueHandler):
+    """Queue handler that defers formatting to the listener and drops records when full"""
+
+    def __init__(self, log_queue: queue.Queue) -> None:
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Only merge args and render the traceback here, JSON formatting runs on the listener thread
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+_listener: Optional[QueueListener] = None
+_queue_handler: Optional[NonBlockingQueueHandler] = None
+
+def setup_logging(stream: Optional[TextIO] = None):
+    global _listener, _queue_handler
     if DEBUG:
         logging.basicConfig(
             level=logging.DEBUG,
             format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
         )
     else:
+        if _listener is not None:
+            return
+
         formatter = CustomJsonFormatter('%(timestamp)s %(level)s %(logger)s %(message)s')
-        log_handler = logging.StreamHandler()
+        log_handler = logging.StreamHandler(stream or sys.stderr)
         log_handler.setFormatter(formatter)
-        
+
+        # Request handlers only enqueue records, a background thread formats and writes them
+        log_queue: queue.Queue = queue.Queue(maxsize=LOG_QUEUE_SIZE)
+        _queue_handler = NonBlockingQueueHandler(log_queue)
+        _queue_handler.addFilter(SamplingFilter(LOG_SAMPLE_RATES))
+
+        _listener = QueueListener(log_queue, log_handler, respect_handler_level=True)
+        _listener.start()
+        atexit.register(shutdown_logging)
+
         root_logger = logging.getLogger()
         root_logger.setLevel(logging.INFO)
-        root_logger.addHandler(log_handler)
-        
+        root_logger.addHandler(_queue_handler)
+
         logging.getLogger('redis').setLevel(logging.WARNING)
 
+def shutdown_logging():
+    """Flush queued records and stop the background listener"""
+    global _listener, _queue_handler
+    if _queue_handler is not None:
+        logging.getLogger().removeHandler(_queue_handler)
+        _queue_handler = None
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
 auth_logger = logging.getLogger('app.auth')
 task_logger = logging.getLogger('app.tasks')
 db_logger = logging.getLogger('app.database')
 cache_logger = logging.getLogger('app.cache')
 request_logger = logging.getLogger('app.request')
+jobs_logger = logging.getLogger('app.jobs')
+audit_logger = logging.getLogger('app.audit')
+profile_logger = logging.getLogger('app.profile')
+loop_logger = logging.getLogger('app.loop')
@@ -0,0 +1,126 @@
+import asyncio
+import sys
+import threading
+import time
+import traceback
+from types import FrameType
+from typing import Any, Dict, List, Optional
+from app.core.config import LOOP_MONITOR_ENABLED, LOOP_MONITOR_INTERVAL_MS, LOOP_BLOCK_THRESHOLD_MS
+from app.core.logging import loop_logger
+from app.core.metrics import metrics
+
+# Frames kept from the innermost call outwards when logging a blocked loop
+STACK_LIMIT = 30
+# The max-lag gauge covers roughly one scrape interval
+MAX_LAG_WINDOW = 60.0
+
+loop_lag = metrics.gauge("event_loop_lag_seconds", "Scheduling delay of the last monitor tick")
+loop_lag_max = metrics.gauge("event_loop_lag_max_seconds", "Largest tick delay in the current window")
+loop_lag_total = metrics.counter("event_loop_lag_seconds_total", "Cumulative tick delay")
+loop_stalls = metrics.counter("event_loop_stalls_total", "Ticks delayed past the blocking threshold")
+
+def running_request(frame: Optional[FrameType]) -> Optional[Dict[str, Any]]:
+    """Method, path and endpoint of the ASGI request whose code is on the stack"""
+    found: Optional[Dict[str, Any]] = None
+    while frame is not None:
+        scope = frame.f_locals.get("scope")
+        if isinstance(scope, dict) and scope.get("type") == "http":
+            found = scope
+            # The router adds the endpoint to the scope once a route matches
+            if "endpoint" in scope:
+                break
+        frame = frame.f_back
+    if found is None:
+        return None
+    return {
+        "method": found.get("method"),
+        "path": found.get("path"),
+        "endpoint": getattr(found.get("endpoint"), "__qualname__", None)
+    }
+
+def format_stack(frame: FrameType) -> List[str]:
+    return [f"{entry.filename}:{entry.lineno} in {entry.name}" for entry in traceback.extract_stack(frame, limit=STACK_LIMIT)]
+
+class LoopLagMonitor:
+    """Measures event loop scheduling lag and logs what blocked the loop.
+
+    A tick task sleeps for the interval and records how late it woke up. A
+    watchdog thread notices when the tick is overdue by more than the
+    threshold and captures the loop thread's stack while it is still blocked.
+    """
+
+    def __init__(self, interval_ms: float, threshold_ms: float, enabled: bool = True) -> None:
+        self.interval = interval_ms / 1000
+        self.threshold = threshold_ms / 1000
+        self.enabled = enabled
+        self._task: Optional[asyncio.Task] = None
+        self._watchdog: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._loop_thread = 0
+        self._last_tick = 0.0
+        self._captured = False
+        self._window_start = 0.0
+
+    def start(self) -> None:
+        if not self.enabled or self._task is not None:
+            return
+        self._loop_thread = threading.get_ident()
+        self._last_tick = self._window_start = time.monotonic()
+        self._stop.clear()
+        self._task = asyncio.get_running_loop().create_task(self._tick())
+        self._watchdog = threading.Thread(target=self._watch, name="loop-watchdog", daemon=True)
+        self._watchdog.start()
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._stop.set()
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        await asyncio.to_thread(self._watchdog.join)
+        self._watchdog = None
+
+    async def _tick(self) -> None:
+        while True:
+            started = time.monotonic()
+            await asyncio.sleep(self.interval)
+            now = time.monotonic()
+            self._last_tick = now
+            self.record(max(0.0, now - started - self.interval), now)
+
+    def record(self, lag: float, now: float) -> None:
+        loop_lag.set(lag)
+        loop_lag_total.inc(lag)
+        if now - self._window_start >= MAX_LAG_WINDOW:
+            self._window_start = now
+            loop_lag_max.set(lag)
+        elif lag > loop_lag_max.get():
+            loop_lag_max.set(lag)
+
+        captured, self._captured = self._captured, False
+        if lag >= self.threshold:
+            loop_stalls.inc()
+            loop_logger.warning("event_loop_stall", extra={"lag_ms": round(lag * 1000, 2), "stack_captured": captured})
+
+    def _watch(self) -> None:
+        check_every = min(self.interval, self.threshold) / 2
+        while not self._stop.wait(check_every):
+            overdue = time.monotonic() - self._last_tick - self.interval
+            if overdue < self.threshold or self._captured:
+                continue
+            self._captured = True
+            frame = sys._current_frames().get(self._loop_thread)
+            if frame is None:
+                continue
+            loop_logger.warning("event_loop_blocked", extra={
+                "blocked_ms": round(overdue * 1000, 2),
+                "request": running_request(frame),
+                "stack": format_stack(frame)
+            })
+            del frame
+
+loop_monitor = LoopLagMonitor(LOOP_MONITOR_INTERVAL_MS, LOOP_BLOCK_THRESHOLD_MS, LOOP_MONITOR_ENABLED)
@@ -0,0 +1,246 @@
+import asyncio
+import fnmatch
+import time
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+from redis.exceptions import ResponseError
+
+StreamEntry = Tuple[str, Dict[str, str]]
+
+class _ConsumerGroup:
+    def __init__(self, last_id: str) -> None:
+        self.last_id = last_id
+        # entry id -> (consumer, delivered at)
+        self.pending: Dict[str, Tuple[str, float]] = {}
+
+def _id_key(entry_id: str) -> Tuple[int, int]:
+    ms, _, seq = entry_id.partition("-")
+    return int(ms), int(seq or 0)
+
+def _encode(value: Any) -> Any:
+    # Bytes are kept as written so binary values survive, everything else is stored as str
+    if isinstance(value, bytes):
+        return value
+    return str(value)
+
+def _decode(value: Any) -> Any:
+    # Matches decode_responses=True, which fails the same way on binary values
+    return value.decode() if isinstance(value, bytes) else value
+
+class InMemoryPipeline:
+    """Buffers commands and runs them in order on execute(), like a non-transactional pipeline"""
+
+    def __init__(self, redis: "InMemoryRedis") -> None:
+        self._redis = redis
+        self._commands: List[Tuple[str, tuple, dict]] = []
+
+    def __getattr__(self, name: str) -> Any:
+        def queue(*args: Any, **kwargs: Any) -> "InMemoryPipeline":
+            self._commands.append((name, args, kwargs))
+            return self
+        return queue
+
+    async def execute(self) -> List[Any]:
+        commands, self._commands = self._commands, []
+        return [await getattr(self._redis, name)(*args, **kwargs) for name, args, kwargs in commands]
+
+class InMemoryRedis:
+    """Process-local stand-in for redis.asyncio.Redis covering the commands this app uses"""
+
+    def __init__(self) -> None:
+        self._values: Dict[str, Any] = {}
+        self._expires: Dict[str, float] = {}
+        self._groups: Dict[str, Dict[str, _ConsumerGroup]] = {}
+        self._last_stream_id: Dict[str, str] = {}
+        self._stream_added = asyncio.Event()
+
+    def _alive(self, key: str) -> bool:
+        expires_at = self._expires.get(key)
+        if expires_at is not None and expires_at <= time.monotonic():
+            self._values.pop(key, None)
+            self._expires.pop(key, None)
+        return key in self._values
+
+    async def ping(self) -> bool:
+        return True
+
+    async def aclose(self, close_connection_pool: Optional[bool] = None) -> None:
+        pass
+
+    async def flushdb(self) -> bool:
+        self._values.clear()
+        self._expires.clear()
+        self._groups.clear()
+        return True
+
+    def pipeline(self, transaction: bool = True) -> InMemoryPipeline:
+        return InMemoryPipeline(self)
+
+    def _get_raw(self, key: str) -> Optional[bytes]:
+        if not self._alive(key):
+            return None
+        value = self._values[key]
+        if not isinstance(value, (str, bytes)):
+            raise ResponseError("WRONGTYPE Operation against a key holding the wrong kind of value")
+        return value.encode() if isinstance(value, str) else value
+
+    async def get(self, key: str) -> Optional[str]:
+        value = self._get_raw(key)
+        return None if value is None else _decode(value)
+
+    async def execute_command(self, *args: Any, **options: Any) -> Any:
+        """Raw GET/MGET as used with NEVER_DECODE, values come back as bytes"""
+        command, keys = str(args[0]).upper(), args[1:]
+        if command == "GET":
+            return self._get_raw(keys[0])
+        if command == "MGET":
+            return [self._get_raw(key) for key in keys]
+        raise ResponseError(f"ERR unknown command '{command}'")
+
+    async def memory_usage(self, key: str, samples: Optional[int] = None) -> Optional[int]:
+        """Rough stand-in for MEMORY USAGE: payload size plus a fixed per-key overhead"""
+        value = self._get_raw(key)
+        return None if value is None else len(key) + len(value) + 56
+
+    async def mget(self, keys: List[str], *args: str) -> List[Optional[str]]:
+        keys = [keys] if isinstance(keys, str) else list(keys)
+        return [await self.get(key) for key in [*keys, *args]]
+
+    async def set(self, key: str, value: Any, ex: Optional[int] = None, px: Optional[int] = None,
+                  nx: bool = False, xx: bool = False) -> Optional[bool]:
+        exists = self._alive(key)
+        if (nx and exists) or (xx and not exists):
+            return None
+        self._values[key] = _encode(value)
+        self._expires.pop(key, None)
+        if ex is not None:
+            self._expires[key] = time.monotonic() + ex
+        elif px is not None:
+            self._expires[key] = time.monotonic() + px / 1000
+        return True
+
+    async def setex(self, key: str, seconds: int, value: Any) -> bool:
+        return await self.set(key, value, ex=seconds)
+
+    async def incr(self, key: str, amount: int = 1) -> int:
+        value = int(await self.get(key) or 0) + amount
+        self._values[key] = str(value)
+        return value
+
+    async def delete(self, *keys: str) -> int:
+        deleted = 0
+        for key in keys:
+            if self._alive(key):
+                deleted += 1
+            self._values.pop(key, None)
+            self._expires.pop(key, None)
+            self._groups.pop(key, None)
+        return deleted
+
+    async def exists(self, *keys: str) -> int:
+        return sum(1 for key in keys if self._alive(key))
+
+    async def keys(self, pattern: str = "*") -> List[str]:
+        return [key for key in list(self._values) if self._alive(key) and fnmatch.fnmatchcase(key, pattern)]
+
+    async def scan_iter(self, match: str = "*", count: Optional[int] = None) -> AsyncIterator[str]:
+        for key in await self.keys(match):
+            yield key
+
+    async def expire(self, key: str, seconds: int) -> bool:
+        if not self._alive(key):
+            return False
+        self._expires[key] = time.monotonic() + seconds
+        return True
+
+    async def ttl(self, key: str) -> int:
+        if not self._alive(key):
+            return -2
+        expires_at = self._expires.get(key)
+        return -1 if expires_at is None else max(0, round(expires_at - time.monotonic()))
+
+    async def xadd(self, name: str, fields: Dict[str, Any], id: str = "*", maxlen: Optional[int] = None,
+                   approximate: bool = True) -> str:
+        stream: List[StreamEntry] = self._values.setdefault(name, [])
+        ms = int(time.time() * 1000)
+        last_ms, last_seq = _id_key(self._last_stream_id.get(name, "0-0"))
+        entry_id = f"{ms}-0" if ms > last_ms else f"{last_ms}-{last_seq + 1}"
+        self._last_stream_id[name] = entry_id
+        stream.append((entry_id, {key: _decode(_encode(value)) for key, value in fields.items()}))
+        if maxlen is not None and len(stream) > maxlen:
+            del stream[:len(stream) - maxlen]
+        self._stream_added.set()
+        return entry_id
+
+    async def xlen(self, name: str) -> int:
+        return len(self._values.get(name, []))
+
+    async def xtrim(self, name: str, maxlen: Optional[int] = None, approximate: bool = True,
+                    minid: Optional[str] = None, limit: Optional[int] = None) -> int:
+        stream: List[StreamEntry] = self._values.get(name, [])
+        if minid is not None:
+            keep = [entry for entry in stream if _id_key(entry[0]) >= _id_key(minid)]
+        else:
+            keep = stream[max(0, len(stream) - maxlen):] if maxlen is not None else stream
+        removed = len(stream) - len(keep)
+        stream[:] = keep
+        return removed
+
+    async def xinfo_groups(self, name: str) -> List[Dict[str, Any]]:
+        return [
+            {"name": groupname, "pending": len(group.pending), "last-delivered-id": group.last_id}
+            for groupname, group in self._groups.get(name, {}).items()
+        ]
+
+    async def xpending(self, name: str, groupname: str) -> Dict[str, Any]:
+        ids = sorted(self._groups[name][groupname].pending, key=_id_key)
+        return {"pending": len(ids), "min": ids[0] if ids else None, "max": ids[-1] if ids else None, "consumers": []}
+
+    async def xgroup_create(self, name: str, groupname: str, id: str = "$", mkstream: bool = False) -> bool:
+        if name not in self._values:
+            if not mkstream:
+                raise ResponseError("ERR The XGROUP subcommand requires the key to exist")
+            self._values[name] = []
+        groups = self._groups.setdefault(name, {})
+        if groupname in groups:
+            raise ResponseError("BUSYGROUP Consumer Group name already exists")
+        groups[groupname] = _ConsumerGroup(self._last_stream_id.get(name, "0-0") if id == "$" else id)
+        return True
+
+    async def xreadgroup(self, groupname: str, consumername: str, streams: Dict[str, str],
+                         count: Optional[int] = None, block: Optional[int] = None, noack: bool = False) -> List[Any]:
+        name = next(iter(streams))
+        group = self._groups[name][groupname]
+        entries = [entry for entry in self._values.get(name, []) if _id_key(entry[0]) > _id_key(group.last_id)][:count]
+        if not entries and block is not None:
+            self._stream_added.clear()
+            try:
+                await asyncio.wait_for(self._stream_added.wait(), timeout=block / 1000 if block else None)
+            except asyncio.TimeoutError:
+                return []
+            return await self.xreadgroup(groupname, consumername, streams, count=count)
+        if not entries:
+            return []
+        group.last_id = entries[-1][0]
+        if not noack:
+            for entry_id, _ in entries:
+                group.pending[entry_id] = (consumername, time.monotonic())
+        return [[name, entries]]
+
+    async def xack(self, name: str, groupname: str, *ids: str) -> int:
+        group = self._groups[name][groupname]
+        return sum(1 for entry_id in ids if group.pending.pop(entry_id, None) is not None)
+
+    async def xautoclaim(self, name: str, groupname: str, consumername: str, min_idle_time: int,
+                         start_id: str = "0-0", count: Optional[int] = None) -> List[Any]:
+        group = self._groups[name][groupname]
+        now = time.monotonic()
+        by_id = dict(self._values.get(name, []))
+        claimed: List[StreamEntry] = []
+        for entry_id, (_, delivered_at) in sorted(group.pending.items(), key=lambda item: _id_key(item[0])):
+            if count is not None and len(claimed) >= count:
+                break
+            if (now - delivered_at) * 1000 >= min_idle_time:
+                group.pending[entry_id] = (consumername, now)
+                # Like Redis 6.2, entries trimmed from the stream stay pending and come back without fields
+                claimed.append((entry_id, by_id.get(entry_id, {})))
+        return ["0-0", claimed, []]
@@ -0,0 +1,184 @@
+import asyncio
+import cProfile
+import hashlib
+import hmac
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from types import FrameType
+from typing import Any, Dict, List, Optional, Tuple
+from app.core.config import PROFILE_SIGNING_KEY, PROFILE_DIR
+from app.core.logging import profile_logger
+
+PROFILE_HEADER = "x-profile"
+PROFILE_FILE_HEADER = "x-profile-file"
+
+Stack = Tuple[str, ...]
+
+class ProfilerBusy(Exception):
+    """Raised when a sampling profile is already running in this worker"""
+
+def frame_label(frame: FrameType) -> str:
+    code = frame.f_code
+    # Semicolons separate frames in the collapsed format
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})".replace(";", ":")
+
+def collect_stack(frame: Optional[FrameType]) -> Stack:
+    """Frame labels from the outermost call to the innermost"""
+    labels: List[str] = []
+    while frame is not None:
+        labels.append(frame_label(frame))
+        frame = frame.f_back
+    return tuple(reversed(labels))
+
+class StackSampler:
+    """Background thread that samples one thread's stack at a fixed interval"""
+
+    def __init__(self, thread_id: int, interval: float) -> None:
+        self.thread_id = thread_id
+        self.interval = interval
+        self.counts: Counter = Counter()
+        self.duration = 0.0
+        self._started = 0.0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+
+    def start(self) -> None:
+        self._started = time.perf_counter()
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+        self.duration = time.perf_counter() - self._started
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is not None:
+                self.counts[collect_stack(frame)] += 1
+            del frame
+
+    def collapsed(self) -> str:
+        """Brendan Gregg's folded format, one "a;b;c <count>" line per stack"""
+        return "".join(f"{';'.join(stack)} {count}\n" for stack, count in self.counts.most_common())
+
+    def speedscope(self, name: str) -> Dict[str, Any]:
+        """Sampled profile in speedscope's file format, weighted in seconds"""
+        frames: Dict[str, int] = {}
+        samples: List[List[int]] = []
+        weights: List[float] = []
+        for stack, count in self.counts.most_common():
+            samples.append([frames.setdefault(label, len(frames)) for label in stack])
+            weights.append(count * self.interval)
+        return {
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "name": name,
+            "exporter": "task-api",
+            "shared": {"frames": [{"name": label} for label in frames]},
+            "profiles": [{
+                "type": "sampled",
+                "name": name,
+                "unit": "seconds",
+                "startValue": 0,
+                "endValue": self.duration,
+                "samples": samples,
+                "weights": weights,
+            }],
+        }
+
+_sampling = asyncio.Lock()
+
+async def sample_event_loop(seconds: float, interval: float) -> StackSampler:
+    """Sample the calling event loop's thread for the given time, one run per worker at a time"""
+    if _sampling.locked():
+        raise ProfilerBusy("A profile is already running in this worker")
+    async with _sampling:
+        sampler = StackSampler(threading.get_ident(), interval)
+        sampler.start()
+        try:
+            await asyncio.sleep(seconds)
+        finally:
+            sampler.stop()
+        profile_logger.info("sampling_profile_taken", extra={
+            "seconds": round(sampler.duration, 3),
+            "samples": sum(sampler.counts.values()),
+            "stacks": len(sampler.counts)
+        })
+        return sampler
+
+def _signature(expires_at: int) -> str:
+    return hmac.new(PROFILE_SIGNING_KEY.encode(), str(expires_at).encode(), hashlib.sha256).hexdigest()
+
+def sign_profile_header(ttl: int) -> Tuple[str, int]:
+    """X-Profile header value valid for ttl seconds, and its expiry as a Unix time"""
+    expires_at = int(time.time()) + ttl
+    return f"{expires_at}.{_signature(expires_at)}", expires_at
+
+def verify_profile_header(value: str) -> bool:
+    expires, _, signature = value.partition(".")
+    if not PROFILE_SIGNING_KEY or not expires.isdigit() or int(expires) < time.time():
+        return False
+    return hmac.compare_digest(signature, _signature(int(expires)))
+
+def profile_path(method: str, path: str) -> str:
+    slug = re.sub(r"[^A-Za-z0-9]+", "_", path).strip("_") or "root"
+    return os.path.join(PROFILE_DIR, f"{int(time.time() * 1000)}-{os.getpid()}-{method}-{slug}.prof")
+
+def write_profile(profiler: cProfile.Profile, path: str) -> None:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    profiler.dump_stats(path)
+
+class RequestProfilerMiddleware:
+    """Profile a request with cProfile when it carries a valid signed X-Profile header.
+
+    Only installed when PROFILE_SIGNING_KEY is set. Requests without the header
+    pay one header scan. The profiler sees the whole event loop thread, so work
+    from requests running concurrently shows up in the profile too.
+    """
+
+    def __init__(self, app) -> None:
+        self.app = app
+        self._active = False
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        value = next((v for k, v in scope["headers"] if k == PROFILE_HEADER.encode()), None)
+        if value is None:
+            await self.app(scope, receive, send)
+            return
+        if not verify_profile_header(value.decode("latin-1")):
+            profile_logger.warning("profile_header_rejected", extra={"path": scope["path"]})
+            await self.app(scope, receive, send)
+            return
+        if self._active:
+            profile_logger.info("request_profile_skipped", extra={"path": scope["path"], "reason": "busy"})
+            await self.app(scope, receive, send)
+            return
+
+        path = profile_path(scope["method"], scope["path"])
+
+        async def send_wrapper(message) -> None:
+            if message["type"] == "http.response.start":
+                message["headers"] = [*message.get("headers", []), (PROFILE_FILE_HEADER.encode(), os.path.basename(path).encode())]
+            await send(message)
+
+        self._active = True
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            profiler.disable()
+            self._active = False
+            try:
+                await asyncio.to_thread(write_profile, profiler, path)
+            except OSError as e:
+                profile_logger.warning("request_profile_write_failed", extra={"file": path, "error": str(e)})
+            else:
+                profile_logger.info("request_profile_written", extra={"path": scope["path"], "file": path})
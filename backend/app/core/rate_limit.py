@@ -5,7 +5,7 @@ from fastapi import Request
 from app.core.config import RATE_LIMIT_ENABLED
 from app.core.logging import request_logger
 
-limiter = Limiter(key_func=get_remote_address)
+limiter = Limiter(key_func=get_remote_address, enabled=RATE_LIMIT_ENABLED)
 
 async def rate_limit_error_handler(request: Request, exc: RateLimitExceeded) -> dict:
     """Handle rate limit exceeded errors"""
@@ -1,53 +1,206 @@
 ﻿import redis.asyncio as redis
-from typing import Optional
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional, Union
+import asyncio
 import json
+import time
+from redis.asyncio.retry import Retry
+from redis.backoff import FullJitterBackoff
+from redis.client import NEVER_DECODE
+from redis.exceptions import ConnectionError as RedisConnectionError, TimeoutError as RedisTimeoutError
+from app.core.circuit_breaker import CircuitBreaker
+from app.core.codec import build_codec
+from app.core.config import (
+    REDIS_BREAKER_FAILURE_THRESHOLD, REDIS_BREAKER_RESET_TIMEOUT, REDIS_PENDING_WRITES_MAX,
+    CACHE_CODEC, CACHE_COMPRESSION, CACHE_COMPRESS_MIN_BYTES
+)
+from app.core.deadline import run_with_deadline
+from app.core.logging import cache_logger
+from app.core.metrics import metrics
+
+# Errors that mean Redis is unreachable or stalled, as opposed to a bad command
+UNAVAILABLE_ERRORS = (RedisConnectionError, RedisTimeoutError)
+
+# Takes the connected client and returns the awaitable to run, so buffered writes can be re-sent
+Command = Callable[[redis.Redis], Awaitable[Any]]
+
+redis_fallbacks = metrics.counter("redis_fallbacks_total", "Redis calls skipped, dropped or buffered while Redis was unavailable")
 
 class RedisClient:
     def __init__(self) -> None:
         self.client: Optional[redis.Redis] = None
+        self.breaker = CircuitBreaker(
+            "redis", REDIS_BREAKER_FAILURE_THRESHOLD, REDIS_BREAKER_RESET_TIMEOUT, on_close=self._schedule_replay
+        )
+        # Invalidations and revocations that must still reach Redis once it is back
+        self._pending: Deque[Command] = deque()
+        self._replay_task: Optional[asyncio.Task] = None
+        # Encodes cached objects, strings stored with set() are left as they are
+        self.codec = build_codec(CACHE_CODEC, CACHE_COMPRESSION, CACHE_COMPRESS_MIN_BYTES)
 
     async def connect(self) -> None:
-        from app.core.config import REDIS_URL
-        self.client = await redis.from_url(REDIS_URL, decode_responses=True)
+        from app.core.config import (
+            REDIS_URL, REDIS_POOL_MAX_SIZE, REDIS_POOL_TIMEOUT, REDIS_SOCKET_TIMEOUT, REDIS_CONNECT_TIMEOUT,
+            REDIS_RETRY_ATTEMPTS, REDIS_RETRY_BASE_MS, REDIS_RETRY_CAP_MS, REDIS_HEALTH_CHECK_INTERVAL
+        )
+        if REDIS_URL.startswith("memory://"):
+            # Process-local fake for tests and benchmarks, every connect starts empty
+            from app.core.memory_redis import InMemoryRedis
+            self.client = InMemoryRedis()
+            return
+        # Blocking pool caps connections per worker and waits for a free one instead of erroring
+        pool = redis.BlockingConnectionPool.from_url(
+            REDIS_URL,
+            max_connections=REDIS_POOL_MAX_SIZE,
+            timeout=REDIS_POOL_TIMEOUT,
+            socket_timeout=REDIS_SOCKET_TIMEOUT,
+            socket_connect_timeout=REDIS_CONNECT_TIMEOUT,
+            # Full jitter keeps workers that lost Redis together from retrying in lockstep
+            retry=Retry(FullJitterBackoff(cap=REDIS_RETRY_CAP_MS / 1000, base=REDIS_RETRY_BASE_MS / 1000), REDIS_RETRY_ATTEMPTS),
+            retry_on_error=list(UNAVAILABLE_ERRORS),
+            health_check_interval=REDIS_HEALTH_CHECK_INTERVAL,
+            decode_responses=True
+        )
+        self.client = redis.Redis(connection_pool=pool)
+        # Open the first connection now rather than on the first request
+        await self.client.ping()
 
     async def disconnect(self) -> None:
+        if self._replay_task is not None:
+            self._replay_task.cancel()
+            self._replay_task = None
         if self.client:
-            await self.client.close()
+            await self.client.aclose(close_connection_pool=True)
+            self.client = None
+
+    @property
+    def available(self) -> bool:
+        """False while the breaker is open or probing, callers can skip optional cache work"""
+        return self.breaker.is_closed
 
-    async def set(self, key: str, value: str, expire: int = 3600) -> None:
+    async def _call(self, command: Command, fallback: Any = None, buffered: bool = False,
+                    compensate: Optional[Command] = None) -> Any:
+        """Run a command through the breaker, returning the fallback while Redis is unavailable.
+
+        Buffered commands are kept and re-sent once the breaker closes again.
+        A compensating command is buffered instead, e.g. a DEL for a SET that
+        could not be sent and would otherwise leave an older value in place.
+        """
         if not self.client:
             raise RuntimeError("Redis client not connected")
-        await self.client.set(key, value, ex=expire)
+        if not self.breaker.allow():
+            self._degrade(compensate or (command if buffered else None))
+            return fallback
+        try:
+            result = await run_with_deadline(command(self.client), "redis")
+        except UNAVAILABLE_ERRORS as e:
+            self.breaker.record_failure()
+            cache_logger.warning("redis_unavailable", extra={"error": str(e), "error_type": type(e).__name__})
+            self._degrade(compensate or (command if buffered else None))
+            return fallback
+        except BaseException:
+            # Deadline, cancellation or a command error: says nothing about Redis health
+            self.breaker.release()
+            raise
+        self.breaker.record_success()
+        return result
+
+    def _degrade(self, command: Optional[Command]) -> None:
+        if command is None:
+            redis_fallbacks.inc(action="skipped")
+            return
+        if len(self._pending) >= REDIS_PENDING_WRITES_MAX:
+            self._pending.popleft()
+            redis_fallbacks.inc(action="buffer_overflow")
+        self._pending.append(command)
+        redis_fallbacks.inc(action="buffered")
+
+    def _schedule_replay(self) -> None:
+        if self._pending and (self._replay_task is None or self._replay_task.done()):
+            self._replay_task = asyncio.get_running_loop().create_task(self._replay())
+
+    async def _replay(self) -> None:
+        replayed = 0
+        while self._pending and self.breaker.is_closed:
+            await self._call(self._pending.popleft(), buffered=True)
+            replayed += 1
+        cache_logger.info("redis_pending_writes_replayed", extra={"count": replayed, "remaining": len(self._pending)})
+
+    async def set(self, key: str, value: str, expire: int = 3600, buffered: bool = False) -> None:
+        """SET with a TTL, dropped while Redis is unavailable unless buffered"""
+        expires_at = time.monotonic() + expire
+
+        async def command(client: redis.Redis) -> None:
+            # A replayed SET keeps its original expiry
+            remaining = max(1, int(expires_at - time.monotonic()))
+            await client.set(key, value, ex=remaining)
+        await self._call(command, buffered=buffered)
 
     async def get(self, key: str) -> Optional[str]:
-        if not self.client:
-            raise RuntimeError("Redis client not connected")
-        return await self.client.get(key)
+        return await self._call(lambda client: client.get(key))
 
-    async def delete(self, key: str) -> None:
-        if not self.client:
-            raise RuntimeError("Redis client not connected")
-        await self.client.delete(key)
+    async def delete(self, *keys: str) -> None:
+        """DEL, buffered while Redis is unavailable so stale entries still go away later"""
+        await self._call(lambda client: client.delete(*keys), buffered=True)
+
+    async def delete_matching(self, pattern: str) -> None:
+        """DEL every key matching a glob pattern, buffered like delete"""
+        async def command(client: redis.Redis) -> None:
+            keys = await client.keys(pattern)
+            if keys:
+                await client.delete(*keys)
+        await self._call(command, buffered=True)
 
     async def exists(self, key: str) -> bool:
-        if not self.client:
-            raise RuntimeError("Redis client not connected")
-        return await self.client.exists(key)
+        return await self._call(lambda client: client.exists(key), fallback=False)
 
     async def setex(self, key: str, seconds: int, value: str) -> None:
-        if not self.client:
-            raise RuntimeError("Redis client not connected")
-        await self.client.setex(key, seconds, value)
+        await self._call(lambda client: client.setex(key, seconds, value))
 
-    async def get_json(self, key: str) -> Optional[dict]:
-        if not self.client:
-            raise RuntimeError("Redis client not connected")
-        data = await self.client.get(key)
-        return json.loads(data) if data else None
+    async def xadd(self, name: str, fields: Dict[str, str]) -> Optional[str]:
+        """XADD, None while Redis is unavailable"""
+        return await self._call(lambda client: client.xadd(name, fields))
 
-    async def set_json(self, key: str, value: dict, expire: int = 3600) -> None:
-        if not self.client:
-            raise RuntimeError("Redis client not connected")
-        await self.client.set(key, json.dumps(value), ex=expire)
+    async def get_value(self, key: str) -> Any:
+        """GET and decode an object written with set_value, None on a miss"""
+        data = await self._call(lambda client: client.execute_command("GET", key, **{NEVER_DECODE: True}))
+        return self.codec.decode(data) if data is not None else None
+
+    async def set_value(self, key: str, value: Any, expire: int = 3600) -> None:
+        """Encode an object with the configured codec and SET it with a TTL"""
+        data = self.codec.encode(value)
+        await self._call(lambda client: client.set(key, data, ex=expire))
+
+    async def get_values(self, keys: List[str]) -> List[Any]:
+        """MGET and decode several objects, None for misses"""
+        if not keys:
+            return []
+        values = await self._call(
+            lambda client: client.execute_command("MGET", *keys, **{NEVER_DECODE: True}), fallback=[None] * len(keys)
+        )
+        return [self.codec.decode(data) if data is not None else None for data in values]
+
+    async def set_values(self, values: Dict[str, Any], expire: int = 3600) -> None:
+        """Encode and SET several objects with one TTL in a single round trip"""
+        await self.set_many({key: self.codec.encode(value) for key, value in values.items()}, expire=expire)
+
+    async def mget(self, keys: List[str]) -> List[Optional[str]]:
+        if not keys:
+            return []
+        return await self._call(lambda client: client.mget(keys), fallback=[None] * len(keys))
+
+    async def set_many(self, values: Dict[str, Union[str, bytes]], expire: int = 3600) -> None:
+        """SET several keys with one TTL in a single round trip, a buffered DEL of them when it can't be sent"""
+        if not values:
+            return
+
+        def command(client: redis.Redis) -> Awaitable[Any]:
+            pipe = client.pipeline(transaction=False)
+            for key, value in values.items():
+                pipe.set(key, value, ex=expire)
+            return pipe.execute()
+        # Write-through callers rely on the new value replacing the old one
+        keys = list(values)
+        await self._call(command, compensate=lambda client: client.delete(*keys))
 
 redis_client = RedisClient()
@@ -1,8 +1,12 @@
 ﻿from passlib.context import CryptContext
+from collections import OrderedDict
 from datetime import datetime, timedelta
 from typing import Optional, Dict, Any
+import time
 from jose import JWTError, jwt
-from app.core.config import JWT_SECRET_KEY, JWT_ALGORITHM, JWT_ACCESS_TOKEN_EXPIRE_MINUTES, TOKEN_BLACKLIST_EXPIRE_MINUTES
+from app.core.config import (
+    JWT_SECRET_KEY, JWT_ALGORITHM, JWT_ACCESS_TOKEN_EXPIRE_MINUTES, TOKEN_BLACKLIST_EXPIRE_MINUTES, REVOCATION_CACHE_SIZE
+)
 from app.core.redis import redis_client
 
 pwd_context: CryptContext = CryptContext(schemes=["bcrypt"], deprecated="auto")
@@ -30,9 +34,40 @@ def decode_access_token(token: str) -> Optional[Dict[str, Any]]:
     except JWTError:
         return None
 
+class RevocationCache:
+    """Tokens this worker revoked or saw revoked, still checked while Redis is unavailable"""
+
+    def __init__(self, max_size: int) -> None:
+        self.max_size = max_size
+        self._expires: "OrderedDict[str, float]" = OrderedDict()
+
+    def add(self, token: str, ttl: float) -> None:
+        self._expires[token] = time.monotonic() + ttl
+        self._expires.move_to_end(token)
+        while len(self._expires) > self.max_size:
+            self._expires.popitem(last=False)
+
+    def __contains__(self, token: str) -> bool:
+        expires_at = self._expires.get(token)
+        if expires_at is None:
+            return False
+        if expires_at <= time.monotonic():
+            del self._expires[token]
+            return False
+        return True
+
+revoked_tokens = RevocationCache(REVOCATION_CACHE_SIZE)
+
 async def blacklist_token(token: str, expires_in: int = TOKEN_BLACKLIST_EXPIRE_MINUTES * 60) -> None:
-    await redis_client.set(f"blacklist:{token}", "true", expire=expires_in)
+    revoked_tokens.add(token, expires_in)
+    # Buffered, other workers must see the revocation once Redis is back
+    await redis_client.set(f"blacklist:{token}", "true", expire=expires_in, buffered=True)
 
 async def is_token_blacklisted(token: str) -> bool:
+    if token in revoked_tokens:
+        return True
     result = await redis_client.get(f"blacklist:{token}")
-    return result is not None
+    if result is not None:
+        revoked_tokens.add(token, TOKEN_BLACKLIST_EXPIRE_MINUTES * 60)
+        return True
+    return False
@@ -0,0 +1,118 @@
+import asyncio
+import contextvars
+import json
+import asyncpg
+from collections import defaultdict
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+from app.core.config import TASK_EVENTS_ENABLED, TASK_EVENTS_FLUSH_MS, TASK_EVENTS_FLUSH_ROWS, TASK_EVENTS_QUEUE_SIZE
+from app.core.logging import db_logger
+from app.core.metrics import metrics
+from app.database.connection import Database
+from app.database.sharding import shards
+
+EVENT_COLUMNS = ["task_id", "user_id", "event", "changes", "created_at"]
+
+EventRecord = Tuple[int, int, str, Optional[str], datetime]
+
+# Queued by stop() behind the last events so the flusher writes them and exits
+_STOP = object()
+
+events_written = metrics.counter("task_events_written_total", "Task history rows written with COPY")
+event_flushes = metrics.counter("task_event_flushes_total", "COPY statements issued for task history")
+events_dropped = metrics.counter("task_events_dropped_total", "Task history rows lost to failed writes")
+events_backpressure = metrics.counter("task_events_backpressure_total", "Events that waited for room in a full queue")
+
+class TaskEventBuffer:
+    """Collects task change events in a bounded per-worker queue and COPYs them into task_events in batches.
+
+    Events are only recorded between start() and stop(). A full queue makes
+    record() wait, so a stalled database slows writers down instead of
+    growing memory or losing history.
+    """
+
+    def __init__(self, flush_ms: float, flush_rows: int, queue_size: int, enabled: bool = True) -> None:
+        self.window = flush_ms / 1000
+        self.max_rows = flush_rows
+        self.queue_size = queue_size
+        self.enabled = enabled
+        self.queue: Optional[asyncio.Queue] = None
+        self._batch_full: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+
+    async def record(self, task_id: int, user_id: int, event: str, changes: Optional[Dict[str, Any]] = None) -> None:
+        if self._task is None:
+            return
+        entry: EventRecord = (task_id, user_id, event, json.dumps(changes) if changes is not None else None, datetime.utcnow())
+        if self.queue.full():
+            events_backpressure.inc()
+        await self.queue.put(entry)
+        # The flusher already took one event off the queue for the batch it is collecting
+        if self.queue.qsize() >= self.max_rows - 1:
+            self._batch_full.set()
+
+    def start(self) -> None:
+        if not self.enabled or self._task is not None:
+            return
+        self.queue = asyncio.Queue(maxsize=self.queue_size)
+        self._batch_full = asyncio.Event()
+        # Writes are not bounded by the deadline of whichever request started the buffer
+        self._task = asyncio.get_running_loop().create_task(self._run(), context=contextvars.Context())
+
+    async def stop(self) -> None:
+        """Write everything queued so far, then stop recording"""
+        if self._task is None:
+            return
+        await self.queue.put(_STOP)
+        self._batch_full.set()
+        task, self._task = self._task, None
+        await task
+
+    async def _run(self) -> None:
+        while True:
+            batch: List[Any] = [await self.queue.get()]
+            self._batch_full.clear()
+            if batch[0] is not _STOP and self.queue.qsize() < self.max_rows - 1:
+                try:
+                    await asyncio.wait_for(self._batch_full.wait(), self.window)
+                except asyncio.TimeoutError:
+                    pass
+            while len(batch) < self.max_rows and not self.queue.empty():
+                batch.append(self.queue.get_nowait())
+            records = [entry for entry in batch if entry is not _STOP]
+            if records:
+                await self._write(records)
+            if len(records) < len(batch):
+                return
+
+    async def _write(self, records: List[EventRecord]) -> None:
+        by_shard: Dict[Database, List[EventRecord]] = defaultdict(list)
+        for record in records:
+            by_shard[shards.for_user(record[1])].append(record)
+        await asyncio.gather(*(self._copy(shard, rows) for shard, rows in by_shard.items()))
+
+    async def _copy(self, shard: Database, records: List[EventRecord]) -> None:
+        try:
+            try:
+                await self._copy_rows(shard, records)
+            except asyncpg.ForeignKeyViolationError:
+                # A user whose row never reached this shard, copy it over and try once more
+                await shards.ensure_users(record[1] for record in records)
+                await self._copy_rows(shard, records)
+        except Exception as e:
+            events_dropped.inc(len(records))
+            db_logger.error("task_events_write_failed", extra={"rows": len(records), "error": str(e), "error_type": type(e).__name__})
+            return
+        event_flushes.inc()
+        events_written.inc(len(records))
+
+    async def _copy_rows(self, shard: Database, records: List[EventRecord]) -> None:
+        async with shard.acquire() as connection:
+            await connection.copy_records_to_table("task_events", records=records, columns=EVENT_COLUMNS)
+
+task_event_buffer = TaskEventBuffer(
+    flush_ms=TASK_EVENTS_FLUSH_MS,
+    flush_rows=TASK_EVENTS_FLUSH_ROWS,
+    queue_size=TASK_EVENTS_QUEUE_SIZE,
+    enabled=TASK_EVENTS_ENABLED
+)
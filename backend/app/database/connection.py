@@ -1,39 +1,98 @@
-﻿import asyncpg
-from typing import Optional, List, Dict, Any
-from app.core.config import DATABASE_URL, DATABASE_POOL_MIN_SIZE, DATABASE_POOL_MAX_SIZE, DATABASE_COMMAND_TIMEOUT
+﻿import asyncio
+import asyncpg
+import time
+from contextlib import asynccontextmanager
+from typing import Optional, List, Dict, Any, AsyncIterator
+from app.core.config import (
+    DATABASE_URL, DATABASE_POOL_MIN_SIZE, DATABASE_POOL_MAX_SIZE, DATABASE_COMMAND_TIMEOUT,
+    DATABASE_POOL_ACQUIRE_TIMEOUT, DATABASE_POOL_CLOSE_TIMEOUT, DATABASE_SCHEMA
+)
+from app.core.deadline import remaining_budget, stage
+
+# The acquire-wait average halves for every this many seconds without an acquire,
+# so a pool that stopped being used does not report its last busy spell
+ACQUIRE_WAIT_HALF_LIFE = 1.0
+
+class PoolExhaustedError(Exception):
+    """Raised when no pool connection became free within DATABASE_POOL_ACQUIRE_TIMEOUT"""
 
 class Database:
-    def __init__(self) -> None:
+    def __init__(self, url: Optional[str] = None) -> None:
+        self.url = url or DATABASE_URL
         self.pool: Optional[asyncpg.Pool] = None
+        # Pool pressure, read by the admission controller
+        self.waiting: int = 0
+        self.acquire_wait_ewma: float = 0.0
+        self.last_acquire_at: float = 0.0
 
     async def connect(self) -> None:
         # Remove +asyncpg driver from URL for asyncpg.create_pool
-        url = DATABASE_URL.replace("+asyncpg", "")
+        url = self.url.replace("+asyncpg", "")
         self.pool = await asyncpg.create_pool(
             url,
             min_size=DATABASE_POOL_MIN_SIZE,
             max_size=DATABASE_POOL_MAX_SIZE,
-            command_timeout=DATABASE_COMMAND_TIMEOUT
+            command_timeout=DATABASE_COMMAND_TIMEOUT,
+            server_settings={"search_path": DATABASE_SCHEMA} if DATABASE_SCHEMA else None
         )
 
     async def disconnect(self) -> None:
         if self.pool:
-            await self.pool.close()
+            # Let in-flight queries finish, then drop whatever is still busy
+            try:
+                await asyncio.wait_for(self.pool.close(), DATABASE_POOL_CLOSE_TIMEOUT)
+            except asyncio.TimeoutError:
+                self.pool.terminate()
+            self.pool = None
+
+    @asynccontextmanager
+    async def acquire(self) -> AsyncIterator[asyncpg.Connection]:
+        """Acquire a pool connection, tracking waiters and wait time"""
+        timeout = remaining_budget("db_pool", cap=DATABASE_POOL_ACQUIRE_TIMEOUT)
+        self.waiting += 1
+        start = time.perf_counter()
+        try:
+            with stage("db_pool"):
+                connection = await self.pool.acquire(timeout=timeout)
+        except asyncio.TimeoutError:
+            raise PoolExhaustedError("Timed out waiting for a database connection")
+        finally:
+            self.waiting -= 1
+            self._record_acquire_wait(time.perf_counter() - start)
+        try:
+            yield connection
+        finally:
+            await self.pool.release(connection)
+
+    def recent_acquire_wait(self) -> float:
+        """The acquire-wait average decayed by the time since the last acquire"""
+        idle = time.monotonic() - self.last_acquire_at
+        return self.acquire_wait_ewma * 0.5 ** (idle / ACQUIRE_WAIT_HALF_LIFE)
+
+    def _record_acquire_wait(self, seconds: float) -> None:
+        # Exponentially weighted moving average of recent acquire waits, decayed
+        # first so a sample after a quiet spell is not blended with stale pressure
+        self.acquire_wait_ewma = 0.8 * self.recent_acquire_wait() + 0.2 * seconds
+        self.last_acquire_at = time.monotonic()
 
     async def execute(self, query: str, *args: Any) -> str:
-        async with self.pool.acquire() as connection:
-            return await connection.execute(query, *args)
+        async with self.acquire() as connection:
+            with stage("db"):
+                return await connection.execute(query, *args, timeout=remaining_budget("db"))
 
     async def fetch(self, query: str, *args: Any) -> List[Dict[str, Any]]:
-        async with self.pool.acquire() as connection:
-            return await connection.fetch(query, *args)
+        async with self.acquire() as connection:
+            with stage("db"):
+                return await connection.fetch(query, *args, timeout=remaining_budget("db"))
 
     async def fetchrow(self, query: str, *args: Any) -> Optional[Dict[str, Any]]:
-        async with self.pool.acquire() as connection:
-            return await connection.fetchrow(query, *args)
+        async with self.acquire() as connection:
+            with stage("db"):
+                return await connection.fetchrow(query, *args, timeout=remaining_budget("db"))
 
     async def fetchval(self, query: str, *args: Any) -> Any:
-        async with self.pool.acquire() as connection:
-            return await connection.fetchval(query, *args)
+        async with self.acquire() as connection:
+            with stage("db"):
+                return await connection.fetchval(query, *args, timeout=remaining_budget("db"))
 
 database = Database()
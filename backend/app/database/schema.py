@@ -1,3 +1,27 @@
+import asyncpg
+from app.core.config import ENVIRONMENT, Environment
+from app.core.logging import db_logger
+
+# Alembic head this code expects, bump together with each new migration
+SCHEMA_VERSION = "010_task_changes_channel"
+
+async def check_schema_version() -> None:
+    """Verify the database was migrated instead of running DDL on every boot"""
+    from app.database.connection import database
+
+    try:
+        version = await database.fetchval("SELECT version_num FROM alembic_version")
+    except asyncpg.UndefinedTableError:
+        raise RuntimeError("Database schema is not initialized, run `alembic upgrade head`")
+
+    if version != SCHEMA_VERSION:
+        db_logger.warning("schema_version_mismatch", extra={"expected": SCHEMA_VERSION, "found": version})
+        # Only a developer mid-migration gets to run against the wrong schema
+        if ENVIRONMENT != Environment.development:
+            raise RuntimeError(f"Database schema is at {version}, expected {SCHEMA_VERSION}, run `alembic upgrade head`")
+    else:
+        db_logger.info("schema_version_ok", extra={"version": version})
+
 async def init_database():
     init_users_table = """
     CREATE TABLE IF NOT EXISTS users (
@@ -12,14 +36,27 @@ async def init_database():
     )
     """
 
+    # Same labels as TaskStatus/TaskPriority, see migration 007
+    init_enum_types = """
+    DO $$
+    BEGIN
+        IF to_regtype('task_status') IS NULL THEN
+            CREATE TYPE task_status AS ENUM ('pending', 'in_progress', 'completed');
+        END IF;
+        IF to_regtype('task_priority') IS NULL THEN
+            CREATE TYPE task_priority AS ENUM ('low', 'medium', 'high');
+        END IF;
+    END $$
+    """
+
     init_tasks_table = """
     CREATE TABLE IF NOT EXISTS tasks (
         id SERIAL PRIMARY KEY,
         user_id INTEGER NOT NULL REFERENCES users(id) ON DELETE CASCADE,
         title VARCHAR(255) NOT NULL,
         description TEXT,
-        status VARCHAR(50) DEFAULT 'pending',
-        priority VARCHAR(50) DEFAULT 'medium',
+        status task_status DEFAULT 'pending',
+        priority task_priority DEFAULT 'medium',
         created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
         updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
     )
@@ -28,6 +65,7 @@ async def init_database():
     from app.database.connection import database
 
     await database.execute(init_users_table)
+    await database.execute(init_enum_types)
     await database.execute(init_tasks_table)
 
     # Create indexes for performance optimization
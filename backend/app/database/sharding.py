@@ -0,0 +1,170 @@
+import asyncio
+import bisect
+import hashlib
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set
+from app.core.config import DATABASE_URL, DATABASE_SHARD_URLS, SHARD_VIRTUAL_NODES, SHARD_DIRECTORY_REFRESH
+from app.core.logging import db_logger
+from app.database.connection import Database, database
+
+# Shard name used for everything when DATABASE_SHARD_URLS is empty
+PRIMARY = "primary"
+
+# Users live on the primary, shards keep a copy of each row they hold tasks for
+# so the tasks/task_counts/tasks_archive foreign keys still hold there. Credentials stay on the primary
+COPY_USER = """
+    INSERT INTO users (id, username, email, hashed_password, role, is_active, created_at)
+    VALUES ($1, $2, $3, '', $4, $5, $6)
+    ON CONFLICT (id) DO NOTHING
+"""
+
+# last_value is read from the sequence itself, pg_sequences has NULL until nextval after a RESTART
+TASK_ID_SEQUENCE = """
+    SELECT last_value, (
+        SELECT increment_by FROM pg_sequences WHERE sequencename = 'tasks_id_seq' AND schemaname = current_schema()
+    ) AS increment_by
+    FROM tasks_id_seq
+"""
+
+USER_ROWS = "SELECT id, username, email, role, is_active, created_at FROM users WHERE id = ANY($1::int[])"
+
+class UserMovingError(Exception):
+    """Raised for writes to a user whose rows are being copied to another shard"""
+
+def ring_hash(value: str) -> int:
+    return int.from_bytes(hashlib.blake2b(value.encode(), digest_size=8).digest(), "big")
+
+class HashRing:
+    """Consistent hash ring, each shard owns `vnodes` points so adding one moves about 1/N of users"""
+
+    def __init__(self, names: List[str], vnodes: int) -> None:
+        points = sorted((ring_hash(f"{name}#{index}"), name) for name in names for index in range(vnodes))
+        self._keys = [point for point, _ in points]
+        self._names = [name for _, name in points]
+
+    def node(self, user_id: int) -> str:
+        index = bisect.bisect(self._keys, ring_hash(str(user_id))) % len(self._keys)
+        return self._names[index]
+
+class ShardRouter:
+    """Maps a user to the database holding their tasks: shard_directory entries first, then the hash ring"""
+
+    def __init__(self, primary: Database, shard_urls: Dict[str, str], vnodes: int, refresh_interval: float) -> None:
+        self.primary = primary
+        self.enabled = bool(shard_urls)
+        self.refresh_interval = refresh_interval
+        # A shard pointing at DATABASE_URL reuses the primary pool
+        self.shards: Dict[str, Database] = {
+            name: primary if url == DATABASE_URL else Database(url) for name, url in shard_urls.items()
+        } or {PRIMARY: primary}
+        self.ring = HashRing(list(self.shards), vnodes)
+        self.directory: Dict[int, str] = {}
+        self.moving: Set[int] = set()
+        # Called with the ids of users whose shard changed on a directory refresh
+        self.on_move: List[Callable[[Set[int]], None]] = []
+        self._task: Optional[asyncio.Task] = None
+
+    def shard_name(self, user_id: int) -> str:
+        if not self.enabled:
+            return PRIMARY
+        return self.directory.get(user_id) or self.ring.node(user_id)
+
+    def for_user(self, user_id: int) -> Database:
+        return self.shards[self.shard_name(user_id)]
+
+    def for_write(self, user_id: int) -> Database:
+        """Like for_user, but refuses writes while the user is being moved"""
+        if user_id in self.moving:
+            raise UserMovingError(f"User {user_id} is being moved between shards")
+        return self.for_user(user_id)
+
+    def all(self) -> List[Database]:
+        """Every distinct shard database, for queries that span all users"""
+        return list({id(shard): shard for shard in self.shards.values()}.values())
+
+    async def fan_out(self, method: str, query: str, *args: Any) -> List[Any]:
+        """Run the same query on every shard in parallel, one result per shard"""
+        return await asyncio.gather(*(getattr(shard, method)(query, *args) for shard in self.all()))
+
+    async def ensure_user(self, user: Dict[str, Any]) -> None:
+        """Copy a user's row to their shard before any task references it, safe to repeat"""
+        shard = self.for_user(user["id"])
+        if shard is self.primary:
+            return
+        await shard.execute(
+            COPY_USER, user["id"], user["username"], user["email"], user["role"], user["is_active"], user["created_at"]
+        )
+
+    async def ensure_users(self, user_ids: Iterable[int]) -> None:
+        """ensure_user for users known only by id, e.g. after a foreign key violation on their shard"""
+        remote = [user_id for user_id in set(user_ids) if self.for_user(user_id) is not self.primary]
+        if not remote:
+            return
+        for user in await self.primary.fetch(USER_ROWS, remote):
+            await self.ensure_user(dict(user))
+        db_logger.info("shard_users_copied", extra={"users": len(remote)})
+
+    async def check_sequences(self) -> None:
+        """Refuse to run while two shards can hand out the same task id, task:{id} cache keys are global"""
+        names = {id(shard): name for name, shard in self.shards.items()}
+        distinct = self.all()
+        if len(distinct) < 2:
+            return
+        rows = await asyncio.gather(*(shard.fetchrow(TASK_ID_SEQUENCE) for shard in distinct))
+        sequences = {names[id(shard)]: row for shard, row in zip(distinct, rows)}
+        strides = {row["increment_by"] for row in sequences.values()}
+        stride = strides.pop()
+        residues = {row["last_value"] % stride for row in sequences.values()}
+        if strides or stride < len(distinct) or len(residues) < len(distinct):
+            found = ", ".join(f"{name}: +{row['increment_by']} at {row['last_value']}" for name, row in sequences.items())
+            raise RuntimeError(f"Task id sequences can collide across shards ({found}), run `python shard_tool.py init-sequences`")
+
+    async def refresh(self) -> None:
+        rows = await self.primary.fetch("SELECT user_id, shard, moving FROM shard_directory")
+        directory: Dict[int, str] = {}
+        for row in rows:
+            if row["shard"] not in self.shards:
+                db_logger.warning("shard_directory_unknown_shard", extra={"user_id": row["user_id"], "shard": row["shard"]})
+                continue
+            directory[row["user_id"]] = row["shard"]
+        moved = {
+            user_id for user_id in directory.keys() | self.directory.keys()
+            if (directory.get(user_id) or self.ring.node(user_id)) != self.shard_name(user_id)
+        }
+        self.directory = directory
+        self.moving = {row["user_id"] for row in rows if row["moving"]}
+        if moved:
+            db_logger.info("shard_directory_moved_users", extra={"users": len(moved)})
+            for callback in self.on_move:
+                callback(moved)
+
+    async def _refresh_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.refresh_interval)
+            try:
+                await self.refresh()
+            except Exception as e:
+                # Keep routing with the last directory we loaded
+                db_logger.warning("shard_directory_refresh_failed", extra={"error": str(e)})
+
+    async def connect(self, check_sequences: bool = True) -> None:
+        """Open the shard pools (the primary is connected by its owner) and load the directory"""
+        await asyncio.gather(*(shard.connect() for shard in self.all() if shard is not self.primary))
+        if not self.enabled:
+            return
+        if check_sequences:
+            await self.check_sequences()
+        await self.refresh()
+        self._task = asyncio.get_running_loop().create_task(self._refresh_loop())
+        db_logger.info("shards_connected", extra={"shards": list(self.shards), "pinned_users": len(self.directory)})
+
+    async def disconnect(self) -> None:
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await asyncio.gather(*(shard.disconnect() for shard in self.all() if shard is not self.primary))
+
+shards = ShardRouter(database, DATABASE_SHARD_URLS, SHARD_VIRTUAL_NODES, SHARD_DIRECTORY_REFRESH)
@@ -1,16 +1,33 @@
-from fastapi import FastAPI, Request
+from fastapi import FastAPI, Request, Depends, HTTPException, Query, status
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
-from app.database.connection import database
-from app.database.schema import init_database
+from app.database.connection import database, PoolExhaustedError
+from app.database.schema import check_schema_version
+from app.database.sharding import shards, UserMovingError
 from app.core.redis import redis_client
+from app.core.change_stream import task_change_broker
+from app.core.archiver import task_archiver
+from app.core.insert_batcher import task_insert_batcher
+from app.core.task_events import task_event_buffer
+from app.core.cache_warmer import cache_warmer
+from app.core.loop_monitor import loop_monitor
+from app.core.metrics import metrics
+from app.core.dependencies import get_admin_user
+from app.core.profiling import RequestProfilerMiddleware, ProfilerBusy, sample_event_loop, sign_profile_header
 from app.core.logging import setup_logging, request_logger
 from app.core.rate_limit import limiter
-from app.core.config import DEBUG, ALLOWED_ORIGINS
+from app.core.deadline import DeadlineMiddleware, DeadlineExceeded, current_deadline, deadline_response, log_deadline_overrun
+from app.core.config import (
+    DEBUG, ALLOWED_ORIGINS, ADMISSION_RETRY_AFTER, ARCHIVE_ENABLED,
+    PROFILE_MAX_SECONDS, PROFILE_SAMPLE_INTERVAL_MS, PROFILE_SIGNING_KEY, PROFILE_HEADER_MAX_TTL, PROFILE_DIR
+)
 from app.api.v1.auth import router as auth_router
 from app.api.v1.tasks import router as tasks_router
 from slowapi.errors import RateLimitExceeded
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, PlainTextResponse
+from typing import Any, Dict
+import asyncio
+import os
 import time
 
 # Initialize logging
@@ -19,18 +36,29 @@ setup_logging()
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     request_logger.info("application_starting", extra={"debug": DEBUG})
-    await database.connect()
+    loop_monitor.start()
+    await asyncio.gather(database.connect(), redis_client.connect())
     request_logger.info("database_connected")
-    await redis_client.connect()
     request_logger.info("redis_connected")
-    await init_database()
-    request_logger.info("database_initialized")
+    await check_schema_version()
+    await shards.connect()
+    await task_change_broker.start()
+    task_event_buffer.start()
+    if ARCHIVE_ENABLED:
+        task_archiver.start()
     
     yield
     
     request_logger.info("application_shutting_down")
+    await task_insert_batcher.drain()
+    await task_event_buffer.stop()
+    await cache_warmer.stop()
+    await task_archiver.stop()
+    await task_change_broker.stop()
+    await shards.disconnect()
     await database.disconnect()
     await redis_client.disconnect()
+    await loop_monitor.stop()
     request_logger.info("application_stopped")
 
 app = FastAPI(
@@ -49,6 +77,31 @@ async def rate_limit_handler(request: Request, exc: RateLimitExceeded):
         content={"error": "Rate limit exceeded", "detail": exc.detail}
     )
 
+@app.exception_handler(PoolExhaustedError)
+async def pool_exhausted_handler(request: Request, exc: PoolExhaustedError):
+    request_logger.warning("database_pool_exhausted", extra={"path": request.url.path, "pool_waiters": database.waiting})
+    return JSONResponse(
+        status_code=503,
+        content={"error": "Service overloaded", "detail": str(exc)},
+        headers={"Retry-After": str(ADMISSION_RETRY_AFTER)}
+    )
+
+@app.exception_handler(UserMovingError)
+async def user_moving_handler(request: Request, exc: UserMovingError):
+    # A shard move blocks writes for a few directory refreshes, the client retries shortly
+    return JSONResponse(
+        status_code=503,
+        content={"error": "Temporarily read-only", "detail": str(exc)},
+        headers={"Retry-After": str(ADMISSION_RETRY_AFTER)}
+    )
+
+@app.exception_handler(DeadlineExceeded)
+async def deadline_exceeded_handler(request: Request, exc: DeadlineExceeded):
+    deadline = current_deadline()
+    if deadline is not None:
+        log_deadline_overrun(request.url.path, deadline)
+    return deadline_response()
+
 @app.middleware("http")
 async def log_requests(request: Request, call_next):
     start_time = time.time()
@@ -93,6 +146,13 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Not installed without a signing key, so unprofiled requests pay nothing
+if PROFILE_SIGNING_KEY:
+    app.add_middleware(RequestProfilerMiddleware)
+
+# Outermost, so the budget covers every other middleware and the handler
+app.add_middleware(DeadlineMiddleware)
+
 app.include_router(auth_router)
 app.include_router(tasks_router)
 
@@ -105,3 +165,34 @@ async def root():
 async def health_check():
     """Detailed health check endpoint"""
     return {"status": "healthy"}
+
+@app.get("/metrics", tags=["health"], response_class=PlainTextResponse)
+async def metrics_endpoint():
+    """Prometheus metrics for this worker"""
+    return metrics.render()
+
+@app.get("/admin/profile", tags=["admin"])
+async def profile_worker(
+    seconds: float = Query(10, gt=0, le=PROFILE_MAX_SECONDS),
+    output: str = Query("collapsed", alias="format", pattern="^(collapsed|speedscope)$"),
+    admin_user: Dict[str, Any] = Depends(get_admin_user)
+):
+    """Sample this worker's event loop and return collapsed stacks or speedscope JSON"""
+    try:
+        sampler = await sample_event_loop(seconds, PROFILE_SAMPLE_INTERVAL_MS / 1000)
+    except ProfilerBusy as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
+    if output == "speedscope":
+        return JSONResponse(sampler.speedscope(f"worker {os.getpid()}"))
+    return PlainTextResponse(sampler.collapsed())
+
+@app.post("/admin/profile/header", tags=["admin"])
+async def issue_profile_header(
+    ttl: int = Query(300, gt=0, le=PROFILE_HEADER_MAX_TTL),
+    admin_user: Dict[str, Any] = Depends(get_admin_user)
+) -> Dict[str, Any]:
+    """Signed X-Profile header value that turns on cProfile for the requests carrying it"""
+    if not PROFILE_SIGNING_KEY:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Per-request profiling is disabled")
+    value, expires_at = sign_profile_header(ttl)
+    return {"header": "X-Profile", "value": value, "expires_at": expires_at, "profile_dir": PROFILE_DIR}
@@ -1,8 +1,10 @@
 from pydantic import BaseModel, EmailStr, Field, field_validator
-from typing import Optional
+from typing import Any, Optional, Dict, List
 from datetime import datetime
 from enum import Enum
+from app.core.config import TASK_BATCH_MAX_IDS
 
+# Values double as the labels of the task_status/task_priority Postgres enums (migration 007)
 class TaskStatus(str, Enum):
     """Task status enumeration"""
     pending = "pending"
@@ -136,3 +138,28 @@ class TaskResponse(BaseModel):
 
     class Config:
         from_attributes = True
+
+class TaskEventResponse(BaseModel):
+    """One entry of a task's change history"""
+    id: int = Field(..., description="Event ID")
+    task_id: int = Field(..., description="Task ID")
+    event: str = Field(..., description="created, updated or deleted")
+    changes: Optional[Dict[str, Any]] = Field(None, description="Fields written by the change, null for deletes")
+    created_at: datetime = Field(..., description="When the change was made")
+
+class TaskBatchRequest(BaseModel):
+    """Batch task lookup request schema"""
+    ids: List[int] = Field(..., min_length=1, max_length=TASK_BATCH_MAX_IDS, description="Task IDs, results keep this order")
+
+class TaskBatchItem(BaseModel):
+    """One entry of a batch task lookup, task is null when not found"""
+    id: int = Field(..., description="Requested task ID")
+    found: bool = Field(..., description="Whether the task exists and belongs to the caller")
+    task: Optional[TaskResponse] = Field(None, description="The task, when found")
+
+class TaskSummary(BaseModel):
+    """Per-user task counts response schema"""
+    total: int = Field(..., description="Total number of tasks")
+    by_status: Dict[str, int] = Field(..., description="Task count per status")
+    by_priority: Dict[str, int] = Field(..., description="Task count per priority")
+    last_updated_at: Optional[datetime] = Field(None, description="Time of the most recent task change")
@@ -0,0 +1,37 @@
+"""Background job worker, run next to the API:
+
+    python -m app.worker
+"""
+import asyncio
+import signal
+from app.core.logging import setup_logging
+from app.core.redis import redis_client
+from app.core.jobs import JobWorker
+from app.core.cache_warmer import cache_warmer
+from app.core.loop_monitor import loop_monitor
+from app.database.connection import database
+from app.database.sharding import shards
+import app.core.job_handlers  # noqa: F401  registers the handlers
+
+async def main() -> None:
+    setup_logging()
+    loop_monitor.start()
+    await asyncio.gather(database.connect(), redis_client.connect())
+    await shards.connect()
+    worker = JobWorker()
+
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(sig, worker.stop)
+
+    try:
+        await worker.run()
+    finally:
+        await cache_warmer.stop()
+        await shards.disconnect()
+        await database.disconnect()
+        await redis_client.disconnect()
+        await loop_monitor.stop()
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,84 @@
+"""Goodput under increasing concurrency against a running API.
+
+Steps client concurrency past pool saturation and reports, for each step,
+goodput (2xx responses faster than --deadline per second), shed (503)
+rate and p99 latency. With admission control enabled goodput should
+plateau instead of collapsing once the pool is saturated.
+
+    RATE_LIMIT_ENABLED=false uvicorn app.main:app --port 8000 &
+    python -m benchmarks.admission_load --url http://localhost:8000 --steps 25,50,100,200,400
+"""
+import argparse
+import asyncio
+import time
+import uuid
+from typing import Dict, List
+import httpx
+
+async def get_token(client: httpx.AsyncClient) -> str:
+    username = f"load_{uuid.uuid4().hex[:10]}"
+    password = "LoadTest123"
+    await client.post("/api/v1/auth/register", json={
+        "username": username, "email": f"{username}@example.com", "password": password
+    })
+    response = await client.post("/api/v1/auth/login", json={"username": username, "password": password})
+    response.raise_for_status()
+    return response.json()["access_token"]
+
+async def run_step(client: httpx.AsyncClient, headers: Dict[str, str], concurrency: int,
+                   duration: float, deadline: float) -> Dict[str, float]:
+    latencies: List[float] = []
+    counts = {"good": 0, "late": 0, "shed": 0, "error": 0}
+    stop_at = time.perf_counter() + duration
+
+    async def worker(index: int) -> None:
+        while time.perf_counter() < stop_at:
+            start = time.perf_counter()
+            try:
+                # Mix of cacheable reads and writes that always hit the pool
+                if index % 4 == 0:
+                    response = await client.post("/api/v1/tasks", json={"title": "load"}, headers=headers)
+                else:
+                    response = await client.get("/api/v1/tasks", params={"skip": index % 10}, headers=headers)
+            except httpx.HTTPError:
+                counts["error"] += 1
+                continue
+            elapsed = time.perf_counter() - start
+            latencies.append(elapsed)
+            if response.status_code == 503:
+                counts["shed"] += 1
+                await asyncio.sleep(float(response.headers.get("Retry-After", "1")) / 10)
+            elif response.is_success:
+                counts["good" if elapsed <= deadline else "late"] += 1
+            else:
+                counts["error"] += 1
+
+    await asyncio.gather(*(worker(i) for i in range(concurrency)))
+    latencies.sort()
+    p99 = latencies[int(len(latencies) * 0.99) - 1] if latencies else 0.0
+    return {
+        "goodput": counts["good"] / duration,
+        "late": counts["late"] / duration,
+        "shed": counts["shed"] / duration,
+        "errors": counts["error"],
+        "p99_ms": p99 * 1000,
+    }
+
+async def main(args: argparse.Namespace) -> None:
+    limits = httpx.Limits(max_connections=max(args.steps) + 10)
+    async with httpx.AsyncClient(base_url=args.url, timeout=args.timeout, limits=limits) as client:
+        headers = {"Authorization": f"Bearer {await get_token(client)}"}
+        print(f"{'conc':>6} {'goodput/s':>10} {'late/s':>8} {'shed/s':>8} {'errors':>7} {'p99 ms':>9}")
+        for concurrency in args.steps:
+            result = await run_step(client, headers, concurrency, args.duration, args.deadline)
+            print(f"{concurrency:>6} {result['goodput']:>10.1f} {result['late']:>8.1f} {result['shed']:>8.1f} "
+                  f"{result['errors']:>7} {result['p99_ms']:>9.1f}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--steps", type=lambda v: [int(x) for x in v.split(",")], default=[25, 50, 100, 200, 400])
+    parser.add_argument("--duration", type=float, default=15.0, help="Seconds per concurrency step")
+    parser.add_argument("--deadline", type=float, default=1.0, help="Responses slower than this are not goodput")
+    parser.add_argument("--timeout", type=float, default=30.0)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,87 @@
+"""Task inserts/sec and pool usage: one INSERT per request vs the group-commit batcher.
+
+Runs concurrent inserts straight through TaskInsertBatcher (no HTTP), so the
+numbers isolate the database side. Needs the configured Postgres and Redis:
+
+    python -m benchmarks.insert_batching --concurrency 50,200,500 --duration 10
+
+Rows are written for a throwaway user that is deleted afterwards.
+"""
+import argparse
+import asyncio
+import statistics
+import time
+import uuid
+from typing import Dict, List
+
+from app.core.insert_batcher import TaskInsertBatcher
+from app.core.redis import redis_client
+from app.database.connection import database
+import app.core.job_handlers  # noqa: F401  registers the invalidation handler
+
+async def sample_pool(samples: List[int], stop: asyncio.Event) -> None:
+    while not stop.is_set():
+        samples.append(database.pool.get_size() - database.pool.get_idle_size())
+        await asyncio.sleep(0.005)
+
+async def run(batcher: TaskInsertBatcher, user_ids: List[int], concurrency: int, duration: float) -> Dict[str, float]:
+    latencies: List[float] = []
+    pool_samples: List[int] = []
+    stop_at = time.perf_counter() + duration
+    stop = asyncio.Event()
+    sampler = asyncio.create_task(sample_pool(pool_samples, stop))
+
+    async def worker(index: int) -> None:
+        user_id = user_ids[index % len(user_ids)]
+        while time.perf_counter() < stop_at:
+            start = time.perf_counter()
+            await batcher.insert(user_id, "bench", None, "pending", "medium")
+            latencies.append(time.perf_counter() - start)
+
+    await asyncio.gather(*(worker(i) for i in range(concurrency)))
+    await batcher.drain()
+    stop.set()
+    await sampler
+    latencies.sort()
+    return {
+        "inserts_per_sec": len(latencies) / duration,
+        "p99_ms": latencies[int(len(latencies) * 0.99) - 1] * 1000 if latencies else 0.0,
+        "pool_in_use_mean": statistics.fmean(pool_samples) if pool_samples else 0.0,
+        "pool_in_use_max": max(pool_samples, default=0),
+    }
+
+async def main(concurrency_steps: List[int], duration: float, users: int, window_ms: float, max_rows: int) -> None:
+    await asyncio.gather(database.connect(), redis_client.connect())
+    suffix = uuid.uuid4().hex[:8]
+    user_ids = [
+        await database.fetchval(
+            "INSERT INTO users (username, email, hashed_password) VALUES ($1, $2, 'x') RETURNING id",
+            f"bench_{suffix}_{i}", f"bench_{suffix}_{i}@example.com"
+        )
+        for i in range(users)
+    ]
+    try:
+        print(f"pool max {database.pool.get_max_size()}, window {window_ms}ms, max rows {max_rows}")
+        print(f"{'mode':<8} {'conc':>5} {'inserts/s':>10} {'p99 ms':>8} {'pool avg':>9} {'pool max':>9}")
+        for concurrency in concurrency_steps:
+            for mode, batcher in (
+                ("single", TaskInsertBatcher(window_ms, max_rows, enabled=False)),
+                ("batched", TaskInsertBatcher(window_ms, max_rows, enabled=True)),
+            ):
+                result = await run(batcher, user_ids, concurrency, duration)
+                print(f"{mode:<8} {concurrency:>5} {result['inserts_per_sec']:>10.0f} {result['p99_ms']:>8.1f} "
+                      f"{result['pool_in_use_mean']:>9.1f} {result['pool_in_use_max']:>9}")
+    finally:
+        await database.execute("DELETE FROM users WHERE id = ANY($1::int[])", user_ids)
+        await database.disconnect()
+        await redis_client.disconnect()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--concurrency", default="50,200,500", help="Comma-separated concurrent inserters")
+    parser.add_argument("--duration", type=float, default=10, help="Seconds per step")
+    parser.add_argument("--users", type=int, default=20, help="Distinct task owners")
+    parser.add_argument("--window-ms", type=float, default=2)
+    parser.add_argument("--max-rows", type=int, default=100)
+    args = parser.parse_args()
+    asyncio.run(main([int(c) for c in args.concurrency.split(",")], args.duration, args.users, args.window_ms, args.max_rows))
@@ -0,0 +1,227 @@
+"""Production-shaped load against a running API, with per-endpoint latency.
+
+Virtual users are split across scenarios by --mix weights:
+
+    dashboard  log in once, poll the first task page and the summary
+    crud       create, read, update and delete tasks
+    login      login bursts: log in, load the dashboard once, leave
+    admin      poll admin stats
+
+Accounts come from seed_load_data.py ({prefix}_{n}, password LoadTest123) and
+are picked with the same Zipf skew, so heavy users are also the busiest:
+
+    RATE_LIMIT_ENABLED=false python serve.py &
+    python seed_load_data.py --users 10000 --tasks 1000000
+    python -m benchmarks.load_test --users 200 --duration 60 --mix dashboard=70,crud=20,login=8,admin=2
+
+Reports requests/s and p50/p95/p99 per endpoint, --json for comparing runs
+across pool sizes, cache TTLs and worker counts.
+"""
+import argparse
+import asyncio
+import bisect
+import itertools
+import json
+import random
+import re
+import time
+from collections import defaultdict
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+import httpx
+
+ID_SEGMENT = re.compile(r"/\d+(?=/|$)")
+
+class Stats:
+    """Latency samples and error counts per endpoint"""
+
+    def __init__(self) -> None:
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Dict[str, int] = defaultdict(int)
+
+    def record(self, endpoint: str, seconds: float, ok: bool) -> None:
+        self.latencies[endpoint].append(seconds)
+        if not ok:
+            self.errors[endpoint] += 1
+
+    def report(self, duration: float) -> Dict[str, Dict[str, float]]:
+        report = {}
+        for endpoint, samples in sorted(self.latencies.items()):
+            samples.sort()
+            report[endpoint] = {
+                "requests": len(samples),
+                "errors": self.errors[endpoint],
+                "rps": len(samples) / duration,
+                "p50_ms": percentile(samples, 0.50) * 1000,
+                "p95_ms": percentile(samples, 0.95) * 1000,
+                "p99_ms": percentile(samples, 0.99) * 1000,
+            }
+        return report
+
+def percentile(sorted_samples: List[float], fraction: float) -> float:
+    if not sorted_samples:
+        return 0.0
+    return sorted_samples[min(len(sorted_samples) - 1, int(len(sorted_samples) * fraction))]
+
+class LoadClient:
+    """Shared HTTP client that times every call under a normalized endpoint name"""
+
+    def __init__(self, client: httpx.AsyncClient, stats: Stats) -> None:
+        self.client = client
+        self.stats = stats
+
+    async def request(self, method: str, path: str, token: Optional[str] = None, **kwargs: Any) -> Optional[httpx.Response]:
+        headers = {"Authorization": f"Bearer {token}"} if token else None
+        endpoint = f"{method} {ID_SEGMENT.sub('/{id}', path.split('?')[0])}"
+        start = time.perf_counter()
+        try:
+            response = await self.client.request(method, path, headers=headers, **kwargs)
+        except httpx.HTTPError:
+            self.stats.record(endpoint, time.perf_counter() - start, ok=False)
+            return None
+        self.stats.record(endpoint, time.perf_counter() - start, ok=response.is_success)
+        return response
+
+    async def login(self, username: str, password: str) -> Optional[str]:
+        response = await self.request("POST", "/api/v1/auth/login", json={"username": username, "password": password})
+        if response is None or not response.is_success:
+            return None
+        return response.json()["access_token"]
+
+class AccountPicker:
+    """Chooses seeded accounts with a Zipf skew toward low ranks"""
+
+    def __init__(self, prefix: str, accounts: int, exponent: float, rng: random.Random) -> None:
+        self.prefix = prefix
+        self.rng = rng
+        self.cumulative = list(itertools.accumulate(1 / rank ** exponent for rank in range(1, accounts + 1)))
+        # Same seeded shuffle as seed_load_data.py, so the busiest accounts are also the largest
+        ranks = list(range(accounts))
+        rng.shuffle(ranks)
+        self.account_for_rank = [0] * accounts
+        for account, rank in enumerate(ranks):
+            self.account_for_rank[rank] = account
+
+    def pick(self) -> str:
+        rank = bisect.bisect_left(self.cumulative, self.rng.random() * self.cumulative[-1])
+        return f"{self.prefix}_{self.account_for_rank[rank]}"
+
+Scenario = Callable[[LoadClient, argparse.Namespace, AccountPicker, float], Awaitable[None]]
+
+async def think(args: argparse.Namespace) -> None:
+    await asyncio.sleep(random.expovariate(1 / args.think) if args.think > 0 else 0)
+
+async def dashboard_user(load: LoadClient, args: argparse.Namespace, accounts: AccountPicker, stop_at: float) -> None:
+    token = await load.login(accounts.pick(), args.password)
+    if token is None:
+        return
+    while time.perf_counter() < stop_at:
+        await load.request("GET", "/api/v1/tasks?skip=0&limit=50", token)
+        await load.request("GET", "/api/v1/tasks/summary", token)
+        await asyncio.sleep(args.poll_interval)
+
+async def crud_user(load: LoadClient, args: argparse.Namespace, accounts: AccountPicker, stop_at: float) -> None:
+    token = await load.login(accounts.pick(), args.password)
+    if token is None:
+        return
+    while time.perf_counter() < stop_at:
+        response = await load.request("POST", "/api/v1/tasks", token, json={"title": "Load test task", "priority": "high"})
+        if response is None or not response.is_success:
+            await think(args)
+            continue
+        task_id = response.json()["id"]
+        await think(args)
+        await load.request("GET", f"/api/v1/tasks/{task_id}", token)
+        await load.request("PUT", f"/api/v1/tasks/{task_id}", token, json={"status": "completed"})
+        await load.request("GET", "/api/v1/tasks?skip=0&limit=50", token)
+        await think(args)
+        await load.request("DELETE", f"/api/v1/tasks/{task_id}", token)
+
+async def login_user(load: LoadClient, args: argparse.Namespace, accounts: AccountPicker, stop_at: float) -> None:
+    while time.perf_counter() < stop_at:
+        token = await load.login(accounts.pick(), args.password)
+        if token is not None:
+            await asyncio.gather(
+                load.request("GET", "/api/v1/tasks?skip=0&limit=50", token),
+                load.request("GET", "/api/v1/tasks/summary", token),
+            )
+        await think(args)
+
+async def admin_user(load: LoadClient, args: argparse.Namespace, accounts: AccountPicker, stop_at: float) -> None:
+    token = await load.login(args.admin_username, args.admin_password)
+    if token is None:
+        return
+    while time.perf_counter() < stop_at:
+        await load.request("GET", "/api/v1/tasks/admin/stats", token)
+        await asyncio.sleep(args.poll_interval)
+
+SCENARIOS: Dict[str, Scenario] = {
+    "dashboard": dashboard_user,
+    "crud": crud_user,
+    "login": login_user,
+    "admin": admin_user,
+}
+
+def parse_mix(value: str) -> Dict[str, float]:
+    mix = {}
+    for part in value.split(","):
+        name, _, weight = part.partition("=")
+        if name not in SCENARIOS:
+            raise argparse.ArgumentTypeError(f"unknown scenario {name!r}, expected one of {', '.join(SCENARIOS)}")
+        mix[name] = float(weight or 1)
+    return mix
+
+def assign_scenarios(mix: Dict[str, float], users: int) -> List[str]:
+    """Split virtual users across scenarios in proportion to the mix, at least one each"""
+    total = sum(mix.values())
+    assigned = [name for name, weight in mix.items() for _ in range(max(1, round(users * weight / total)))]
+    return assigned[:max(users, len(mix))]
+
+async def main(args: argparse.Namespace) -> None:
+    stats = Stats()
+    rng = random.Random(args.seed)
+    accounts = AccountPicker(args.prefix, args.accounts, args.zipf, rng)
+    plan = assign_scenarios(args.mix, args.users)
+    limits = httpx.Limits(max_connections=len(plan) + 10, max_keepalive_connections=len(plan) + 10)
+
+    async with httpx.AsyncClient(base_url=args.url, timeout=args.timeout, limits=limits) as client:
+        load = LoadClient(client, stats)
+        started = time.perf_counter()
+        stop_at = started + args.duration
+
+        async def virtual_user(index: int, scenario: str) -> None:
+            # Spread arrivals over the ramp, --ramp 0 starts everyone at once (a login burst)
+            await asyncio.sleep(args.ramp * index / len(plan))
+            await SCENARIOS[scenario](load, args, accounts, stop_at)
+
+        await asyncio.gather(*(virtual_user(i, scenario) for i, scenario in enumerate(plan)))
+        duration = time.perf_counter() - started
+
+    report = stats.report(duration)
+    if args.json:
+        print(json.dumps({"users": len(plan), "mix": args.mix, "duration_s": duration, "endpoints": report}))
+        return
+    print(f"{len(plan)} virtual users for {duration:.1f}s: " + ", ".join(f"{name}={plan.count(name)}" for name in args.mix))
+    print(f"{'endpoint':<34} {'reqs':>8} {'errors':>7} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+    for endpoint, row in report.items():
+        print(f"{endpoint:<34} {row['requests']:>8} {row['errors']:>7} {row['rps']:>8.1f} "
+              f"{row['p50_ms']:>8.1f} {row['p95_ms']:>8.1f} {row['p99_ms']:>8.1f}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--users", type=int, default=100, help="Concurrent virtual users")
+    parser.add_argument("--duration", type=float, default=60.0)
+    parser.add_argument("--ramp", type=float, default=10.0, help="Seconds over which virtual users start")
+    parser.add_argument("--mix", type=parse_mix, default=parse_mix("dashboard=70,crud=20,login=8,admin=2"))
+    parser.add_argument("--poll-interval", type=float, default=5.0, help="Dashboard and admin poll period")
+    parser.add_argument("--think", type=float, default=1.0, help="Mean think time between CRUD steps")
+    parser.add_argument("--accounts", type=int, default=10_000, help="Accounts to draw from, the generator's --users")
+    parser.add_argument("--prefix", default="load")
+    parser.add_argument("--password", default="LoadTest123")
+    parser.add_argument("--zipf", type=float, default=1.1)
+    parser.add_argument("--admin-username", default="admin")
+    parser.add_argument("--admin-password", default="Admin123")
+    parser.add_argument("--timeout", type=float, default=30.0)
+    parser.add_argument("--seed", type=int, default=42, help="Use the generator's seed to match its account order")
+    parser.add_argument("--json", action="store_true")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,83 @@
+"""Request throughput with INFO logging: synchronous StreamHandler vs queue listener.
+
+Run from the backend directory:
+
+    python -m benchmarks.logging_throughput --requests 5000 --concurrency 50
+"""
+import argparse
+import asyncio
+import logging
+import os
+import time
+
+os.environ.setdefault("ENVIRONMENT", "testing")
+
+from httpx import AsyncClient
+from pythonjsonlogger import jsonlogger
+from app.main import app
+from app.core.logging import CustomJsonFormatter, setup_logging, shutdown_logging, cache_logger, task_logger
+
+class StdlibJsonFormatter(CustomJsonFormatter):
+    """Formatter as it was before the queue listener: stdlib json, utcnow() at format time"""
+
+    def jsonify_log_record(self, log_record):
+        return jsonlogger.JsonFormatter.jsonify_log_record(self, log_record)
+
+@app.get("/_bench/logging", include_in_schema=False)
+async def bench_endpoint():
+    # Mirrors the log lines of a cached list_tasks call (plus http_request from the middleware)
+    cache_logger.info("cache_hit", extra={"key": "tasks:1:page:0:50", "user_id": 1, "count": 50})
+    task_logger.info("tasks_listed", extra={"user_id": 1, "count": 50, "skip": 0, "limit": 50})
+    return {"ok": True}
+
+def configure(mode: str, stream) -> None:
+    shutdown_logging()
+    root_logger = logging.getLogger()
+    for handler in list(root_logger.handlers):
+        root_logger.removeHandler(handler)
+
+    if mode == "sync":
+        handler = logging.StreamHandler(stream)
+        handler.setFormatter(StdlibJsonFormatter('%(timestamp)s %(level)s %(logger)s %(message)s'))
+        root_logger.setLevel(logging.INFO)
+        root_logger.addHandler(handler)
+    else:
+        setup_logging(stream=stream)
+    # The test client logs every request itself, keep it out of the measurement
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+
+async def run(requests: int, concurrency: int) -> float:
+    async with AsyncClient(app=app, base_url="http://bench") as client:
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def one() -> None:
+            async with semaphore:
+                response = await client.get("/_bench/logging")
+                response.raise_for_status()
+
+        start = time.perf_counter()
+        await asyncio.gather(*(one() for _ in range(requests)))
+        return requests / (time.perf_counter() - start)
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--repeat", type=int, default=3, help="Best of N runs per mode")
+    parser.add_argument("--output", default=os.devnull, help="Where log lines are written")
+    args = parser.parse_args()
+
+    with open(args.output, "w") as stream:
+        results = {}
+        for mode in ("sync", "queue"):
+            configure(mode, stream)
+            asyncio.run(run(200, args.concurrency))  # warm-up
+            results[mode] = max(asyncio.run(run(args.requests, args.concurrency)) for _ in range(args.repeat))
+        shutdown_logging()
+
+    for mode, rps in results.items():
+        print(f"{mode:>6}: {rps:8.1f} req/s")
+    print(f"speedup: {results['queue'] / results['sync']:.2f}x")
+
+if __name__ == "__main__":
+    main()
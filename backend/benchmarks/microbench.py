@@ -0,0 +1,283 @@
+"""Hot-path microbenchmarks with JSON baselines and a regression gate.
+
+Times the per-request work every call pays for: token decode, user lookup,
+request validation, task page serialization and cache invalidation. Cases
+that need Redis or Postgres are skipped when those are not reachable.
+
+    python -m benchmarks.microbench                 # print timings
+    python -m benchmarks.microbench --save          # record the baseline
+    python -m benchmarks.microbench --check         # exit 1 on regressions
+
+Baselines depend on the machine, so record them on the box that runs
+--check (e.g. the CI runner) and commit the file from there.
+"""
+import argparse
+import asyncio
+import inspect
+import json
+import logging
+import os
+import platform
+import statistics
+import sys
+import time
+import uuid
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+from fastapi.security import HTTPAuthorizationCredentials
+
+from app.core.cache import invalidate_user_tasks_cache, serialize_task
+from app.core.codec import JsonCodec, MsgpackCodec
+from app.core.dependencies import get_current_user
+from app.core.redis import redis_client
+from app.core.security import create_access_token, decode_access_token
+from app.database.connection import database
+from app.schemas.schemas import TaskCreate, TaskUpdate, TaskResponse
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baselines", "microbench.json")
+
+# (callable to time, optional untimed setup run before every call)
+Measured = Tuple[Callable[[], Any], Optional[Callable[[], Awaitable[None]]]]
+CaseFactory = Callable[[], Any]
+CASES: Dict[str, Tuple[CaseFactory, Tuple[str, ...]]] = {}
+
+def case(name: str, requires: Tuple[str, ...] = ()) -> Callable[[CaseFactory], CaseFactory]:
+    """Register an async context manager factory that yields what to time"""
+    def register(factory: CaseFactory) -> CaseFactory:
+        CASES[name] = (asynccontextmanager(factory), requires)
+        return factory
+    return register
+
+def sample_tasks(count: int = 50) -> List[Dict[str, Any]]:
+    now = datetime.utcnow()
+    return [
+        {
+            "id": i, "user_id": 1, "title": f"Task {i}", "description": "x" * 200,
+            "status": "pending", "priority": "medium",
+            "created_at": now - timedelta(minutes=i), "updated_at": now,
+        }
+        for i in range(count)
+    ]
+
+@case("decode_access_token")
+async def bench_decode_access_token() -> AsyncIterator[Measured]:
+    token = create_access_token({"sub": "bench", "role": "user"})
+    yield (lambda: decode_access_token(token)), None
+
+@case("task_create_validation")
+async def bench_task_create_validation() -> AsyncIterator[Measured]:
+    payload = {"title": "Write quarterly report", "description": "d" * 500, "status": "pending", "priority": "high"}
+    yield (lambda: TaskCreate(**payload)), None
+
+@case("task_update_validation")
+async def bench_task_update_validation() -> AsyncIterator[Measured]:
+    payload = {"title": "Renamed", "status": "completed"}
+    yield (lambda: TaskUpdate(**payload)), None
+
+@case("list_tasks_hit_serialization")
+async def bench_list_tasks_hit() -> AsyncIterator[Measured]:
+    # A cache hit parses the cached bodies and re-encodes them through the response model
+    cached = json.dumps([serialize_task(task) for task in sample_tasks()])
+
+    def run() -> str:
+        tasks = [TaskResponse(**task) for task in json.loads(cached)]
+        return json.dumps([task.model_dump(mode="json") for task in tasks])
+    yield run, None
+
+@case("list_tasks_miss_serialization")
+async def bench_list_tasks_miss() -> AsyncIterator[Measured]:
+    # A miss serializes the rows for the cache and builds the response from them
+    rows = sample_tasks()
+
+    def run() -> str:
+        cached = json.dumps([serialize_task(row) for row in rows])
+        tasks = [TaskResponse(**row) for row in rows]
+        return cached + json.dumps([task.model_dump(mode="json") for task in tasks])
+    yield run, None
+
+def register_codec_cases() -> None:
+    """Encode and decode a full task page with each cache codec"""
+    for codec in (JsonCodec(), MsgpackCodec(), MsgpackCodec("zstd")):
+        def make(codec: Any = codec) -> Tuple[CaseFactory, CaseFactory]:
+            async def encode() -> AsyncIterator[Measured]:
+                rows = sample_tasks()
+                yield (lambda: codec.encode(rows)), None
+
+            async def decode() -> AsyncIterator[Measured]:
+                data = codec.encode(sample_tasks())
+                yield (lambda: codec.decode(data)), None
+            return encode, decode
+        encode, decode = make()
+        case(f"cache_codec_encode_page_{codec.name}")(encode)
+        case(f"cache_codec_decode_page_{codec.name}")(decode)
+
+register_codec_cases()
+
+@case("get_current_user_cache_hit", requires=("redis",))
+async def bench_get_current_user_hit() -> AsyncIterator[Measured]:
+    username = f"microbench_{uuid.uuid4().hex[:8]}"
+    credentials = HTTPAuthorizationCredentials(scheme="Bearer", credentials=create_access_token({"sub": username, "role": "user"}))
+    await redis_client.set_value(f"user:{username}", {"id": 1, "username": username, "email": "b@example.com", "role": "user", "is_active": True})
+    try:
+        yield (lambda: get_current_user(credentials)), None
+    finally:
+        await redis_client.delete(f"user:{username}")
+
+@case("get_current_user_cache_miss", requires=("redis", "postgres"))
+async def bench_get_current_user_miss() -> AsyncIterator[Measured]:
+    username = f"microbench_{uuid.uuid4().hex[:8]}"
+    user_id = await database.fetchval(
+        "INSERT INTO users (username, email, hashed_password) VALUES ($1, $2, 'x') RETURNING id",
+        username, f"{username}@example.com"
+    )
+    credentials = HTTPAuthorizationCredentials(scheme="Bearer", credentials=create_access_token({"sub": username, "role": "user"}))
+
+    async def evict() -> None:
+        await redis_client.delete(f"user:{username}")
+    try:
+        yield (lambda: get_current_user(credentials)), evict
+    finally:
+        await evict()
+        await database.execute("DELETE FROM users WHERE id = $1", user_id)
+
+@case("invalidate_user_tasks_cache_500_keys", requires=("redis",))
+async def bench_invalidate_many_keys() -> AsyncIterator[Measured]:
+    user_id = -int(uuid.uuid4().int % 1_000_000) - 1
+
+    async def populate() -> None:
+        await redis_client.set_many({f"tasks:{user_id}:page:{skip}:50": "[]" for skip in range(0, 500 * 50, 50)}, expire=60)
+    try:
+        yield (lambda: invalidate_user_tasks_cache(user_id)), populate
+    finally:
+        await invalidate_user_tasks_cache(user_id)
+
+async def call(fn: Callable[[], Any]) -> None:
+    result = fn()
+    if inspect.isawaitable(result):
+        await result
+
+async def measure(fn: Callable[[], Any], setup: Optional[Callable[[], Awaitable[None]]],
+                  rounds: int, min_round_s: float) -> Dict[str, float]:
+    """Median and spread of per-call time in microseconds"""
+    for _ in range(3):
+        if setup:
+            await setup()
+        await call(fn)
+
+    # Calls that need setup are timed one at a time, the rest in loops long enough to time reliably
+    iterations = 1
+    if setup is None:
+        while True:
+            start = time.perf_counter()
+            for _ in range(iterations):
+                await call(fn)
+            if time.perf_counter() - start >= min_round_s:
+                break
+            iterations *= 2
+
+    samples: List[float] = []
+    for _ in range(rounds):
+        if setup:
+            await setup()
+        start = time.perf_counter()
+        for _ in range(iterations):
+            await call(fn)
+        samples.append((time.perf_counter() - start) / iterations * 1e6)
+    return {
+        "median_us": statistics.median(samples),
+        "min_us": min(samples),
+        "stdev_us": statistics.stdev(samples) if len(samples) > 1 else 0.0,
+    }
+
+async def connect_services() -> Set[str]:
+    available: Set[str] = set()
+    try:
+        await asyncio.wait_for(redis_client.connect(), timeout=2)
+        available.add("redis")
+    except Exception:
+        pass
+    try:
+        await asyncio.wait_for(database.connect(), timeout=5)
+        available.add("postgres")
+    except Exception:
+        pass
+    return available
+
+async def run(selected: List[str], rounds: int, min_round_s: float) -> Dict[str, Dict[str, float]]:
+    available = await connect_services()
+    results: Dict[str, Dict[str, float]] = {}
+    try:
+        for name in selected:
+            factory, requires = CASES[name]
+            missing = [service for service in requires if service not in available]
+            if missing:
+                print(f"{name:<40} skipped (needs {', '.join(missing)})")
+                continue
+            async with factory() as (fn, setup):
+                results[name] = await measure(fn, setup, rounds, min_round_s)
+            print(f"{name:<40} {results[name]['median_us']:>10.2f} us  (min {results[name]['min_us']:.2f}, stdev {results[name]['stdev_us']:.2f})")
+    finally:
+        if "postgres" in available:
+            await database.disconnect()
+        if "redis" in available:
+            await redis_client.disconnect()
+    return results
+
+def check(results: Dict[str, Dict[str, float]], baseline: Dict[str, Any], threshold: float) -> List[str]:
+    """Names of cases slower than their baseline by more than the allowed fraction"""
+    regressions = []
+    for name, result in results.items():
+        expected = baseline["cases"].get(name)
+        if expected is None:
+            continue
+        allowed = expected.get("threshold", threshold)
+        ratio = result["median_us"] / expected["median_us"]
+        if ratio > 1 + allowed:
+            regressions.append(f"{name}: {expected['median_us']:.2f} -> {result['median_us']:.2f} us ({ratio:.2f}x, allowed {1 + allowed:.2f}x)")
+    return regressions
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--save", action="store_true", help="Write results as the new baseline")
+    parser.add_argument("--check", action="store_true", help="Fail when a case regresses past the threshold")
+    parser.add_argument("--threshold", type=float, default=float(os.getenv("MICROBENCH_THRESHOLD", "0.25")),
+                        help="Allowed slowdown as a fraction of the baseline median (per-case 'threshold' overrides)")
+    parser.add_argument("--filter", default="", help="Only run cases whose name contains this")
+    parser.add_argument("--rounds", type=int, default=15)
+    parser.add_argument("--min-round-ms", type=float, default=20)
+    args = parser.parse_args()
+
+    # Timings should not include formatting log records nobody reads
+    logging.disable(logging.INFO)
+    selected = [name for name in CASES if args.filter in name]
+    results = asyncio.run(run(selected, args.rounds, args.min_round_ms / 1000))
+
+    if args.save:
+        os.makedirs(os.path.dirname(args.baseline), exist_ok=True)
+        with open(args.baseline, "w") as f:
+            json.dump({
+                "python": platform.python_version(),
+                "machine": platform.machine(),
+                "cases": {name: {"median_us": round(result["median_us"], 3)} for name, result in results.items()},
+            }, f, indent=2, sort_keys=True)
+            f.write("\n")
+        print(f"baseline written to {args.baseline}")
+
+    if args.check:
+        if not os.path.exists(args.baseline):
+            sys.exit(f"no baseline at {args.baseline}, record one with --save")
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if baseline.get("python") != platform.python_version():
+            print(f"warning: baseline recorded on Python {baseline.get('python')}, running {platform.python_version()}")
+        regressions = check(results, baseline, args.threshold)
+        if regressions:
+            print("regressions:\n  " + "\n  ".join(regressions))
+            sys.exit(1)
+        print("no regressions")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""List/update latency and VACUUM time: plain vs hash-partitioned tasks.
+
+Builds both layouts in a scratch schema (bench_partition) on the configured
+database, so point it at a disposable instance:
+
+    python -m benchmarks.partition_bench --rows 50000000 --partitions 16
+
+Loading 50M rows takes a while and needs roughly 2x15GB of disk.
+"""
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import time
+
+# Bulk statements here run far longer than request queries
+os.environ.setdefault("DATABASE_COMMAND_TIMEOUT", "86400")
+
+from app.database.connection import database
+
+SCHEMA = "bench_partition"
+
+COLUMNS = """
+    id BIGINT NOT NULL,
+    user_id INTEGER NOT NULL,
+    title VARCHAR(255) NOT NULL,
+    description TEXT,
+    status VARCHAR(50) NOT NULL DEFAULT 'pending',
+    priority VARCHAR(50) NOT NULL DEFAULT 'medium',
+    created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+"""
+
+async def create_tables(partitions: int) -> None:
+    await database.execute(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE")
+    await database.execute(f"CREATE SCHEMA {SCHEMA}")
+    await database.execute(f"CREATE TABLE {SCHEMA}.tasks_plain ({COLUMNS}, PRIMARY KEY (id))")
+    await database.execute(
+        f"CREATE TABLE {SCHEMA}.tasks_hashed ({COLUMNS}, PRIMARY KEY (id, user_id)) PARTITION BY HASH (user_id)"
+    )
+    for remainder in range(partitions):
+        await database.execute(
+            f"CREATE TABLE {SCHEMA}.tasks_hashed_p{remainder:02d} PARTITION OF {SCHEMA}.tasks_hashed "
+            f"FOR VALUES WITH (MODULUS {partitions}, REMAINDER {remainder})"
+        )
+
+async def load(table: str, rows: int, users: int, chunk: int) -> None:
+    for start in range(0, rows, chunk):
+        await database.execute(
+            f"""INSERT INTO {SCHEMA}.{table} (id, user_id, title, description, status, priority, created_at, updated_at)
+                SELECT g, 1 + (g * 7919) % $3, 'Task ' || g, repeat('x', 200),
+                       (ARRAY['pending', 'in_progress', 'completed'])[1 + g % 3],
+                       (ARRAY['low', 'medium', 'high'])[1 + g % 3],
+                       now() - (g % 100000) * interval '1 minute', now()
+                FROM generate_series($1::bigint, $2::bigint) AS g""",
+            start + 1, min(start + chunk, rows), users
+        )
+    await database.execute(f"CREATE INDEX ON {SCHEMA}.{table} (user_id, created_at DESC)")
+    await database.execute(f"CREATE INDEX ON {SCHEMA}.{table} (status)")
+    await database.execute(f"ANALYZE {SCHEMA}.{table}")
+
+async def timed(samples: int, query: str, args_fn) -> dict:
+    latencies = []
+    for _ in range(samples):
+        start = time.perf_counter()
+        await database.execute(query, *args_fn())
+        latencies.append((time.perf_counter() - start) * 1000)
+    latencies.sort()
+    return {"p50": statistics.median(latencies), "p95": latencies[int(len(latencies) * 0.95) - 1]}
+
+async def measure(table: str, rows: int, users: int, samples: int) -> dict:
+    list_stats = await timed(
+        samples,
+        f"SELECT * FROM {SCHEMA}.{table} WHERE user_id = $1 ORDER BY created_at DESC LIMIT 50 OFFSET 0",
+        lambda: (random.randint(1, users),)
+    )
+
+    def update_args():
+        task_id = random.randint(1, rows)
+        return (task_id, 1 + (task_id * 7919) % users)
+
+    update_stats = await timed(
+        samples,
+        f"UPDATE {SCHEMA}.{table} SET status = 'completed', updated_at = now() WHERE id = $1 AND user_id = $2",
+        update_args
+    )
+
+    # Dirty ~5% of rows, then time the vacuum that cleans them up
+    await database.execute(f"UPDATE {SCHEMA}.{table} SET updated_at = now() WHERE id % 20 = 0")
+    start = time.perf_counter()
+    await database.execute(f"VACUUM {SCHEMA}.{table}")
+    vacuum_s = time.perf_counter() - start
+
+    return {"list": list_stats, "update": update_stats, "vacuum_s": vacuum_s}
+
+async def main(args: argparse.Namespace) -> None:
+    await database.connect()
+    try:
+        await create_tables(args.partitions)
+        results = {}
+        for table in ("tasks_plain", "tasks_hashed"):
+            start = time.perf_counter()
+            await load(table, args.rows, args.users, args.chunk)
+            print(f"loaded {table} in {time.perf_counter() - start:.0f}s")
+            results[table] = await measure(table, args.rows, args.users, args.samples)
+
+        print(f"{'table':>14} {'list p50':>9} {'list p95':>9} {'upd p50':>9} {'upd p95':>9} {'vacuum s':>9}")
+        for table, r in results.items():
+            print(f"{table:>14} {r['list']['p50']:>9.2f} {r['list']['p95']:>9.2f} "
+                  f"{r['update']['p50']:>9.2f} {r['update']['p95']:>9.2f} {r['vacuum_s']:>9.1f}")
+    finally:
+        if not args.keep:
+            await database.execute(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE")
+        await database.disconnect()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=50_000_000)
+    parser.add_argument("--users", type=int, default=100_000)
+    parser.add_argument("--partitions", type=int, default=16)
+    parser.add_argument("--chunk", type=int, default=1_000_000, help="Rows per load statement")
+    parser.add_argument("--samples", type=int, default=2000)
+    parser.add_argument("--keep", action="store_true", help="Keep the scratch schema afterwards")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,49 @@
+"""Worker startup time: app import, lifespan startup and first request.
+
+Must run in a fresh interpreter so the import is not already cached:
+
+    python -m benchmarks.startup_time            # needs Postgres and Redis
+    python -m benchmarks.startup_time --skip-lifespan --json
+"""
+import argparse
+import asyncio
+import json
+import time
+
+async def first_request(app, skip_lifespan: bool) -> dict:
+    from httpx import AsyncClient
+
+    timings = {}
+    start = time.perf_counter()
+    if skip_lifespan:
+        async with AsyncClient(app=app, base_url="http://startup") as client:
+            (await client.get("/health")).raise_for_status()
+        timings["first_request_s"] = time.perf_counter() - start
+        return timings
+
+    async with app.router.lifespan_context(app):
+        timings["lifespan_s"] = time.perf_counter() - start
+        async with AsyncClient(app=app, base_url="http://startup") as client:
+            (await client.get("/health")).raise_for_status()
+        timings["first_request_s"] = time.perf_counter() - start
+    return timings
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--skip-lifespan", action="store_true", help="Do not connect Postgres/Redis")
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    from app.main import app
+    results = {"import_s": time.perf_counter() - start}
+    results.update(asyncio.run(first_request(app, args.skip_lifespan)))
+
+    if args.json:
+        print(json.dumps(results))
+    else:
+        for name, seconds in results.items():
+            print(f"{name:>16}: {seconds * 1000:8.1f} ms")
+
+if __name__ == "__main__":
+    main()
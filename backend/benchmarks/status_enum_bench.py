@@ -0,0 +1,116 @@
+"""Table/index size and scan time: VARCHAR vs enum vs smallint status and priority.
+
+Builds the three layouts in a scratch schema (bench_enum) on the configured
+database, so point it at a disposable instance:
+
+    python -m benchmarks.status_enum_bench --rows 10000000
+
+Scans run without parallel workers so the timings compare per-row cost.
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import time
+
+# Bulk statements here run far longer than request queries
+os.environ.setdefault("DATABASE_COMMAND_TIMEOUT", "86400")
+
+from app.database.connection import database
+
+SCHEMA = "bench_enum"
+
+# Column type and how a generated 1..3 value becomes one, per layout
+LAYOUTS = {
+    "tasks_varchar": ("VARCHAR(50)", "VARCHAR(50)",
+                      "(ARRAY['pending', 'in_progress', 'completed'])[{n}]", "(ARRAY['low', 'medium', 'high'])[{n}]"),
+    "tasks_enum": (f"{SCHEMA}.task_status", f"{SCHEMA}.task_priority",
+                   "(ARRAY['pending', 'in_progress', 'completed'])[{n}]::" + SCHEMA + ".task_status",
+                   "(ARRAY['low', 'medium', 'high'])[{n}]::" + SCHEMA + ".task_priority"),
+    "tasks_smallint": ("SMALLINT", "SMALLINT", "{n}", "{n}"),
+}
+COMPLETED = {"tasks_varchar": "'completed'", "tasks_enum": "'completed'", "tasks_smallint": "3"}
+
+async def create_tables() -> None:
+    await database.execute(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE")
+    await database.execute(f"CREATE SCHEMA {SCHEMA}")
+    await database.execute(f"CREATE TYPE {SCHEMA}.task_status AS ENUM ('pending', 'in_progress', 'completed')")
+    await database.execute(f"CREATE TYPE {SCHEMA}.task_priority AS ENUM ('low', 'medium', 'high')")
+    for table, (status_type, priority_type, _, _) in LAYOUTS.items():
+        await database.execute(f"""
+            CREATE TABLE {SCHEMA}.{table} (
+                id INTEGER PRIMARY KEY,
+                user_id INTEGER NOT NULL,
+                title VARCHAR(255) NOT NULL,
+                description TEXT,
+                status {status_type} NOT NULL,
+                priority {priority_type} NOT NULL,
+                created_at TIMESTAMP NOT NULL,
+                updated_at TIMESTAMP NOT NULL
+            )""")
+
+async def load(table: str, rows: int, chunk: int) -> None:
+    _, _, status_expr, priority_expr = LAYOUTS[table]
+    status_value = status_expr.format(n="1 + g % 3")
+    priority_value = priority_expr.format(n="1 + (g / 3) % 3")
+    for start in range(0, rows, chunk):
+        await database.execute(
+            f"""INSERT INTO {SCHEMA}.{table} (id, user_id, title, description, status, priority, created_at, updated_at)
+                SELECT g, 1 + (g * 7919) % 100000, 'Task ' || g, repeat('x', 100),
+                       {status_value}, {priority_value}, now() - (g % 100000) * interval '1 minute', now()
+                FROM generate_series($1::int, $2::int) AS g""",
+            start + 1, min(start + chunk, rows)
+        )
+    await database.execute(f"CREATE INDEX {table}_status ON {SCHEMA}.{table} (status)")
+    await database.execute(f"VACUUM ANALYZE {SCHEMA}.{table}")
+
+async def timed(samples: int, query: str) -> float:
+    """Median milliseconds over samples, after one warm-up run"""
+    async with database.acquire() as connection:
+        await connection.execute("SET max_parallel_workers_per_gather = 0")
+        await connection.execute(query)
+        latencies = []
+        for _ in range(samples):
+            start = time.perf_counter()
+            await connection.execute(query)
+            latencies.append((time.perf_counter() - start) * 1000)
+        await connection.execute("RESET max_parallel_workers_per_gather")
+    return statistics.median(latencies)
+
+async def measure(table: str, samples: int) -> dict:
+    qualified = f"{SCHEMA}.{table}"
+    return {
+        "table_mb": await database.fetchval(f"SELECT pg_table_size('{qualified}')") / 1e6,
+        "index_mb": await database.fetchval(f"SELECT pg_relation_size('{qualified}_status')") / 1e6,
+        "filter_ms": await timed(samples, f"SELECT COUNT(*) FROM {qualified} WHERE status = {COMPLETED[table]}"),
+        "group_ms": await timed(samples, f"SELECT status, priority, COUNT(*) FROM {qualified} GROUP BY 1, 2"),
+    }
+
+async def main(args: argparse.Namespace) -> None:
+    await database.connect()
+    try:
+        await create_tables()
+        results = {}
+        for table in LAYOUTS:
+            start = time.perf_counter()
+            await load(table, args.rows, args.chunk)
+            print(f"loaded {table} in {time.perf_counter() - start:.0f}s")
+            results[table] = await measure(table, args.samples)
+
+        baseline = results["tasks_varchar"]
+        print(f"{'table':>15} {'table MB':>9} {'index MB':>9} {'filter ms':>10} {'group ms':>9} {'vs varchar':>11}")
+        for table, r in results.items():
+            print(f"{table:>15} {r['table_mb']:>9.1f} {r['index_mb']:>9.1f} {r['filter_ms']:>10.1f} {r['group_ms']:>9.1f} "
+                  f"{r['table_mb'] / baseline['table_mb']:>10.0%}")
+    finally:
+        if not args.keep:
+            await database.execute(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE")
+        await database.disconnect()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=10_000_000)
+    parser.add_argument("--chunk", type=int, default=1_000_000, help="Rows per load statement")
+    parser.add_argument("--samples", type=int, default=5)
+    parser.add_argument("--keep", action="store_true", help="Keep the scratch schema afterwards")
+    asyncio.run(main(parser.parse_args()))
@@ -1,7 +1,7 @@
 ﻿"""Alembic environment configuration."""
 
 from logging.config import fileConfig
-from sqlalchemy import engine_from_config, pool, create_engine
+from sqlalchemy import engine_from_config, pool, create_engine, text
 from alembic import context
 import os
 from dotenv import load_dotenv
@@ -36,8 +36,14 @@ def run_migrations_online() -> None:
         prefix="sqlalchemy.",
         poolclass=pool.NullPool,
     )
+    # DATABASE_SCHEMA migrates a separate schema (e.g. one per test worker) in the same database
+    schema = os.getenv("DATABASE_SCHEMA")
     with connectable.connect() as connection:
-        context.configure(connection=connection, target_metadata=target_metadata)
+        if schema:
+            connection.execute(text(f'CREATE SCHEMA IF NOT EXISTS "{schema}"'))
+            connection.execute(text(f'SET search_path TO "{schema}"'))
+            connection.commit()
+        context.configure(connection=connection, target_metadata=target_metadata, version_table_schema=schema)
         with context.begin_transaction():
             context.run_migrations()
 
@@ -0,0 +1,55 @@
+"""Notify listeners of task changes.
+
+Revision ID: 002_task_change_notify
+Revises: 001_initial_schema
+Create Date: 2026-10-19 10:00:00.000000
+
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '002_task_change_notify'
+down_revision = '001_initial_schema'
+branch_labels = None
+depends_on = None
+
+def upgrade() -> None:
+    # Global, monotonically increasing ids so stream clients can resume with Last-Event-ID
+    op.execute("CREATE SEQUENCE task_change_event_seq")
+
+    # Description is left out to stay well under the 8000 byte NOTIFY payload limit
+    op.execute("""
+    CREATE FUNCTION notify_task_change() RETURNS trigger AS $$
+    DECLARE
+        changed RECORD;
+    BEGIN
+        IF TG_OP = 'DELETE' THEN
+            changed := OLD;
+        ELSE
+            changed := NEW;
+        END IF;
+        PERFORM pg_notify('task_changes', json_build_object(
+            'id', nextval('task_change_event_seq'),
+            'op', CASE TG_OP WHEN 'INSERT' THEN 'created' WHEN 'UPDATE' THEN 'updated' ELSE 'deleted' END,
+            'task_id', changed.id,
+            'user_id', changed.user_id,
+            'title', changed.title,
+            'status', changed.status,
+            'priority', changed.priority,
+            'updated_at', changed.updated_at
+        )::text);
+        RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql
+    """)
+
+    op.execute("""
+    CREATE TRIGGER tasks_notify_change
+    AFTER INSERT OR UPDATE OR DELETE ON tasks
+    FOR EACH ROW EXECUTE FUNCTION notify_task_change()
+    """)
+
+def downgrade() -> None:
+    op.execute("DROP TRIGGER IF EXISTS tasks_notify_change ON tasks")
+    op.execute("DROP FUNCTION IF EXISTS notify_task_change()")
+    op.execute("DROP SEQUENCE IF EXISTS task_change_event_seq")
@@ -0,0 +1,101 @@
+"""Per-user task counters for the summary endpoint.
+
+Revision ID: 003_task_counts
+Revises: 002_task_change_notify
+Create Date: 2026-10-19 11:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '003_task_counts'
+down_revision = '002_task_change_notify'
+branch_labels = None
+depends_on = None
+
+def upgrade() -> None:
+    op.create_table(
+        'task_counts',
+        sa.Column('user_id', sa.Integer, sa.ForeignKey('users.id', ondelete='CASCADE'), primary_key=True),
+        sa.Column('pending', sa.Integer, server_default='0', nullable=False),
+        sa.Column('in_progress', sa.Integer, server_default='0', nullable=False),
+        sa.Column('completed', sa.Integer, server_default='0', nullable=False),
+        sa.Column('low', sa.Integer, server_default='0', nullable=False),
+        sa.Column('medium', sa.Integer, server_default='0', nullable=False),
+        sa.Column('high', sa.Integer, server_default='0', nullable=False),
+        sa.Column('last_updated_at', sa.DateTime),
+    )
+
+    # Counters change in the same transaction as the task row, so every write path keeps them exact
+    op.execute("""
+    CREATE FUNCTION update_task_counts() RETURNS trigger AS $$
+    BEGIN
+        IF TG_OP = 'UPDATE' AND OLD.user_id = NEW.user_id
+                AND OLD.status = NEW.status AND OLD.priority = NEW.priority THEN
+            UPDATE task_counts SET last_updated_at = GREATEST(last_updated_at, NEW.updated_at)
+            WHERE user_id = NEW.user_id;
+            RETURN NULL;
+        END IF;
+
+        IF TG_OP IN ('UPDATE', 'DELETE') THEN
+            UPDATE task_counts SET
+                pending = pending - (OLD.status = 'pending')::int,
+                in_progress = in_progress - (OLD.status = 'in_progress')::int,
+                completed = completed - (OLD.status = 'completed')::int,
+                low = low - (OLD.priority = 'low')::int,
+                medium = medium - (OLD.priority = 'medium')::int,
+                high = high - (OLD.priority = 'high')::int,
+                last_updated_at = LOCALTIMESTAMP
+            WHERE user_id = OLD.user_id;
+        END IF;
+
+        IF TG_OP IN ('INSERT', 'UPDATE') THEN
+            INSERT INTO task_counts AS c (user_id, pending, in_progress, completed, low, medium, high, last_updated_at)
+            VALUES (
+                NEW.user_id,
+                (NEW.status = 'pending')::int,
+                (NEW.status = 'in_progress')::int,
+                (NEW.status = 'completed')::int,
+                (NEW.priority = 'low')::int,
+                (NEW.priority = 'medium')::int,
+                (NEW.priority = 'high')::int,
+                NEW.updated_at
+            )
+            ON CONFLICT (user_id) DO UPDATE SET
+                pending = c.pending + EXCLUDED.pending,
+                in_progress = c.in_progress + EXCLUDED.in_progress,
+                completed = c.completed + EXCLUDED.completed,
+                low = c.low + EXCLUDED.low,
+                medium = c.medium + EXCLUDED.medium,
+                high = c.high + EXCLUDED.high,
+                last_updated_at = GREATEST(c.last_updated_at, EXCLUDED.last_updated_at);
+        END IF;
+        RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql
+    """)
+
+    op.execute("""
+    CREATE TRIGGER tasks_update_counts
+    AFTER INSERT OR UPDATE OR DELETE ON tasks
+    FOR EACH ROW EXECUTE FUNCTION update_task_counts()
+    """)
+
+    op.execute("""
+    INSERT INTO task_counts (user_id, pending, in_progress, completed, low, medium, high, last_updated_at)
+    SELECT user_id,
+           COUNT(*) FILTER (WHERE status = 'pending'),
+           COUNT(*) FILTER (WHERE status = 'in_progress'),
+           COUNT(*) FILTER (WHERE status = 'completed'),
+           COUNT(*) FILTER (WHERE priority = 'low'),
+           COUNT(*) FILTER (WHERE priority = 'medium'),
+           COUNT(*) FILTER (WHERE priority = 'high'),
+           MAX(updated_at)
+    FROM tasks GROUP BY user_id
+    """)
+
+def downgrade() -> None:
+    op.execute("DROP TRIGGER IF EXISTS tasks_update_counts ON tasks")
+    op.execute("DROP FUNCTION IF EXISTS update_task_counts()")
+    op.drop_table('task_counts')
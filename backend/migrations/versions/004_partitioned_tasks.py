@@ -0,0 +1,75 @@
+"""Hash-partitioned copy of tasks, kept in sync until cutover.
+
+Revision ID: 004_partitioned_tasks
+Revises: 003_task_counts
+Create Date: 2026-10-19 12:00:00.000000
+
+Creates tasks_partitioned (PARTITION BY HASH (user_id)) and a trigger that
+mirrors every write on tasks into it. Existing rows are copied online and
+the tables are swapped by partition_tasks.py:
+
+    python partition_tasks.py backfill
+    python partition_tasks.py cutover
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '004_partitioned_tasks'
+down_revision = '003_task_counts'
+branch_labels = None
+depends_on = None
+
+TASK_PARTITIONS = 16
+
+def upgrade() -> None:
+    # Same columns as tasks, ids keep coming from tasks_id_seq so they stay unique across the swap.
+    # The partition key has to be part of the primary key.
+    op.execute("""
+    CREATE TABLE tasks_partitioned (
+        id INTEGER NOT NULL DEFAULT nextval('tasks_id_seq'),
+        user_id INTEGER NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+        title VARCHAR(255) NOT NULL,
+        description TEXT,
+        status VARCHAR(50) NOT NULL DEFAULT 'pending',
+        priority VARCHAR(50) NOT NULL DEFAULT 'medium',
+        created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+        updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+        PRIMARY KEY (id, user_id)
+    ) PARTITION BY HASH (user_id)
+    """)
+    for remainder in range(TASK_PARTITIONS):
+        op.execute(
+            f"CREATE TABLE tasks_p{remainder:02d} PARTITION OF tasks_partitioned "
+            f"FOR VALUES WITH (MODULUS {TASK_PARTITIONS}, REMAINDER {remainder})"
+        )
+
+    # Serves list_tasks (user_id = $1 ORDER BY created_at DESC) without a sort
+    op.execute("CREATE INDEX idx_tasks_part_user_created ON tasks_partitioned (user_id, created_at DESC)")
+    op.execute("CREATE INDEX idx_tasks_part_status ON tasks_partitioned (status)")
+
+    op.execute("""
+    CREATE FUNCTION mirror_task_write() RETURNS trigger AS $$
+    BEGIN
+        IF TG_OP IN ('UPDATE', 'DELETE') THEN
+            DELETE FROM tasks_partitioned WHERE id = OLD.id AND user_id = OLD.user_id;
+        END IF;
+        IF TG_OP IN ('INSERT', 'UPDATE') THEN
+            INSERT INTO tasks_partitioned (id, user_id, title, description, status, priority, created_at, updated_at)
+            VALUES (NEW.id, NEW.user_id, NEW.title, NEW.description, NEW.status, NEW.priority, NEW.created_at, NEW.updated_at)
+            ON CONFLICT (id, user_id) DO NOTHING;
+        END IF;
+        RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql
+    """)
+    op.execute("""
+    CREATE TRIGGER tasks_mirror_to_partitioned
+    AFTER INSERT OR UPDATE OR DELETE ON tasks
+    FOR EACH ROW EXECUTE FUNCTION mirror_task_write()
+    """)
+
+def downgrade() -> None:
+    # Only valid before cutover, afterwards tasks itself is the partitioned table
+    op.execute("DROP TRIGGER IF EXISTS tasks_mirror_to_partitioned ON tasks")
+    op.execute("DROP FUNCTION IF EXISTS mirror_task_write()")
+    op.execute("DROP TABLE IF EXISTS tasks_partitioned")
@@ -0,0 +1,71 @@
+"""Cold table for archived completed tasks.
+
+Revision ID: 005_tasks_archive
+Revises: 004_partitioned_tasks
+Create Date: 2026-10-19 13:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '005_tasks_archive'
+down_revision = '004_partitioned_tasks'
+branch_labels = None
+depends_on = None
+
+# Archiving moves rows out of tasks but the task itself is unchanged, so the change
+# stream and per-user counters skip writes made with app.archiving = 'on'
+NOT_ARCHIVING = "current_setting('app.archiving', true) IS DISTINCT FROM 'on'"
+
+def upgrade() -> None:
+    op.create_table(
+        'tasks_archive',
+        sa.Column('id', sa.Integer, primary_key=True),
+        sa.Column('user_id', sa.Integer, sa.ForeignKey('users.id', ondelete='CASCADE'), nullable=False),
+        sa.Column('title', sa.String(255), nullable=False),
+        sa.Column('description', sa.Text),
+        sa.Column('status', sa.String(50), nullable=False),
+        sa.Column('priority', sa.String(50), nullable=False),
+        sa.Column('created_at', sa.DateTime, nullable=False),
+        sa.Column('updated_at', sa.DateTime, nullable=False),
+        sa.Column('archived_at', sa.DateTime, server_default=sa.func.now(), nullable=False),
+    )
+    op.create_index('idx_tasks_archive_user_created', 'tasks_archive', ['user_id', sa.text('created_at DESC')])
+
+    # Finds archive candidates without scanning every pending/in-progress row
+    op.execute("CREATE INDEX idx_tasks_completed_updated ON tasks (updated_at) WHERE status = 'completed'")
+    op.execute("""
+    DO $$
+    BEGIN
+        IF to_regclass('tasks_partitioned') IS NOT NULL THEN
+            CREATE INDEX idx_tasks_part_completed_updated ON tasks_partitioned (updated_at) WHERE status = 'completed';
+        END IF;
+    END $$
+    """)
+
+    op.execute("DROP TRIGGER tasks_notify_change ON tasks")
+    op.execute("DROP TRIGGER tasks_update_counts ON tasks")
+    op.execute(f"""
+    CREATE TRIGGER tasks_notify_change AFTER INSERT OR UPDATE OR DELETE ON tasks
+    FOR EACH ROW WHEN ({NOT_ARCHIVING}) EXECUTE FUNCTION notify_task_change()
+    """)
+    op.execute(f"""
+    CREATE TRIGGER tasks_update_counts AFTER INSERT OR UPDATE OR DELETE ON tasks
+    FOR EACH ROW WHEN ({NOT_ARCHIVING}) EXECUTE FUNCTION update_task_counts()
+    """)
+
+def downgrade() -> None:
+    op.execute("DROP TRIGGER tasks_notify_change ON tasks")
+    op.execute("DROP TRIGGER tasks_update_counts ON tasks")
+    op.execute("""
+    CREATE TRIGGER tasks_notify_change AFTER INSERT OR UPDATE OR DELETE ON tasks
+    FOR EACH ROW EXECUTE FUNCTION notify_task_change()
+    """)
+    op.execute("""
+    CREATE TRIGGER tasks_update_counts AFTER INSERT OR UPDATE OR DELETE ON tasks
+    FOR EACH ROW EXECUTE FUNCTION update_task_counts()
+    """)
+    op.execute("DROP INDEX IF EXISTS idx_tasks_part_completed_updated")
+    op.execute("DROP INDEX IF EXISTS idx_tasks_completed_updated")
+    op.drop_table('tasks_archive')
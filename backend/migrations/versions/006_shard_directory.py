@@ -0,0 +1,31 @@
+"""Directory of users pinned to a task shard.
+
+Revision ID: 006_shard_directory
+Revises: 005_tasks_archive
+Create Date: 2026-10-19 14:00:00.000000
+
+Users without an entry go to the shard the hash ring picks. shard_tool.py
+adds entries to pin existing users before a shard is added, and flips them
+when it moves a user. Only read on the primary database.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '006_shard_directory'
+down_revision = '005_tasks_archive'
+branch_labels = None
+depends_on = None
+
+def upgrade() -> None:
+    op.create_table(
+        'shard_directory',
+        sa.Column('user_id', sa.Integer, sa.ForeignKey('users.id', ondelete='CASCADE'), primary_key=True),
+        sa.Column('shard', sa.Text, nullable=False),
+        # Set while shard_tool.py copies the user's rows, workers refuse their writes meanwhile
+        sa.Column('moving', sa.Boolean, nullable=False, server_default=sa.false()),
+        sa.Column('updated_at', sa.DateTime, server_default=sa.func.now(), nullable=False),
+    )
+
+def downgrade() -> None:
+    op.drop_table('shard_directory')
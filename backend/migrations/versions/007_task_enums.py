@@ -0,0 +1,100 @@
+"""Postgres enums for task status and priority.
+
+Revision ID: 007_task_enums
+Revises: 006_shard_directory
+Create Date: 2026-10-19 15:00:00.000000
+
+status and priority were VARCHAR(50), stored as a 1 byte header plus the
+label: 'pending' 8 bytes, 'completed' 10, 'in_progress' 12, 'low' 4,
+'medium' 7, 'high' 5. An enum is 4 bytes, int-aligned. status saves 4-8
+bytes per row and per idx_tasks_status entry. priority saves at most 3 and
+can cost alignment padding. It is converted for the declaration-order sort
+(low < medium < high) and so only known labels can be stored. Labels match
+TaskStatus/TaskPriority and are still read and written as strings, so
+queries and the API are unchanged.
+
+The column type change rewrites tasks and tasks_archive under an ACCESS
+EXCLUSIVE lock, budget about a minute per 10M rows.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '007_task_enums'
+down_revision = '006_shard_directory'
+branch_labels = None
+depends_on = None
+
+TASK_STATUSES = ("pending", "in_progress", "completed")
+TASK_PRIORITIES = ("low", "medium", "high")
+
+# Partial indexes from 005 whose predicate compares status to text. Postgres would
+# rebuild them as status::text = 'completed', which enum queries can't use
+COMPLETED_INDEXES = ("idx_tasks_completed_updated", "idx_tasks_part_completed_updated")
+# tasks_partitioned only exists between migration 004 and the partition_tasks.py cutover
+TASK_TABLES = ("tasks", "tasks_partitioned")
+
+def labels(values) -> str:
+    return ", ".join(f"'{value}'" for value in values)
+
+def existing_tables():
+    bind = op.get_bind()
+    return [table for table in (*TASK_TABLES, "tasks_archive")
+            if bind.execute(sa.text("SELECT to_regclass(:name)"), {"name": table}).scalar() is not None]
+
+def drop_completed_indexes():
+    """Drop the completed-task partial indexes, returning (index, table) to recreate"""
+    rows = op.get_bind().execute(
+        sa.text("""SELECT indexname, tablename FROM pg_indexes
+                   WHERE schemaname = current_schema() AND indexname = ANY(:names) AND tablename = ANY(:tables)"""),
+        {"names": list(COMPLETED_INDEXES), "tables": list(TASK_TABLES)}
+    ).fetchall()
+    for index, _ in rows:
+        op.execute(f"DROP INDEX {index}")
+    return rows
+
+def create_completed_indexes(indexes) -> None:
+    for index, table in indexes:
+        op.execute(f"CREATE INDEX {index} ON {table} (updated_at) WHERE status = 'completed'")
+
+def upgrade() -> None:
+    op.execute(f"CREATE TYPE task_status AS ENUM ({labels(TASK_STATUSES)})")
+    op.execute(f"CREATE TYPE task_priority AS ENUM ({labels(TASK_PRIORITIES)})")
+
+    indexes = drop_completed_indexes()
+    for table in existing_tables():
+        # One ALTER so each table is rewritten once. Defaults are typed varchar and can't be cast in place
+        op.execute(f"""
+        ALTER TABLE {table}
+            ALTER COLUMN status DROP DEFAULT,
+            ALTER COLUMN priority DROP DEFAULT,
+            ALTER COLUMN status TYPE task_status USING status::task_status,
+            ALTER COLUMN priority TYPE task_priority USING priority::task_priority
+        """)
+        if table != "tasks_archive":
+            op.execute(f"""
+            ALTER TABLE {table}
+                ALTER COLUMN status SET DEFAULT 'pending',
+                ALTER COLUMN priority SET DEFAULT 'medium'
+            """)
+    create_completed_indexes(indexes)
+
+def downgrade() -> None:
+    indexes = drop_completed_indexes()
+    for table in existing_tables():
+        op.execute(f"""
+        ALTER TABLE {table}
+            ALTER COLUMN status DROP DEFAULT,
+            ALTER COLUMN priority DROP DEFAULT,
+            ALTER COLUMN status TYPE VARCHAR(50) USING status::text,
+            ALTER COLUMN priority TYPE VARCHAR(50) USING priority::text
+        """)
+        if table != "tasks_archive":
+            op.execute(f"""
+            ALTER TABLE {table}
+                ALTER COLUMN status SET DEFAULT 'pending',
+                ALTER COLUMN priority SET DEFAULT 'medium'
+            """)
+    create_completed_indexes(indexes)
+    op.execute("DROP TYPE task_priority")
+    op.execute("DROP TYPE task_status")
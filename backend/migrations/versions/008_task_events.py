@@ -0,0 +1,39 @@
+"""Task change history written in batches with COPY.
+
+Revision ID: 008_task_events
+Revises: 007_task_enums
+Create Date: 2026-10-19 16:00:00.000000
+
+One row per create/update/delete. No foreign key to tasks, so history
+outlives deleted and archived tasks. Served per task from
+(task_id, created_at).
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = '008_task_events'
+down_revision = '007_task_enums'
+branch_labels = None
+depends_on = None
+
+TASK_EVENT_TYPES = ("created", "updated", "deleted")
+
+def upgrade() -> None:
+    op.execute(f"CREATE TYPE task_event_type AS ENUM ({', '.join(repr(value) for value in TASK_EVENT_TYPES)})")
+    op.create_table(
+        'task_events',
+        sa.Column('id', sa.BigInteger, primary_key=True),
+        sa.Column('task_id', sa.Integer, nullable=False),
+        sa.Column('user_id', sa.Integer, sa.ForeignKey('users.id', ondelete='CASCADE'), nullable=False),
+        sa.Column('event', postgresql.ENUM(*TASK_EVENT_TYPES, name='task_event_type', create_type=False), nullable=False),
+        # Fields written by the change, null for deletes
+        sa.Column('changes', postgresql.JSONB),
+        sa.Column('created_at', sa.DateTime, nullable=False),
+    )
+    op.create_index('idx_task_events_task_created', 'task_events', ['task_id', 'created_at'])
+
+def downgrade() -> None:
+    op.drop_table('task_events')
+    op.execute("DROP TYPE task_event_type")
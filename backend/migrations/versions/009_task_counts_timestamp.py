@@ -0,0 +1,83 @@
+"""Stamp task_counts.last_updated_at with the transaction time on every change.
+
+Revision ID: 009_task_counts_timestamp
+Revises: 008_task_events
+Create Date: 2026-10-19 17:00:00.000000
+
+The counter trigger from 003 took NEW.updated_at on inserts and updates
+but LOCALTIMESTAMP on deletes, so /summary's last_updated_at mixed two
+clocks: a row's own updated_at can be anything a backfill or shard move
+copied in. Every branch now uses LOCALTIMESTAMP, the time of the
+transaction making the change, and never moves the value backwards.
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '009_task_counts_timestamp'
+down_revision = '008_task_events'
+branch_labels = None
+depends_on = None
+
+# {unchanged}, {removed} and {added} are the last_updated_at expressions for updates
+# that keep status and priority, for the row leaving its old buckets, and for the new row
+COUNTS_FUNCTION = """
+CREATE OR REPLACE FUNCTION update_task_counts() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP = 'UPDATE' AND OLD.user_id = NEW.user_id
+            AND OLD.status = NEW.status AND OLD.priority = NEW.priority THEN
+        UPDATE task_counts SET last_updated_at = {unchanged}
+        WHERE user_id = NEW.user_id;
+        RETURN NULL;
+    END IF;
+
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        UPDATE task_counts SET
+            pending = pending - (OLD.status = 'pending')::int,
+            in_progress = in_progress - (OLD.status = 'in_progress')::int,
+            completed = completed - (OLD.status = 'completed')::int,
+            low = low - (OLD.priority = 'low')::int,
+            medium = medium - (OLD.priority = 'medium')::int,
+            high = high - (OLD.priority = 'high')::int,
+            last_updated_at = {removed}
+        WHERE user_id = OLD.user_id;
+    END IF;
+
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        INSERT INTO task_counts AS c (user_id, pending, in_progress, completed, low, medium, high, last_updated_at)
+        VALUES (
+            NEW.user_id,
+            (NEW.status = 'pending')::int,
+            (NEW.status = 'in_progress')::int,
+            (NEW.status = 'completed')::int,
+            (NEW.priority = 'low')::int,
+            (NEW.priority = 'medium')::int,
+            (NEW.priority = 'high')::int,
+            {added}
+        )
+        ON CONFLICT (user_id) DO UPDATE SET
+            pending = c.pending + EXCLUDED.pending,
+            in_progress = c.in_progress + EXCLUDED.in_progress,
+            completed = c.completed + EXCLUDED.completed,
+            low = c.low + EXCLUDED.low,
+            medium = c.medium + EXCLUDED.medium,
+            high = c.high + EXCLUDED.high,
+            last_updated_at = GREATEST(c.last_updated_at, EXCLUDED.last_updated_at);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql
+"""
+
+def upgrade() -> None:
+    op.execute(COUNTS_FUNCTION.format(
+        unchanged="GREATEST(last_updated_at, LOCALTIMESTAMP)",
+        removed="GREATEST(last_updated_at, LOCALTIMESTAMP)",
+        added="LOCALTIMESTAMP"
+    ))
+
+def downgrade() -> None:
+    op.execute(COUNTS_FUNCTION.format(
+        unchanged="GREATEST(last_updated_at, NEW.updated_at)",
+        removed="LOCALTIMESTAMP",
+        added="NEW.updated_at"
+    ))
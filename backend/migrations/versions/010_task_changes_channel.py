@@ -0,0 +1,50 @@
+"""Send task change notifications on a channel per schema.
+
+Revision ID: 010_task_changes_channel
+Revises: 009_task_counts_timestamp
+Create Date: 2026-10-19 18:00:00.000000
+
+NOTIFY channels are global to the database, so schemas sharing one (each
+pytest-xdist worker migrates its own) received each other's task_changes.
+The trigger now notifies on task_changes:<schema of the table> and the
+listener subscribes to the channel of the schema it resolves tables in.
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '010_task_changes_channel'
+down_revision = '009_task_counts_timestamp'
+branch_labels = None
+depends_on = None
+
+# {channel} is the pg_notify channel expression
+NOTIFY_FUNCTION = """
+CREATE OR REPLACE FUNCTION notify_task_change() RETURNS trigger AS $$
+DECLARE
+    changed RECORD;
+BEGIN
+    IF TG_OP = 'DELETE' THEN
+        changed := OLD;
+    ELSE
+        changed := NEW;
+    END IF;
+    PERFORM pg_notify({channel}, json_build_object(
+        'id', nextval('task_change_event_seq'),
+        'op', CASE TG_OP WHEN 'INSERT' THEN 'created' WHEN 'UPDATE' THEN 'updated' ELSE 'deleted' END,
+        'task_id', changed.id,
+        'user_id', changed.user_id,
+        'title', changed.title,
+        'status', changed.status,
+        'priority', changed.priority,
+        'updated_at', changed.updated_at
+    )::text);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql
+"""
+
+def upgrade() -> None:
+    op.execute(NOTIFY_FUNCTION.format(channel="'task_changes:' || TG_TABLE_SCHEMA"))
+
+def downgrade() -> None:
+    op.execute(NOTIFY_FUNCTION.format(channel="'task_changes'"))
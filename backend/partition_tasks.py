@@ -0,0 +1,111 @@
+"""Online migration of tasks into the hash-partitioned table (migration 004).
+
+    python partition_tasks.py backfill [--batch-size 5000] [--pause 0.05]
+    python partition_tasks.py verify
+    python partition_tasks.py cutover
+    python partition_tasks.py drop-old
+
+backfill copies rows in id order, one short transaction per batch, while the
+mirror trigger keeps tasks_partitioned in sync with live writes. cutover
+swaps the tables under a brief lock; the old table is kept as
+tasks_unpartitioned until drop-old.
+"""
+import argparse
+import asyncio
+import os
+import time
+
+# Bulk statements here run far longer than request queries
+os.environ.setdefault("DATABASE_COMMAND_TIMEOUT", "86400")
+
+from app.database.connection import database
+
+COPY_BATCH = """
+INSERT INTO tasks_partitioned (id, user_id, title, description, status, priority, created_at, updated_at)
+SELECT id, user_id, title, description, status, priority, created_at, updated_at
+FROM tasks WHERE id > $1 AND id <= $2
+FOR SHARE
+ON CONFLICT (id, user_id) DO NOTHING
+"""
+
+async def backfill(batch_size: int, pause: float) -> None:
+    max_id = await database.fetchval("SELECT COALESCE(MAX(id), 0) FROM tasks")
+    last_id = 0
+    copied = 0
+    started = time.perf_counter()
+    while last_id < max_id:
+        upper = last_id + batch_size
+        # FOR SHARE holds off concurrent deletes of these rows until the batch commits,
+        # so the copy can't resurrect a row the mirror trigger already removed
+        result = await database.execute(COPY_BATCH, last_id, upper)
+        copied += int(result.split()[-1])
+        last_id = upper
+        print(f"copied up to id {min(last_id, max_id)}/{max_id} ({copied} rows, {time.perf_counter() - started:.1f}s)")
+        await asyncio.sleep(pause)
+    print(f"Backfill done: {copied} rows copied. Rows written since are mirrored by trigger.")
+
+async def verify() -> bool:
+    source = await database.fetchval("SELECT COUNT(*) FROM tasks")
+    target = await database.fetchval("SELECT COUNT(*) FROM tasks_partitioned")
+    missing = await database.fetchval(
+        """SELECT COUNT(*) FROM tasks t
+           WHERE NOT EXISTS (SELECT 1 FROM tasks_partitioned p WHERE p.id = t.id AND p.user_id = t.user_id)"""
+    )
+    print(f"tasks: {source}, tasks_partitioned: {target}, missing: {missing}")
+    return source == target and missing == 0
+
+async def cutover() -> None:
+    if not await verify():
+        raise SystemExit("Tables differ, run backfill first")
+
+    async with database.acquire() as connection:
+        async with connection.transaction():
+            # Fail fast instead of queueing every request behind a long-running transaction
+            await connection.execute("SET LOCAL lock_timeout = '5s'")
+            # No recount under the lock: the mirror trigger kept both tables equal since verify()
+            await connection.execute("LOCK TABLE tasks IN ACCESS EXCLUSIVE MODE")
+            await connection.execute("DROP TRIGGER tasks_mirror_to_partitioned ON tasks")
+            await connection.execute("DROP TRIGGER tasks_notify_change ON tasks")
+            await connection.execute("DROP TRIGGER tasks_update_counts ON tasks")
+            await connection.execute("ALTER TABLE tasks RENAME TO tasks_unpartitioned")
+            await connection.execute("ALTER TABLE tasks_partitioned RENAME TO tasks")
+            await connection.execute("ALTER SEQUENCE tasks_id_seq OWNED BY tasks.id")
+            # Same definitions as migration 005: archiver moves don't count as task changes
+            await connection.execute(
+                """CREATE TRIGGER tasks_notify_change AFTER INSERT OR UPDATE OR DELETE ON tasks
+                   FOR EACH ROW WHEN (current_setting('app.archiving', true) IS DISTINCT FROM 'on')
+                   EXECUTE FUNCTION notify_task_change()"""
+            )
+            await connection.execute(
+                """CREATE TRIGGER tasks_update_counts AFTER INSERT OR UPDATE OR DELETE ON tasks
+                   FOR EACH ROW WHEN (current_setting('app.archiving', true) IS DISTINCT FROM 'on')
+                   EXECUTE FUNCTION update_task_counts()"""
+            )
+    await database.execute("ANALYZE tasks")
+    print("Cutover complete, old table kept as tasks_unpartitioned")
+
+async def drop_old() -> None:
+    await database.execute("DROP TABLE IF EXISTS tasks_unpartitioned")
+    await database.execute("DROP FUNCTION IF EXISTS mirror_task_write()")
+    print("Dropped tasks_unpartitioned")
+
+async def main(args: argparse.Namespace) -> None:
+    await database.connect()
+    try:
+        if args.command == "backfill":
+            await backfill(args.batch_size, args.pause)
+        elif args.command == "verify":
+            await verify()
+        elif args.command == "cutover":
+            await cutover()
+        elif args.command == "drop-old":
+            await drop_old()
+    finally:
+        await database.disconnect()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("command", choices=["backfill", "verify", "cutover", "drop-old"])
+    parser.add_argument("--batch-size", type=int, default=5000, help="Id range copied per transaction")
+    parser.add_argument("--pause", type=float, default=0.05, help="Seconds to sleep between batches")
+    asyncio.run(main(parser.parse_args()))
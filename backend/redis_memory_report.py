@@ -0,0 +1,119 @@
+"""Redis memory per key family, estimated from MEMORY USAGE on sampled keys.
+
+    python redis_memory_report.py [--samples 200] [--match 'tasks:*'] [--compare-codecs]
+
+Keys are walked with SCAN, so the report is safe to run against a live
+server. Each family (task:{id}, tasks:{user}:page, user:{username}, ...) is
+reservoir-sampled, MEMORY USAGE is read for the sample and scaled by the
+family's key count. --compare-codecs also re-encodes the sampled values with
+each cache codec to show what switching CACHE_CODEC/CACHE_COMPRESSION saves.
+"""
+import argparse
+import asyncio
+import random
+import re
+from collections import defaultdict
+from typing import Any, Dict, List, Tuple
+
+from redis.client import NEVER_DECODE
+
+from app.core.codec import JsonCodec, MsgpackCodec, decode, zstandard, lz4_frame
+from app.core.redis import redis_client
+
+# First match wins, anything else is grouped by its first segment
+KEY_FAMILIES: List[Tuple[str, str]] = [
+    (r"^task:\d+$", "task:{id}"),
+    (r"^tasks:\d+:stale:", "tasks:{user}:stale:*"),
+    (r"^tasks:\d+:page:.*:archived", "tasks:{user}:page:*:archived"),
+    (r"^tasks:\d+:page:", "tasks:{user}:page:*"),
+    (r"^tasks:\d+:summary$", "tasks:{user}:summary"),
+    (r"^user:", "user:{username}"),
+    (r"^blacklist:", "blacklist:{token}"),
+]
+COMPILED_FAMILIES = [(re.compile(pattern), name) for pattern, name in KEY_FAMILIES]
+
+def key_family(key: str) -> str:
+    for pattern, name in COMPILED_FAMILIES:
+        if pattern.search(key):
+            return name
+    return key.split(":", 1)[0] + (":*" if ":" in key else "")
+
+def candidate_codecs() -> Dict[str, Any]:
+    codecs: Dict[str, Any] = {"json": JsonCodec(), "msgpack": MsgpackCodec()}
+    if zstandard is not None:
+        codecs["msgpack+zstd"] = MsgpackCodec("zstd")
+    if lz4_frame is not None:
+        codecs["msgpack+lz4"] = MsgpackCodec("lz4")
+    return codecs
+
+async def sample_keys(match: str, samples: int, rng: random.Random) -> Tuple[Dict[str, int], Dict[str, List[str]]]:
+    """Key count per family and a uniform sample of up to `samples` keys from each"""
+    counts: Dict[str, int] = defaultdict(int)
+    sampled: Dict[str, List[str]] = defaultdict(list)
+    async for key in redis_client.client.scan_iter(match=match, count=1000):
+        family = key_family(key)
+        counts[family] += 1
+        if len(sampled[family]) < samples:
+            sampled[family].append(key)
+        else:
+            slot = rng.randrange(counts[family])
+            if slot < samples:
+                sampled[family][slot] = key
+    return counts, sampled
+
+async def codec_sizes(keys: List[str], codecs: Dict[str, Any]) -> Dict[str, float]:
+    """Average encoded size per codec for the string values among keys"""
+    totals: Dict[str, int] = defaultdict(int)
+    decoded = 0
+    for key in keys:
+        try:
+            data = await redis_client.client.execute_command("GET", key, **{NEVER_DECODE: True})
+            value = decode(data) if data is not None else None
+        except Exception:
+            # Streams, sets and plain strings that are not cache objects
+            continue
+        if value is None:
+            continue
+        decoded += 1
+        for name, codec in codecs.items():
+            totals[name] += len(codec.encode(value))
+    return {name: total / decoded for name, total in totals.items()} if decoded else {}
+
+async def report(match: str, samples: int, compare: bool, seed: int) -> None:
+    counts, sampled = await sample_keys(match, samples, random.Random(seed))
+    codecs = candidate_codecs() if compare else {}
+    rows = []
+    for family, keys in sampled.items():
+        usage = [size for size in await asyncio.gather(*(redis_client.client.memory_usage(key) for key in keys)) if size]
+        average = sum(usage) / len(usage) if usage else 0.0
+        rows.append((family, counts[family], len(usage), average, average * counts[family],
+                     await codec_sizes(keys, codecs) if compare else {}))
+    rows.sort(key=lambda row: row[4], reverse=True)
+
+    total = sum(row[4] for row in rows)
+    print(f"{'family':<34} {'keys':>10} {'sampled':>8} {'avg bytes':>10} {'est MB':>9} {'share':>6}")
+    for family, keys, sampled_count, average, estimate, _ in rows:
+        print(f"{family:<34} {keys:>10} {sampled_count:>8} {average:>10.0f} {estimate / 1e6:>9.1f} {estimate / max(total, 1):>6.1%}")
+    print(f"{'total':<34} {sum(counts.values()):>10} {'':>8} {'':>10} {total / 1e6:>9.1f}")
+
+    if compare:
+        print("\naverage encoded value size by codec (bytes, excluding per-key overhead)")
+        print(f"{'family':<34} " + " ".join(f"{name:>13}" for name in codecs))
+        for family, _, _, _, _, sizes in rows:
+            if sizes:
+                print(f"{family:<34} " + " ".join(f"{sizes[name]:>13.0f}" for name in codecs))
+
+async def main(args: argparse.Namespace) -> None:
+    await redis_client.connect()
+    try:
+        await report(args.match, args.samples, args.compare_codecs, args.seed)
+    finally:
+        await redis_client.disconnect()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--samples", type=int, default=200, help="Keys sampled per family")
+    parser.add_argument("--match", default="*", help="SCAN MATCH pattern to restrict the walk")
+    parser.add_argument("--compare-codecs", action="store_true", help="Also size sampled values under each codec")
+    parser.add_argument("--seed", type=int, default=42)
+    asyncio.run(main(parser.parse_args()))
@@ -1,15 +1,27 @@
 import asyncio
 from app.database.connection import database
+from app.database.sharding import shards
 from app.core.security import hash_password
 
+ADMIN_ROW = "SELECT id, username, email, role, is_active, created_at FROM users WHERE username = 'admin'"
+
 async def seed_admin():
     await database.connect()
-    
+    # Seeding writes no tasks, so it doesn't need init-sequences to have run
+    await shards.connect(check_sequences=False)
+    try:
+        await create_admin()
+    finally:
+        await shards.disconnect()
+        await database.disconnect()
+
+async def create_admin():
     # Check if admin already exists
-    admin = await database.fetchrow("SELECT id FROM users WHERE username = 'admin'")
+    admin = await database.fetchrow(ADMIN_ROW)
     if admin:
+        # Also repairs an admin seeded before its shard had a copy
+        await shards.ensure_user(dict(admin))
         print("Admin user already exists")
-        await database.disconnect()
         return
     
     # Create admin user
@@ -23,12 +35,11 @@ async def seed_admin():
         "admin",
         True
     )
+    await shards.ensure_user(dict(await database.fetchrow(ADMIN_ROW)))
     
     print("Admin user created successfully")
     print("Username: admin")
     print("Password: Admin123")
-    
-    await database.disconnect()
 
 if __name__ == "__main__":
     asyncio.run(seed_admin())
@@ -0,0 +1,162 @@
+"""Synthetic users and tasks for load tests, bulk-loaded with COPY.
+
+    python seed_load_data.py --users 100000 --tasks 10000000 [--zipf 1.1] [--prefix load]
+    python seed_load_data.py --drop [--prefix load]
+
+Users are named {prefix}_{n} with password LoadTest123 (benchmarks/load_test.py
+logs in with the same scheme). Task counts per user follow a Zipf
+distribution, so a few users own most tasks, as in production.
+"""
+import argparse
+import asyncio
+import os
+import random
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Dict, Iterator, List, Tuple
+
+# Bulk statements here run far longer than request queries
+os.environ.setdefault("DATABASE_COMMAND_TIMEOUT", "86400")
+
+from app.database.connection import Database, database
+from app.database.sharding import COPY_USER, shards
+from app.core.security import hash_password
+
+LOAD_PASSWORD = "LoadTest123"
+
+TITLE_WORDS = ["Review", "Draft", "Update", "Fix", "Plan", "Call", "Email", "Prepare", "Ship", "Test"]
+TITLE_OBJECTS = ["report", "budget", "release", "invoice", "slides", "roadmap", "contract", "backlog", "demo", "docs"]
+STATUSES = (["pending"] * 4) + (["in_progress"] * 2) + (["completed"] * 4)
+PRIORITIES = ["low", "medium", "medium", "high"]
+
+TASK_COLUMNS = ["user_id", "title", "description", "status", "priority", "created_at", "updated_at"]
+
+# Counters are rebuilt once per chunk instead of row by row in the trigger
+REBUILD_COUNTS = """
+INSERT INTO task_counts (user_id, pending, in_progress, completed, low, medium, high, last_updated_at)
+SELECT user_id,
+       COUNT(*) FILTER (WHERE status = 'pending'),
+       COUNT(*) FILTER (WHERE status = 'in_progress'),
+       COUNT(*) FILTER (WHERE status = 'completed'),
+       COUNT(*) FILTER (WHERE priority = 'low'),
+       COUNT(*) FILTER (WHERE priority = 'medium'),
+       COUNT(*) FILTER (WHERE priority = 'high'),
+       MAX(updated_at)
+FROM tasks WHERE user_id = ANY($1::int[]) GROUP BY user_id
+ON CONFLICT (user_id) DO UPDATE SET
+    pending = EXCLUDED.pending, in_progress = EXCLUDED.in_progress, completed = EXCLUDED.completed,
+    low = EXCLUDED.low, medium = EXCLUDED.medium, high = EXCLUDED.high,
+    last_updated_at = EXCLUDED.last_updated_at
+"""
+
+def zipf_counts(users: int, total_tasks: int, exponent: float, rng: random.Random) -> List[int]:
+    """Tasks per user, rank r owning a share proportional to 1 / r^exponent, in random user order"""
+    weights = [1 / rank ** exponent for rank in range(1, users + 1)]
+    scale = total_tasks / sum(weights)
+    counts = [int(weight * scale) for weight in weights]
+    # Hand the rounding remainder to the heaviest users
+    for rank in range(total_tasks - sum(counts)):
+        counts[rank % users] += 1
+    rng.shuffle(counts)
+    return counts
+
+def task_rows(user_ids: List[int], counts: List[int], days: int, rng: random.Random) -> Iterator[Tuple]:
+    now = datetime.utcnow()
+    for user_id, count in zip(user_ids, counts):
+        for _ in range(count):
+            created_at = now - timedelta(seconds=rng.randrange(days * 86400))
+            updated_at = min(now, created_at + timedelta(seconds=rng.randrange(7 * 86400)))
+            description = None if rng.random() < 0.3 else "lorem ipsum " * rng.randrange(1, 30)
+            yield (
+                user_id,
+                f"{rng.choice(TITLE_WORDS)} {rng.choice(TITLE_OBJECTS)}",
+                description,
+                rng.choice(STATUSES),
+                rng.choice(PRIORITIES),
+                created_at,
+                updated_at,
+            )
+
+async def load_chunk(usernames: List[str], counts: List[int], hashed_password: str, days: int, rng: random.Random) -> int:
+    async with database.acquire() as connection:
+        async with connection.transaction():
+            await connection.copy_records_to_table(
+                "users",
+                records=[(name, f"{name}@example.com", hashed_password, "user", True) for name in usernames],
+                columns=["username", "email", "hashed_password", "role", "is_active"],
+            )
+            rows = await connection.fetch(
+                "SELECT id, username, email, role, is_active, created_at FROM users WHERE username = ANY($1::text[])", usernames
+            )
+    users_by_name = {row["username"]: row for row in rows}
+
+    # Tasks go to the shard each user routes to, like the API would write them
+    by_shard: Dict[Database, List[Tuple]] = defaultdict(list)
+    for name, count in zip(usernames, counts):
+        user = users_by_name[name]
+        by_shard[shards.for_user(user["id"])].append((user, count))
+    for shard, users in by_shard.items():
+        await load_shard_tasks(shard, users, days, rng)
+    return sum(counts)
+
+async def load_shard_tasks(shard: Database, users: List[Tuple], days: int, rng: random.Random) -> None:
+    user_ids = [user["id"] for user, _ in users]
+    async with shard.acquire() as connection:
+        async with connection.transaction():
+            if shard is not database:
+                await connection.executemany(COPY_USER, [tuple(user.values()) for user, _ in users])
+            # Like the archiver, skip the per-row change notifications and counter upserts
+            await connection.execute("SET LOCAL app.archiving = 'on'")
+            await connection.copy_records_to_table(
+                "tasks", records=task_rows(user_ids, [count for _, count in users], days, rng), columns=TASK_COLUMNS
+            )
+            await connection.execute(REBUILD_COUNTS, user_ids)
+
+async def seed(users: int, tasks: int, exponent: float, prefix: str, days: int, chunk: int, seed_value: int) -> None:
+    rng = random.Random(seed_value)
+    counts = zipf_counts(users, tasks, exponent, rng)
+    hashed_password = hash_password(LOAD_PASSWORD)
+    started = time.perf_counter()
+    loaded = 0
+    for start in range(0, users, chunk):
+        usernames = [f"{prefix}_{n}" for n in range(start, min(start + chunk, users))]
+        loaded += await load_chunk(usernames, counts[start:start + len(usernames)], hashed_password, days, rng)
+        elapsed = time.perf_counter() - started
+        print(f"users {start + len(usernames)}/{users}, tasks {loaded}/{tasks} ({loaded / elapsed:,.0f} rows/s)")
+    top = sorted(counts, reverse=True)
+    print(f"heaviest user has {top[0]} tasks, top 1% of users own {sum(top[:max(1, users // 100)]) / max(1, tasks):.0%}")
+    await database.execute("ANALYZE users")
+    await shards.fan_out("execute", "ANALYZE tasks")
+
+async def drop(prefix: str) -> None:
+    # Tasks and counters go with the users (and their shard copies) through ON DELETE CASCADE
+    for shard in shards.all():
+        if shard is not database:
+            await shard.execute(r"DELETE FROM users WHERE username LIKE $1 || '\_%'", prefix)
+    result = await database.execute(r"DELETE FROM users WHERE username LIKE $1 || '\_%'", prefix)
+    print(result)
+
+async def main(args: argparse.Namespace) -> None:
+    await database.connect()
+    await shards.connect()
+    try:
+        if args.drop:
+            await drop(args.prefix)
+        else:
+            await seed(args.users, args.tasks, args.zipf, args.prefix, args.days, args.chunk, args.seed)
+    finally:
+        await shards.disconnect()
+        await database.disconnect()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=10_000)
+    parser.add_argument("--tasks", type=int, default=1_000_000)
+    parser.add_argument("--zipf", type=float, default=1.1, help="Zipf exponent, higher concentrates tasks on fewer users")
+    parser.add_argument("--prefix", default="load", help="Username prefix, also used by --drop")
+    parser.add_argument("--days", type=int, default=365, help="Spread created_at over this many days")
+    parser.add_argument("--chunk", type=int, default=1000, help="Users per COPY transaction")
+    parser.add_argument("--seed", type=int, default=42, help="Random seed, same seed gives the same data")
+    parser.add_argument("--drop", action="store_true", help="Delete previously generated users and their tasks")
+    asyncio.run(main(parser.parse_args()))
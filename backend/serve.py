@@ -0,0 +1,45 @@
+"""Production entry point: N uvicorn workers sharing one Postgres connection budget.
+
+    WEB_WORKERS=4 DATABASE_CONNECTION_BUDGET=80 python serve.py
+
+WEB_WORKERS defaults to the number of usable CPUs. Each worker keeps one
+LISTEN connection per shard and splits the rest of its share between its
+pools: (DATABASE_CONNECTION_BUDGET / WEB_WORKERS - listen connections) /
+pools (see app/core/config.py). app.worker is a separate process with its
+own budget, the two together must fit under max_connections.
+More than one worker without a budget is refused, every worker would open
+up to DATABASE_POOL_MAX_SIZE connections of its own.
+"""
+import os
+import uvicorn
+
+def default_workers() -> int:
+    # Respect CPU affinity/cgroup limits in containers where available
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+def check_connection_budget(workers: int) -> None:
+    if workers > 1 and int(os.getenv("DATABASE_CONNECTION_BUDGET", "0")) <= 0:
+        raise SystemExit(
+            f"Refusing to start {workers} workers without DATABASE_CONNECTION_BUDGET, "
+            f"set it below Postgres max_connections or run with WEB_WORKERS=1"
+        )
+
+def main() -> None:
+    workers = int(os.getenv("WEB_WORKERS", "0")) or default_workers()
+    check_connection_budget(workers)
+    # Workers are spawned processes that re-read the environment on import
+    os.environ["WEB_WORKERS"] = str(workers)
+
+    uvicorn.run(
+        "app.main:app",
+        host=os.getenv("HOST", "0.0.0.0"),
+        port=int(os.getenv("PORT", "8000")),
+        workers=workers,
+        proxy_headers=True,
+        timeout_graceful_shutdown=int(os.getenv("GRACEFUL_SHUTDOWN_TIMEOUT", "30")),
+    )
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,238 @@
+"""Task shard administration: sequences, pinning and online user moves.
+
+    python shard_tool.py status [--check]
+    python shard_tool.py init-sequences [--stride 64]
+    python shard_tool.py pin --add NAME=URL
+    python shard_tool.py pin --user ID --shard NAME
+    python shard_tool.py move --user ID --to NAME [--settle 11]
+    python shard_tool.py rebalance [--limit 100] [--pause 1]
+
+Adding a shard: migrate it, run `pin --add` so users whose ring position
+changes stay where their rows are, append it to DATABASE_SHARD_URLS, run
+init-sequences and roll out. `rebalance` then moves the pinned users to the
+shard the ring picks, one at a time, while the API keeps serving. Users who
+registered while the rollout was in progress show up in `status --check`.
+
+A move marks the user as moving in shard_directory and waits until every
+worker has refreshed its directory, so their writes get a 503. It then copies
+the user's tasks, archive, counters and history to the target, verifies the
+counts, points the directory at the target and, after another refresh,
+deletes the rows from the source. Reads keep going to the source until the
+flip.
+"""
+import argparse
+import asyncio
+import os
+import time
+from typing import Dict, List
+
+# Bulk statements here run far longer than request queries
+os.environ.setdefault("DATABASE_COMMAND_TIMEOUT", "86400")
+
+from app.core.config import SHARD_DIRECTORY_REFRESH, SHARD_VIRTUAL_NODES
+from app.database.connection import Database, database
+from app.database.sharding import COPY_USER, TASK_ID_SEQUENCE, HashRing, shards
+
+# Per-user tables that move with a user, the users row itself is handled separately
+USER_TABLES = ["tasks", "tasks_archive", "task_counts", "task_events"]
+# Columns the target assigns itself. task_events ids come from each shard's own sequence
+# and would collide with the target's, tasks ids are unique across shards (init-sequences)
+GENERATED_COLUMNS = {"task_events": "id"}
+
+async def status(check: bool) -> None:
+    pinned = await database.fetch("SELECT shard, moving, COUNT(*) AS users FROM shard_directory GROUP BY shard, moving")
+    print(f"{'shard':<16} {'tasks':>12} {'archived':>12} {'users':>10} {'pinned':>8} {'moving':>8}")
+    for name, shard in shards.shards.items():
+        tasks = await shard.fetchval("SELECT COUNT(*) FROM tasks")
+        archived = await shard.fetchval("SELECT COUNT(*) FROM tasks_archive")
+        users = await shard.fetchval("SELECT COUNT(*) FROM task_counts")
+        print(f"{name:<16} {tasks:>12} {archived:>12} {users:>10} "
+              f"{sum(row['users'] for row in pinned if row['shard'] == name):>8} "
+              f"{sum(row['users'] for row in pinned if row['shard'] == name and row['moving']):>8}")
+    if check:
+        await check_routing()
+
+async def check_routing() -> None:
+    """Users with tasks on a shard the router does not send them to"""
+    misrouted = 0
+    for name, shard in shards.shards.items():
+        for row in await shard.fetch("SELECT user_id FROM task_counts"):
+            routed = shards.shard_name(row["user_id"])
+            if routed != name:
+                misrouted += 1
+                print(f"user {row['user_id']} has tasks on {name} but routes to {routed}, "
+                      f"fix with: pin --user {row['user_id']} --shard {name}")
+    print(f"{misrouted} misrouted users")
+
+async def init_sequences(stride: int, margin: int) -> None:
+    """Give each shard's tasks_id_seq a distinct residue mod stride so task ids never collide"""
+    names = list(shards.shards)
+    if len(names) > stride:
+        raise SystemExit(f"{len(names)} shards do not fit a stride of {stride}")
+    highest = max(await shards.fan_out("fetchval", "SELECT COALESCE(MAX(id), 0) FROM tasks"))
+    for residue, name in enumerate(names, start=1):
+        shard = shards.shards[name]
+        sequence = await shard.fetchrow(TASK_ID_SEQUENCE)
+        if sequence["increment_by"] == stride and sequence["last_value"] % stride == residue % stride:
+            print(f"{name}: already striding by {stride} with residue {residue}")
+            continue
+        # Jump well past ids handed out while this runs
+        start = ((highest + margin) // stride + 1) * stride + residue
+        await shard.execute(f"ALTER SEQUENCE tasks_id_seq INCREMENT BY {stride} RESTART WITH {start}")
+        print(f"{name}: tasks_id_seq restarts at {start}, increment {stride}")
+
+async def pin_for_new_shard(spec: str) -> None:
+    """Pin users whose ring position moves to the new shard to the shard holding their rows"""
+    name, _, url = spec.partition("=")
+    if not url or name in shards.shards:
+        raise SystemExit("--add takes NAME=URL for a shard not yet in DATABASE_SHARD_URLS")
+    ring = HashRing([*shards.shards, name], SHARD_VIRTUAL_NODES)
+    user_ids: List[int] = []
+    current: List[str] = []
+    for row in await database.fetch("SELECT id FROM users"):
+        user_id = row["id"]
+        if user_id not in shards.directory and ring.node(user_id) != shards.shard_name(user_id):
+            user_ids.append(user_id)
+            current.append(shards.shard_name(user_id))
+    await database.execute(
+        """INSERT INTO shard_directory (user_id, shard)
+           SELECT * FROM unnest($1::int[], $2::text[]) ON CONFLICT (user_id) DO NOTHING""",
+        user_ids, current
+    )
+    print(f"Pinned {len(user_ids)} users, add {name} to DATABASE_SHARD_URLS (at the end) and roll out")
+
+async def pin_user(user_id: int, shard: str) -> None:
+    if shard not in shards.shards:
+        raise SystemExit(f"Unknown shard {shard}")
+    await database.execute(
+        """INSERT INTO shard_directory (user_id, shard) VALUES ($1, $2)
+           ON CONFLICT (user_id) DO UPDATE SET shard = EXCLUDED.shard, updated_at = now()""",
+        user_id, shard
+    )
+    print(f"user {user_id} pinned to {shard}")
+
+async def row_counts(shard: Database, user_id: int) -> Dict[str, int]:
+    return {table: await shard.fetchval(f"SELECT COUNT(*) FROM {table} WHERE user_id = $1", user_id) for table in USER_TABLES}
+
+async def delete_user_rows(shard: Database, user_id: int, drop_user: bool) -> None:
+    async with shard.acquire() as connection:
+        async with connection.transaction():
+            # Not task changes: no stream events, no counter updates
+            await connection.execute("SET LOCAL app.archiving = 'on'")
+            for table in USER_TABLES:
+                await connection.execute(f"DELETE FROM {table} WHERE user_id = $1", user_id)
+            if drop_user:
+                await connection.execute("DELETE FROM users WHERE id = $1", user_id)
+
+async def copy_user_rows(source: Database, target: Database, user_id: int) -> None:
+    user = await database.fetchrow("SELECT id, username, email, role, is_active, created_at FROM users WHERE id = $1", user_id)
+    if user is None:
+        raise SystemExit(f"No user {user_id}")
+    async with target.acquire() as connection:
+        async with connection.transaction():
+            await connection.execute("SET LOCAL app.archiving = 'on'")
+            if target is not database:
+                await connection.execute(COPY_USER, *user.values())
+            for table in USER_TABLES:
+                # Leftovers from an aborted move
+                await connection.execute(f"DELETE FROM {table} WHERE user_id = $1", user_id)
+                generated = GENERATED_COLUMNS.get(table)
+                order = f" ORDER BY {generated}" if generated else ""
+                rows = await source.fetch(f"SELECT * FROM {table} WHERE user_id = $1{order}", user_id)
+                if rows:
+                    columns = [column for column in rows[0].keys() if column != generated]
+                    await connection.copy_records_to_table(
+                        table, records=[tuple(row[column] for column in columns) for row in rows], columns=columns
+                    )
+
+async def set_directory(user_id: int, shard: str, moving: bool) -> None:
+    await database.execute(
+        """INSERT INTO shard_directory (user_id, shard, moving) VALUES ($1, $2, $3)
+           ON CONFLICT (user_id) DO UPDATE SET shard = EXCLUDED.shard, moving = EXCLUDED.moving, updated_at = now()""",
+        user_id, shard, moving
+    )
+
+async def move(user_id: int, target_name: str, settle: float) -> None:
+    await shards.refresh()
+    source_name = shards.shard_name(user_id)
+    if target_name not in shards.shards:
+        raise SystemExit(f"Unknown shard {target_name}")
+    if source_name == target_name:
+        print(f"user {user_id} is already on {target_name}")
+        return
+    source, target = shards.shards[source_name], shards.shards[target_name]
+    started = time.perf_counter()
+
+    await set_directory(user_id, source_name, moving=True)
+    # Every worker has to see the flag before the copy starts
+    await asyncio.sleep(settle)
+    try:
+        await copy_user_rows(source, target, user_id)
+        expected, copied = await row_counts(source, user_id), await row_counts(target, user_id)
+        if expected != copied:
+            raise RuntimeError(f"row counts differ after copy: source {expected}, target {copied}")
+    except BaseException:
+        await delete_user_rows(target, user_id, drop_user=target is not database)
+        await set_directory(user_id, source_name, moving=False)
+        raise
+
+    if target_name == shards.ring.node(user_id):
+        await database.execute("DELETE FROM shard_directory WHERE user_id = $1", user_id)
+    else:
+        await set_directory(user_id, target_name, moving=False)
+    # Workers still reading from the source until their next refresh
+    await asyncio.sleep(settle)
+    await delete_user_rows(source, user_id, drop_user=source is not database)
+    print(f"user {user_id}: {source_name} -> {target_name}, {sum(copied.values())} rows, "
+          f"{time.perf_counter() - started:.1f}s")
+
+async def rebalance(limit: int, pause: float, settle: float) -> None:
+    """Move pinned users to the shard the ring assigns them"""
+    rows = await database.fetch("SELECT user_id, shard FROM shard_directory WHERE NOT moving ORDER BY user_id")
+    pending = [row for row in rows if shards.ring.node(row["user_id"]) != row["shard"]][:limit]
+    for row in pending:
+        await move(row["user_id"], shards.ring.node(row["user_id"]), settle)
+        await asyncio.sleep(pause)
+    print(f"Moved {len(pending)} users, {len(rows) - len(pending)} left pinned")
+
+async def main(args: argparse.Namespace) -> None:
+    await database.connect()
+    # init-sequences is how overlapping sequences get fixed
+    await shards.connect(check_sequences=False)
+    try:
+        if args.command == "status":
+            await status(args.check)
+        elif args.command == "init-sequences":
+            await init_sequences(args.stride, args.margin)
+        elif args.command == "pin" and args.add:
+            await pin_for_new_shard(args.add)
+        elif args.command == "pin":
+            await pin_user(args.user, args.shard)
+        elif args.command == "move":
+            await move(args.user, args.to, args.settle)
+        elif args.command == "rebalance":
+            await rebalance(args.limit, args.pause, args.settle)
+    finally:
+        await shards.disconnect()
+        await database.disconnect()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("command", choices=["status", "init-sequences", "pin", "move", "rebalance"])
+    parser.add_argument("--check", action="store_true", help="status: also list users whose tasks sit on another shard")
+    parser.add_argument("--stride", type=int, default=64, help="init-sequences: id step, the most shards ever expected")
+    parser.add_argument("--margin", type=int, default=100_000, help="init-sequences: ids skipped past the current maximum")
+    parser.add_argument("--add", help="pin: NAME=URL of the shard about to be added")
+    parser.add_argument("--user", type=int, help="pin/move: user id")
+    parser.add_argument("--shard", help="pin: shard to pin --user to")
+    parser.add_argument("--to", help="move: target shard")
+    parser.add_argument("--limit", type=int, default=100, help="rebalance: users moved per run")
+    parser.add_argument("--pause", type=float, default=1.0, help="rebalance: seconds between moves")
+    parser.add_argument("--settle", type=float, default=2 * SHARD_DIRECTORY_REFRESH + 1,
+                        help="Seconds for every worker to pick up a directory change")
+    args = parser.parse_args()
+    if args.command == "pin" and not args.add and (args.user is None or not args.shard):
+        parser.error("pin needs --add NAME=URL, or --user and --shard")
+    if args.command == "move" and (args.user is None or not args.to):
+        parser.error("move needs --user and --to")
+    asyncio.run(main(args))
@@ -1,14 +1,67 @@
+import asyncio
+import os
+
+# Override environment for testing, before the app reads its settings
+os.environ["ENVIRONMENT"] = "testing"
+os.environ["RATE_LIMIT_ENABLED"] = "false"
+# In-memory Redis unless a real one is asked for (TEST_REDIS_URL=redis://...)
+os.environ["REDIS_URL"] = os.getenv("TEST_REDIS_URL", "memory://")
+# Each pytest-xdist worker migrates and truncates its own schema
+os.environ["DATABASE_SCHEMA"] = f"test_{os.getenv('PYTEST_XDIST_WORKER', 'main')}"
+os.environ.setdefault("DATABASE_POOL_MIN_SIZE", "1")
+os.environ.setdefault("DATABASE_POOL_MAX_SIZE", "5")
+
+import asyncpg
 import pytest
 import pytest_asyncio
+from alembic import command
+from alembic.config import Config
 from httpx import AsyncClient
 from app.main import app
 from app.database.connection import database
-from app.core.config import Environment, ENVIRONMENT
-import os
+from app.core.redis import redis_client
+from app.core.config import Environment, ENVIRONMENT, DATABASE_URL, DATABASE_SCHEMA
 
-# Override environment for testing
-os.environ["ENVIRONMENT"] = "testing"
-os.environ["RATE_LIMIT_ENABLED"] = "false"
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+async def _reset_schema() -> None:
+    connection = await asyncpg.connect(DATABASE_URL.replace("+asyncpg", ""), timeout=5)
+    try:
+        await connection.execute(f'DROP SCHEMA IF EXISTS "{DATABASE_SCHEMA}" CASCADE')
+    finally:
+        await connection.close()
+
+@pytest.fixture(scope="session")
+def test_schema():
+    """Migrate a fresh schema for this worker, None when Postgres is unreachable"""
+    try:
+        asyncio.run(_reset_schema())
+    except (OSError, asyncpg.PostgresError, asyncio.TimeoutError):
+        yield None
+        return
+    config = Config(os.path.join(BACKEND_DIR, "alembic.ini"))
+    config.set_main_option("script_location", os.path.join(BACKEND_DIR, "migrations"))
+    command.upgrade(config, "head")
+    yield DATABASE_SCHEMA
+    asyncio.run(_reset_schema())
+
+@pytest_asyncio.fixture(autouse=True)
+async def isolated_backends(test_schema):
+    """Give every test empty tables and an empty Redis"""
+    if test_schema is not None:
+        connection = await asyncpg.connect(DATABASE_URL.replace("+asyncpg", ""))
+        try:
+            tables = await connection.fetch(
+                "SELECT tablename FROM pg_tables WHERE schemaname = $1 AND tablename <> 'alembic_version'", test_schema
+            )
+            if tables:
+                names = ", ".join(f'"{test_schema}"."{row["tablename"]}"' for row in tables)
+                await connection.execute(f"TRUNCATE {names} RESTART IDENTITY CASCADE")
+        finally:
+            await connection.close()
+    await redis_client.connect()
+    yield
+    await redis_client.disconnect()
 
 @pytest_asyncio.fixture
 async def client():
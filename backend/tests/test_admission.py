@@ -0,0 +1,69 @@
+import time
+import pytest
+from httpx import AsyncClient
+from app.main import app
+from app.core import admission
+from app.core.admission import AdmissionController
+from app.database.connection import database
+from app.database.sharding import ShardRouter
+
+@pytest.fixture
+def pool_pressure():
+    """Reset the pool pressure counters after each test"""
+    yield database
+    database.waiting = 0
+    database.acquire_wait_ewma = 0.0
+    database.last_acquire_at = 0.0
+
+def test_overloaded_by_pool_waiters(pool_pressure):
+    """Test controller sheds once waiters reach the limit"""
+    controller = AdmissionController(max_waiters=10, max_acquire_wait_ms=250, retry_after=2)
+    pool_pressure.waiting = 9
+    assert not controller.is_overloaded()
+    pool_pressure.waiting = 10
+    assert controller.is_overloaded()
+
+def test_overloaded_by_recent_acquire_wait(pool_pressure):
+    """Test slow acquires shed only while they are recent"""
+    controller = AdmissionController(max_waiters=10, max_acquire_wait_ms=250, retry_after=2)
+    pool_pressure.acquire_wait_ewma = 0.5
+    pool_pressure.last_acquire_at = time.monotonic()
+    assert controller.is_overloaded()
+    pool_pressure.last_acquire_at = time.monotonic() - 60
+    assert not controller.is_overloaded()
+
+def test_acquire_wait_decays_between_samples(pool_pressure):
+    """Test a fast acquire after a quiet spell does not bring back the old slow average"""
+    controller = AdmissionController(max_waiters=10, max_acquire_wait_ms=250, retry_after=2)
+    pool_pressure.acquire_wait_ewma = 0.5
+    pool_pressure.last_acquire_at = time.monotonic() - 6
+    pool_pressure._record_acquire_wait(0.001)
+    assert pool_pressure.acquire_wait_ewma < 0.01
+    assert not controller.is_overloaded()
+
+def test_overloaded_by_shard_pool(pool_pressure, monkeypatch):
+    """Test waiters on a shard pool shed load even when the primary pool is idle"""
+    router = ShardRouter(database, {"a": "postgresql://shard-a/taskdb"}, vnodes=8, refresh_interval=5)
+    monkeypatch.setattr(admission, "shards", router)
+    controller = AdmissionController(max_waiters=10, max_acquire_wait_ms=250, retry_after=2)
+    assert not controller.is_overloaded()
+    router.shards["a"].waiting = 10
+    assert controller.is_overloaded()
+
+def test_disabled_controller_never_sheds(pool_pressure):
+    """Test ADMISSION_CONTROL_ENABLED=false turns shedding off"""
+    controller = AdmissionController(max_waiters=1, max_acquire_wait_ms=250, retry_after=2, enabled=False)
+    pool_pressure.waiting = 100
+    assert not controller.is_overloaded()
+
+@pytest.mark.asyncio
+async def test_shed_request_returns_503(pool_pressure):
+    """Test non-critical routes fail fast with Retry-After when overloaded"""
+    pool_pressure.waiting = 10_000
+    async with AsyncClient(app=app, base_url="http://test") as client:
+        response = await client.post("/api/v1/tasks", json={"title": "Test Task"})
+        assert response.status_code == 503
+        assert "Retry-After" in response.headers
+
+        health = await client.get("/health")
+        assert health.status_code == 200
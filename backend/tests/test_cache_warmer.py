@@ -0,0 +1,59 @@
+import asyncio
+from datetime import datetime
+import pytest
+from app.core import cache_warmer
+from app.core.cache import task_key, task_page_key
+from app.core.cache_warmer import CacheWarmer
+from app.core.redis import redis_client
+from app.database.connection import database
+
+def task_row(task_id: int) -> dict:
+    now = datetime(2026, 1, 1)
+    return {
+        "id": task_id, "user_id": 7, "title": f"task {task_id}", "description": None,
+        "status": "pending", "priority": "medium", "created_at": now, "updated_at": now
+    }
+
+@pytest.mark.asyncio
+async def test_warm_skipped_under_pool_pressure():
+    """Test warming backs off instead of adding load to a saturated pool"""
+    warmer = CacheWarmer(pages=1, page_size=50, max_in_flight=5)
+    database.waiting = 10_000
+    try:
+        assert warmer.schedule(1) is False
+    finally:
+        database.waiting = 0
+
+@pytest.mark.asyncio
+async def test_disabled_warmer_schedules_nothing():
+    """Test CACHE_WARM_ENABLED=false turns prefetching off"""
+    warmer = CacheWarmer(pages=1, page_size=50, max_in_flight=5, enabled=False)
+    assert warmer.schedule(1) is False
+    assert not warmer._tasks
+
+@pytest.mark.asyncio
+async def test_schedule_during_warm_reruns_it(monkeypatch):
+    """Test a warm that read before a write stores the page read after it, not its own"""
+    warmer = CacheWarmer(pages=1, page_size=50, max_in_flight=5)
+    reads = []
+
+    class Shard:
+        async def fetch(self, query, user_id, limit, offset):
+            reads.append(user_id)
+            if len(reads) == 1:
+                # A write lands and its invalidation schedules this user again
+                assert warmer.schedule(user_id) is False
+                return [task_row(1)]
+            return [task_row(2)]
+
+    class Router:
+        def for_user(self, user_id):
+            return Shard()
+
+    monkeypatch.setattr(cache_warmer, "shards", Router())
+    assert warmer.schedule(7) is True
+    await asyncio.gather(*warmer._tasks)
+    assert len(reads) == 2
+    assert await redis_client.get_value(task_page_key(7, 0, 50)) == [2]
+    assert await redis_client.get_value(task_key(1)) is None
+    assert not warmer._warming and not warmer._dirty
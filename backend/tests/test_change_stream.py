@@ -0,0 +1,99 @@
+import pytest
+from httpx import AsyncClient
+from app.main import app
+from app.core import change_stream
+from app.core.change_stream import ChangeStreamBroker, SentIds, task_change_broker
+from app.core.dependencies import get_current_user
+
+def make_event(event_id: int, user_id: int = 1, op: str = "updated") -> dict:
+    return {"id": event_id, "op": op, "task_id": 10, "user_id": user_id}
+
+@pytest.mark.asyncio
+async def test_publish_routes_to_user_subscribers():
+    """Test events only reach streams of the owning user"""
+    broker = ChangeStreamBroker(queue_size=10, buffer_size=10, max_subscribers=10)
+    mine = broker.subscribe(1)
+    other = broker.subscribe(2)
+    broker.publish(make_event(1, user_id=1))
+    assert mine.queue.qsize() == 1
+    assert other.queue.qsize() == 0
+
+@pytest.mark.asyncio
+async def test_slow_subscriber_is_reset_not_blocked():
+    """Test a full queue flags the stream for resync instead of blocking"""
+    broker = ChangeStreamBroker(queue_size=1, buffer_size=10, max_subscribers=10)
+    subscription = broker.subscribe(1)
+    broker.publish(make_event(1))
+    broker.publish(make_event(2))
+    assert subscription.needs_reset.is_set()
+
+@pytest.mark.asyncio
+async def test_replay_from_last_event_id():
+    """Test resume returns buffered events after the id, or None past the buffer"""
+    broker = ChangeStreamBroker(queue_size=10, buffer_size=3, max_subscribers=10)
+    for event_id in range(1, 6):
+        broker.publish(make_event(event_id, user_id=1 if event_id % 2 else 2))
+    assert [event["id"] for event in broker.replay(1, 3)] == [5]
+    assert broker.replay(1, 1) is None
+
+@pytest.mark.asyncio
+async def test_subscriber_limit():
+    """Test subscribe refuses streams past the per-worker limit"""
+    broker = ChangeStreamBroker(queue_size=10, buffer_size=10, max_subscribers=1)
+    first = broker.subscribe(1)
+    assert broker.subscribe(1) is None
+    broker.unsubscribe(first)
+    assert broker.subscribe(1) is not None
+
+@pytest.mark.asyncio
+async def test_stream_resets_when_resume_point_is_gone():
+    """Test the endpoint tells the client to refetch when it cannot resume"""
+    app.dependency_overrides[get_current_user] = lambda: {"id": 1, "username": "testuser", "role": "user"}
+    try:
+        async with AsyncClient(app=app, base_url="http://test") as client:
+            response = await client.get("/api/v1/tasks/stream", headers={"Last-Event-ID": "5"})
+            assert response.status_code == 200
+            assert response.headers["content-type"].startswith("text/event-stream")
+            assert "event: reset" in response.text
+        assert task_change_broker.subscriber_count == 0
+    finally:
+        app.dependency_overrides.clear()
+
+@pytest.mark.asyncio
+async def test_replay_follows_delivery_order_not_ids():
+    """Test an event with a lower id committed later is still replayed and not deduped away"""
+    broker = ChangeStreamBroker(queue_size=10, buffer_size=10, max_subscribers=10)
+    for event_id in (1, 3, 2, 4):
+        broker.publish(make_event(event_id))
+    assert [event["id"] for event in broker.replay(1, 3)] == [2, 4]
+
+    sent = SentIds(2)
+    assert sent.add(3) and sent.add(2)
+    assert not sent.add(3)
+    assert sent.add(4) and sent.add(3)
+
+@pytest.mark.asyncio
+async def test_listener_uses_its_schema_channel(monkeypatch):
+    """Test each schema listens on its own channel, NOTIFY channels span the whole database"""
+    class FakeConnection:
+        def __init__(self):
+            self.channels = []
+
+        async def fetchval(self, query):
+            return "test_gw1"
+
+        async def add_listener(self, channel, callback):
+            self.channels.append(channel)
+
+        def add_termination_listener(self, callback):
+            pass
+
+    connection = FakeConnection()
+
+    async def connect(url, server_settings=None):
+        return connection
+
+    monkeypatch.setattr(change_stream.asyncpg, "connect", connect)
+    broker = ChangeStreamBroker(queue_size=10, buffer_size=10, max_subscribers=10)
+    await broker._listen("primary", "postgresql+asyncpg://localhost/taskdb")
+    assert connection.channels == ["task_changes:test_gw1"]
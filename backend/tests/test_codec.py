@@ -0,0 +1,72 @@
+import json
+import random
+from datetime import datetime
+import pytest
+from app.core.codec import FORMAT_MSGPACK, FORMAT_MSGPACK_ZSTD, JsonCodec, MsgpackCodec, build_codec
+from app.core.memory_redis import InMemoryRedis
+from app.core.redis import RedisClient
+from redis_memory_report import key_family, sample_keys
+
+def task_page(count: int = 50):
+    return [
+        {
+            "id": i, "user_id": 7, "title": f"Task {i}", "description": None if i % 3 else "notes " * 10,
+            "status": "pending", "priority": "high",
+            "created_at": datetime(2024, 5, 1, 12, 30, i % 60, 1234), "updated_at": datetime(2024, 5, 2),
+        }
+        for i in range(count)
+    ]
+
+def test_codecs_decode_to_the_same_values():
+    """Test msgpack pages decode exactly like JSON pages, timestamps as ISO strings"""
+    page = task_page()
+    expected = JsonCodec().decode(JsonCodec().encode(page))
+    assert expected[0]["created_at"] == "2024-05-01T12:30:00.001234"
+    for codec in (MsgpackCodec(), MsgpackCodec("zstd", min_size=0)):
+        assert codec.decode(codec.encode(page)) == expected
+    assert MsgpackCodec().decode(MsgpackCodec().encode({"id": 1})) == {"id": 1}
+
+def test_msgpack_page_is_smaller_than_json():
+    """Test columnar packing and compression shrink a full task page"""
+    page = task_page()
+    sizes = {codec.name: len(codec.encode(page)) for codec in (JsonCodec(), MsgpackCodec(), MsgpackCodec("zstd"))}
+    assert sizes["msgpack"] < sizes["json"] / 2
+    assert sizes["msgpack+zstd"] < sizes["msgpack"]
+
+def test_version_byte_and_compression_threshold():
+    """Test small values skip compression and readers still accept legacy JSON"""
+    codec = MsgpackCodec("zstd", min_size=512)
+    assert codec.encode([1, 2, 3])[0] == FORMAT_MSGPACK
+    assert codec.encode(task_page())[0] == FORMAT_MSGPACK_ZSTD
+    assert codec.decode(json.dumps([1, 2, 3]).encode()) == [1, 2, 3]
+    with pytest.raises(ValueError):
+        build_codec("pickle")
+
+@pytest.mark.asyncio
+async def test_redis_client_values_round_trip():
+    """Test set_value/get_values store binary values and report misses"""
+    client = RedisClient()
+    client.client = InMemoryRedis()
+    client.codec = MsgpackCodec("zstd", min_size=64)
+    await client.set_values({"task:1": task_page(1)[0], "task:2": task_page(2)[1]})
+    await client.set_value("tasks:7:page:0:50", [1, 2])
+    assert await client.get_value("tasks:7:page:0:50") == [1, 2]
+    first, missing, second = await client.get_values(["task:1", "task:3", "task:2"])
+    assert (first["id"], missing, second["id"]) == (0, None, 1)
+
+@pytest.mark.asyncio
+async def test_memory_report_groups_key_families(monkeypatch):
+    """Test the memory report counts keys per family and samples within the limit"""
+    import redis_memory_report
+    client = RedisClient()
+    client.client = InMemoryRedis()
+    monkeypatch.setattr(redis_memory_report, "redis_client", client)
+    for i in range(10):
+        await client.client.set(f"task:{i}", "{}")
+    await client.client.set("tasks:3:stale:0:50", "[]")
+    await client.client.set("user:alice", "{}")
+
+    counts, sampled = await sample_keys("*", samples=4, rng=random.Random(1))
+    assert counts == {"task:{id}": 10, "tasks:{user}:stale:*": 1, "user:{username}": 1}
+    assert len(sampled["task:{id}"]) == 4
+    assert key_family("jobs") == "jobs" and key_family("admin:stats") == "admin:*"
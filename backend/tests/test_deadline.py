@@ -0,0 +1,50 @@
+import asyncio
+import pytest
+from fastapi import FastAPI
+from httpx import AsyncClient
+from app.core import deadline as deadline_module
+from app.core.deadline import DeadlineMiddleware, DeadlineExceeded, run_with_deadline, timeout_for_path
+
+def make_app() -> FastAPI:
+    test_app = FastAPI()
+    test_app.add_middleware(DeadlineMiddleware)
+
+    @test_app.get("/slow")
+    async def slow():
+        await run_with_deadline(asyncio.sleep(5), "redis")
+        return {"done": True}
+
+    @test_app.get("/fast")
+    async def fast():
+        await run_with_deadline(asyncio.sleep(0), "redis")
+        return {"done": True}
+
+    return test_app
+
+def test_timeout_for_path_longest_prefix(monkeypatch):
+    """Test the longest matching prefix override wins"""
+    monkeypatch.setattr(deadline_module, "REQUEST_TIMEOUT", 60.0)
+    monkeypatch.setattr(deadline_module, "REQUEST_TIMEOUT_OVERRIDES", {"/api/v1/tasks": 10.0, "/api/v1/tasks/admin": 30.0})
+    assert timeout_for_path("/api/v1/tasks/5") == 10.0
+    assert timeout_for_path("/api/v1/tasks/admin/stats") == 30.0
+    assert timeout_for_path("/health") == 60.0
+
+@pytest.mark.asyncio
+async def test_run_with_deadline_without_deadline():
+    """Test backend calls run unbounded outside a request"""
+    assert await run_with_deadline(asyncio.sleep(0, result="ok"), "redis") == "ok"
+
+@pytest.mark.asyncio
+async def test_slow_handler_is_cancelled(monkeypatch):
+    """Test handler over its budget is cancelled with 504"""
+    monkeypatch.setattr(deadline_module, "REQUEST_TIMEOUT_OVERRIDES", {"/slow": 0.05})
+    async with AsyncClient(app=make_app(), base_url="http://test") as client:
+        response = await client.get("/slow")
+        assert response.status_code == 504
+
+        response = await client.get("/fast")
+        assert response.status_code == 200
+
+def test_deadline_exceeded_names_stage():
+    """Test the exception records which stage ran out of budget"""
+    assert DeadlineExceeded("db").stage == "db"
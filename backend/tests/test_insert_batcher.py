@@ -0,0 +1,104 @@
+import asyncio
+import asyncpg
+import pytest
+from app.core import insert_batcher
+from app.core.insert_batcher import TaskInsertBatcher
+from app.database.sharding import HashRing, ShardRouter
+
+class RecordingDatabase:
+    """Stands in for the pool, hands out serial ids like the tasks table"""
+
+    def __init__(self, fail_batch: bool = False) -> None:
+        self.next_id = 1
+        self.batches = []
+        self.fail_batch = fail_batch
+        # Filled by the fake_db fixture's defer/cache_tasks stand-ins
+        self.invalidated = []
+        self.cached = []
+
+    def _row(self, user_id, title):
+        row = {"id": self.next_id, "user_id": user_id, "title": title}
+        self.next_id += 1
+        return row
+
+    async def fetch(self, query, user_ids, titles, *columns):
+        self.batches.append(len(user_ids))
+        if self.fail_batch:
+            raise asyncpg.ForeignKeyViolationError("user gone")
+        # Returned in reverse to check rows are routed by id, not position
+        return [self._row(u, t) for u, t in zip(user_ids, titles)][::-1]
+
+    async def fetchrow(self, query, user_id, title, *columns):
+        if user_id < 0:
+            raise asyncpg.ForeignKeyViolationError("user gone")
+        return self._row(user_id, title)
+
+@pytest.fixture
+def fake_db(monkeypatch):
+    """Route batcher queries and invalidations to in-memory recorders"""
+    db = RecordingDatabase()
+
+    async def defer(job_type, **payload):
+        db.invalidated.append(payload["user_id"])
+
+    async def cache_tasks(tasks):
+        db.cached.extend(task["id"] for task in tasks)
+
+    monkeypatch.setattr(insert_batcher, "shards", ShardRouter(db, {}, vnodes=8, refresh_interval=5))
+    monkeypatch.setattr(insert_batcher, "defer", defer)
+    monkeypatch.setattr(insert_batcher, "cache_tasks", cache_tasks)
+    return db
+
+@pytest.mark.asyncio
+async def test_concurrent_inserts_share_one_statement(fake_db):
+    """Test inserts in one window become a single INSERT with rows routed back to callers"""
+    batcher = TaskInsertBatcher(window_ms=5, max_rows=100)
+    results = await asyncio.gather(*(
+        batcher.insert(i % 2 + 1, f"task {i}", None, "pending", "medium") for i in range(10)
+    ))
+    assert fake_db.batches == [10]
+    assert [r["title"] for r in results] == [f"task {i}" for i in range(10)]
+    assert sorted(fake_db.invalidated) == [1, 2]
+    assert sorted(fake_db.cached) == [r["id"] for r in results]
+
+@pytest.mark.asyncio
+async def test_full_batch_flushes_before_window(fake_db):
+    """Test reaching max_rows writes immediately"""
+    batcher = TaskInsertBatcher(window_ms=10_000, max_rows=4)
+    results = await asyncio.wait_for(asyncio.gather(*(
+        batcher.insert(1, f"task {i}", None, "pending", "medium") for i in range(4)
+    )), timeout=1)
+    assert len(results) == 4
+    assert fake_db.batches == [4]
+
+@pytest.mark.asyncio
+async def test_failed_batch_falls_back_to_single_rows(fake_db):
+    """Test one bad row only fails its own request"""
+    fake_db.fail_batch = True
+    batcher = TaskInsertBatcher(window_ms=5, max_rows=100)
+    good, bad = await asyncio.gather(
+        batcher.insert(1, "good", None, "pending", "medium"),
+        batcher.insert(-1, "bad", None, "pending", "medium"),
+        return_exceptions=True
+    )
+    assert good["title"] == "good"
+    assert isinstance(bad, asyncpg.ForeignKeyViolationError)
+    assert fake_db.invalidated == [1]
+
+@pytest.mark.asyncio
+async def test_batch_is_split_per_shard(fake_db, monkeypatch):
+    """Test each shard gets one INSERT with only its users' rows"""
+    other = RecordingDatabase()
+    other.next_id = 1000
+    router = ShardRouter(fake_db, {}, vnodes=8, refresh_interval=5)
+    router.enabled = True
+    router.shards = {"a": fake_db, "b": other}
+    router.ring = HashRing(["a", "b"], 8)
+    router.directory = {1: "a", 2: "a", 3: "b"}
+    monkeypatch.setattr(insert_batcher, "shards", router)
+
+    batcher = TaskInsertBatcher(window_ms=5, max_rows=100)
+    results = await asyncio.gather(*(batcher.insert(user_id, f"task {user_id}", None, "pending", "medium") for user_id in (1, 3, 2, 3)))
+    assert fake_db.batches == [2] and other.batches == [2]
+    assert [r["user_id"] for r in results] == [1, 3, 2, 3]
+    assert [r["id"] >= 1000 for r in results] == [False, True, False, True]
@@ -0,0 +1,128 @@
+import asyncio
+import pytest
+from app.core import jobs
+from app.core.jobs import defer, enqueue
+from app.core.redis import redis_client
+
+@pytest.mark.asyncio
+async def test_defer_runs_inline_when_queue_disabled(monkeypatch):
+    """Test deferred work still happens without the job worker"""
+    monkeypatch.setattr(jobs, "JOBS_ENABLED", False)
+    seen = []
+
+    async def record(payload):
+        seen.append(payload)
+
+    monkeypatch.setitem(jobs._handlers, "test_inline", record)
+    await defer("test_inline", user_id=7)
+    assert seen == [{"user_id": 7}]
+
+@pytest.mark.asyncio
+async def test_enqueue_rejects_unknown_job_type():
+    """Test typos in job names fail at the call site, not in the worker"""
+    with pytest.raises(ValueError):
+        await enqueue("no_such_job", user_id=1)
+
+def test_request_handlers_registered():
+    """Test the API process registers every job it defers"""
+    import app.main  # noqa: F401
+    assert {"invalidate_user_tasks_cache", "refresh_admin_stats", "audit"} <= set(jobs._handlers)
+
+@pytest.mark.asyncio
+async def test_worker_dedupes_batch_and_dead_letters(monkeypatch):
+    """Test identical jobs run once and failing jobs end up in the dead-letter stream"""
+    monkeypatch.setattr(jobs, "JOBS_MAX_ATTEMPTS", 1)
+    calls = []
+
+    async def flaky(payload):
+        calls.append(payload)
+        if payload.get("fail"):
+            raise RuntimeError("boom")
+
+    monkeypatch.setitem(jobs._handlers, "test_flaky", flaky)
+    worker = jobs.JobWorker()
+    await worker.ensure_group()
+    for payload in ({"user_id": 1}, {"user_id": 1}, {"fail": True}):
+        await enqueue("test_flaky", **payload)
+    await worker.process_batch(await worker._read_batch())
+
+    assert calls.count({"user_id": 1}) == 1
+    assert await redis_client.client.xlen(jobs.DEAD_LETTER_STREAM) == 1
+
+@pytest.mark.asyncio
+async def test_failed_job_is_requeued_after_a_delay(monkeypatch):
+    """Test a retry waits out its backoff and its entry stays pending until then"""
+    monkeypatch.setattr(jobs, "retry_delay", lambda attempts: 0.05)
+
+    async def failing(payload):
+        raise RuntimeError("database blip")
+
+    monkeypatch.setitem(jobs._handlers, "test_failing", failing)
+    worker = jobs.JobWorker()
+    await worker.ensure_group()
+    await enqueue("test_failing", user_id=1)
+    await worker.process_batch(await worker._read_batch())
+    assert await redis_client.client.xlen(jobs.JOBS_STREAM) == 1
+    assert len(worker._retries) == 1
+
+    await asyncio.gather(*worker._retries)
+    retry = await worker._read_batch()
+    assert [fields["attempts"] for _, fields in retry] == ["1"]
+    claimed = await redis_client.client.xautoclaim(jobs.JOBS_STREAM, jobs.CONSUMER_GROUP, "other", min_idle_time=0)
+    assert [entry_id for entry_id, _ in claimed[1]] == [entry_id for entry_id, _ in retry]
+
+@pytest.mark.asyncio
+async def test_trim_keeps_pending_and_unread_entries():
+    """Test trimming only drops entries before the oldest one the group has not acked"""
+    worker = jobs.JobWorker()
+    await worker.ensure_group()
+    for i in range(4):
+        await enqueue("audit", action=f"test {i}")
+    read = await redis_client.client.xreadgroup(jobs.CONSUMER_GROUP, "reader", {jobs.JOBS_STREAM: ">"}, count=3)
+    first, second, third = [entry_id for entry_id, _ in read[0][1]]
+    await redis_client.client.xack(jobs.JOBS_STREAM, jobs.CONSUMER_GROUP, first)
+
+    await worker.trim_acked()
+    assert await redis_client.client.xlen(jobs.JOBS_STREAM) == 3
+    assert jobs.jobs_stream_length.get() == 3
+    # The pending entry can still be claimed with its fields
+    claimed = await redis_client.client.xautoclaim(jobs.JOBS_STREAM, jobs.CONSUMER_GROUP, "other", min_idle_time=0)
+    assert [(entry_id, bool(fields)) for entry_id, fields in claimed[1]] == [(second, True), (third, True)]
+
+@pytest.mark.asyncio
+async def test_trimmed_pending_entries_are_acked(monkeypatch):
+    """Test entries trimmed from the stream while pending are acked instead of reclaimed forever"""
+    monkeypatch.setattr(jobs, "JOBS_CLAIM_IDLE_MS", 0)
+    worker = jobs.JobWorker()
+    await worker.ensure_group()
+    await enqueue("audit", action="test")
+    await worker._read_batch()
+    # MAXLEN pushes the pending entry out of the stream
+    await redis_client.client.xadd(jobs.JOBS_STREAM, {"type": "audit", "payload": "{}"}, maxlen=1)
+
+    assert await worker._claim_stale() == []
+    claimed = await redis_client.client.xautoclaim(jobs.JOBS_STREAM, jobs.CONSUMER_GROUP, "other", min_idle_time=0)
+    assert claimed[1] == []
+
+@pytest.mark.asyncio
+async def test_worker_survives_redis_errors(monkeypatch):
+    """Test a failed read is logged and retried instead of ending the worker"""
+    worker = jobs.JobWorker()
+    reads = []
+
+    async def read_batch():
+        reads.append(1)
+        if len(reads) == 1:
+            raise ConnectionError("Redis went away")
+        worker.stop()
+        return []
+
+    monkeypatch.setattr(worker, "_read_batch", read_batch)
+    sleeps = []
+
+    async def wait(seconds):
+        sleeps.append(seconds)
+
+    monkeypatch.setattr(worker, "_wait", wait)
+    await asyncio.wait_for(worker.run(), timeout=1)
+    assert len(reads) == 2 and sleeps == [0.5]
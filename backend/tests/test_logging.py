@@ -0,0 +1,39 @@
+import json
+import logging
+import queue
+from app.core.logging import CustomJsonFormatter, SamplingFilter, NonBlockingQueueHandler
+
+def make_record(name: str, msg: str, level: int = logging.INFO) -> logging.LogRecord:
+    return logging.LogRecord(name, level, __file__, 1, msg, None, None)
+
+def test_sampling_filter_drops_sampled_messages():
+    """Test records matching a zero rate are dropped and others pass"""
+    sampler = SamplingFilter({"cache_hit": 0.0, "app.tasks": 1.0})
+    assert not sampler.filter(make_record("app.cache", "cache_hit"))
+    assert sampler.filter(make_record("app.cache", "cache_set"))
+    assert sampler.filter(make_record("app.tasks", "tasks_listed"))
+
+def test_sampling_filter_keeps_warnings():
+    """Test warnings and errors are never sampled out"""
+    sampler = SamplingFilter({"app.cache": 0.0})
+    assert not sampler.filter(make_record("app.cache", "cache_hit"))
+    assert sampler.filter(make_record("app.cache", "cache_error", logging.ERROR))
+
+def test_json_formatter_output():
+    """Test formatter emits one JSON object with extra fields"""
+    formatter = CustomJsonFormatter('%(timestamp)s %(level)s %(logger)s %(message)s')
+    record = make_record("app.request", "http_request")
+    record.status_code = 200
+    data = json.loads(formatter.format(record))
+    assert data["message"] == "http_request"
+    assert data["logger"] == "app.request"
+    assert data["level"] == "INFO"
+    assert data["status_code"] == 200
+
+def test_queue_handler_drops_when_full():
+    """Test a full queue drops records instead of blocking"""
+    handler = NonBlockingQueueHandler(queue.Queue(maxsize=1))
+    handler.handle(make_record("app.request", "first"))
+    handler.handle(make_record("app.request", "second"))
+    assert handler.dropped == 1
+    assert handler.queue.get_nowait().getMessage() == "first"
@@ -0,0 +1,44 @@
+import asyncio
+import logging
+import time
+import pytest
+from app.core.loop_monitor import LoopLagMonitor, loop_lag, loop_stalls
+
+def list_tasks_endpoint() -> None:
+    """Stands in for a route endpoint"""
+
+def blocking_handler(seconds: float) -> None:
+    scope = {"type": "http", "method": "GET", "path": "/api/v1/tasks", "endpoint": list_tasks_endpoint}  # noqa: F841
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        pass
+
+@pytest.mark.asyncio
+async def test_blocked_loop_logs_stack_and_request(caplog):
+    """Test a blocking call is caught with its stack and the request it served"""
+    monitor = LoopLagMonitor(interval_ms=10, threshold_ms=50)
+    stalls = loop_stalls.get()
+    monitor.start()
+    try:
+        await asyncio.sleep(0.03)
+        with caplog.at_level(logging.WARNING, logger="app.loop"):
+            blocking_handler(0.3)
+            await asyncio.sleep(0.03)
+    finally:
+        await monitor.stop()
+
+    blocked = next(record for record in caplog.records if record.msg == "event_loop_blocked")
+    assert blocked.request == {"method": "GET", "path": "/api/v1/tasks", "endpoint": "list_tasks_endpoint"}
+    assert any("blocking_handler" in line for line in blocked.stack)
+    stall = next(record for record in caplog.records if record.msg == "event_loop_stall")
+    assert stall.lag_ms >= 250 and stall.stack_captured
+    assert loop_stalls.get() == stalls + 1
+    assert loop_lag.get() < 0.25
+
+@pytest.mark.asyncio
+async def test_disabled_monitor_starts_nothing():
+    """Test a disabled monitor runs no tick task or watchdog thread"""
+    monitor = LoopLagMonitor(interval_ms=10, threshold_ms=50, enabled=False)
+    monitor.start()
+    assert monitor._task is None and monitor._watchdog is None
+    await monitor.stop()
@@ -0,0 +1,52 @@
+import asyncio
+import pytest
+from app.core.memory_redis import InMemoryRedis
+
+@pytest.mark.asyncio
+async def test_expired_keys_disappear():
+    """Test TTLs expire keys for get, exists and keys"""
+    redis = InMemoryRedis()
+    await redis.set("short", "1", px=10)
+    await redis.set("long", "1", ex=60)
+    assert await redis.ttl("long") == 60
+    await asyncio.sleep(0.02)
+    assert await redis.get("short") is None
+    assert await redis.exists("short", "long") == 1
+    assert await redis.keys("*") == ["long"]
+
+@pytest.mark.asyncio
+async def test_keys_pattern_and_multi_delete():
+    """Test glob patterns and deleting several keys at once"""
+    redis = InMemoryRedis()
+    for key in ("tasks:1:page:0:50", "tasks:1:page:50:50", "tasks:2:page:0:50", "tasks:1:summary"):
+        await redis.set(key, "[]")
+    keys = await redis.keys("tasks:1:page:*")
+    assert sorted(keys) == ["tasks:1:page:0:50", "tasks:1:page:50:50"]
+    assert await redis.delete(*keys, "missing") == 2
+    assert await redis.mget(["tasks:1:page:0:50", "tasks:2:page:0:50"]) == [None, "[]"]
+
+@pytest.mark.asyncio
+async def test_pipeline_runs_queued_commands():
+    """Test pipelined SETs apply in order with their TTL"""
+    redis = InMemoryRedis()
+    pipe = redis.pipeline(transaction=False)
+    pipe.set("a", 1, ex=30)
+    pipe.set("b", "2", ex=30)
+    assert await pipe.execute() == [True, True]
+    assert await redis.mget(["a", "b"]) == ["1", "2"]
+
+@pytest.mark.asyncio
+async def test_stream_consumer_group_roundtrip():
+    """Test read, ack and reclaim through a consumer group"""
+    redis = InMemoryRedis()
+    await redis.xgroup_create("jobs", "workers", id="0", mkstream=True)
+    first = await redis.xadd("jobs", {"type": "audit"})
+    await redis.xadd("jobs", {"type": "audit"})
+    response = await redis.xreadgroup("workers", "a", {"jobs": ">"}, count=1, block=10)
+    assert response[0][1][0][0] == first
+    assert await redis.xreadgroup("workers", "a", {"jobs": ">"}, count=10, block=None) != []
+    assert await redis.xreadgroup("workers", "a", {"jobs": ">"}, count=10, block=10) == []
+    # Unacked entries can be claimed by another consumer once idle
+    claimed = await redis.xautoclaim("jobs", "workers", "b", min_idle_time=0)
+    assert len(claimed[1]) == 2
+    assert await redis.xack("jobs", "workers", first) == 1
@@ -0,0 +1,32 @@
+import pytest
+from httpx import AsyncClient
+from app.main import app
+from app.core.metrics import MetricsRegistry, metrics
+
+def test_counter_and_gauge_render():
+    """Test metrics render in Prometheus text format with labels"""
+    registry = MetricsRegistry()
+    moved = registry.counter("rows_moved_total", "Rows moved")
+    moved.inc(3)
+    moved.inc(2)
+    state = registry.gauge("breaker_state", "Breaker state")
+    state.set(1, name="redis")
+
+    output = registry.render()
+    assert "# TYPE rows_moved_total counter" in output
+    assert "rows_moved_total 5" in output
+    assert 'breaker_state{name="redis"} 1' in output
+
+def test_register_same_name_returns_existing():
+    """Test modules registering the same metric share one instance"""
+    registry = MetricsRegistry()
+    assert registry.counter("a_total", "A") is registry.counter("a_total", "A")
+
+@pytest.mark.asyncio
+async def test_metrics_endpoint():
+    """Test the worker exposes its registry"""
+    async with AsyncClient(app=app, base_url="http://test") as client:
+        response = await client.get("/metrics")
+        assert response.status_code == 200
+        assert "tasks_archived_total" in metrics.metrics
+        assert "# TYPE tasks_archived_total counter" in response.text
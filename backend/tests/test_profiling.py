@@ -0,0 +1,68 @@
+import asyncio
+import os
+import time
+import pytest
+from fastapi import FastAPI
+from httpx import AsyncClient
+from app.core import profiling
+from app.core.profiling import RequestProfilerMiddleware, ProfilerBusy, sample_event_loop, sign_profile_header, verify_profile_header
+
+def busy_loop(seconds: float) -> None:
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        pass
+
+@pytest.mark.asyncio
+async def test_sampling_profile_sees_blocking_code():
+    """Test the sampler attributes samples to code blocking the event loop"""
+    async def blocker():
+        await asyncio.sleep(0.01)
+        busy_loop(0.1)
+
+    blocking = asyncio.create_task(blocker())
+    sampler = await sample_event_loop(0.2, 0.002)
+    await blocking
+
+    assert any("busy_loop" in line for line in sampler.collapsed().splitlines())
+    profile = sampler.speedscope("test")["profiles"][0]
+    assert len(profile["samples"]) == len(profile["weights"]) == len(sampler.counts)
+
+@pytest.mark.asyncio
+async def test_one_sampling_profile_at_a_time():
+    """Test a second concurrent sampling run is refused"""
+    first = asyncio.create_task(sample_event_loop(0.1, 0.01))
+    await asyncio.sleep(0)
+    with pytest.raises(ProfilerBusy):
+        await sample_event_loop(0.1, 0.01)
+    await first
+
+def test_profile_header_signature(monkeypatch):
+    """Test signed headers verify until they expire and fail when tampered with"""
+    monkeypatch.setattr(profiling, "PROFILE_SIGNING_KEY", "secret")
+    value, expires_at = sign_profile_header(60)
+    assert verify_profile_header(value)
+    assert not verify_profile_header(f"{expires_at + 1}.{value.split('.')[1]}")
+    assert not verify_profile_header(sign_profile_header(-1)[0])
+    monkeypatch.setattr(profiling, "PROFILE_SIGNING_KEY", "other")
+    assert not verify_profile_header(value)
+
+@pytest.mark.asyncio
+async def test_request_profile_written_for_signed_header(monkeypatch, tmp_path):
+    """Test only requests with a valid header are profiled to the profile directory"""
+    monkeypatch.setattr(profiling, "PROFILE_SIGNING_KEY", "secret")
+    monkeypatch.setattr(profiling, "PROFILE_DIR", str(tmp_path))
+    test_app = FastAPI()
+    test_app.add_middleware(RequestProfilerMiddleware)
+
+    @test_app.get("/work")
+    async def work():
+        return {"done": True}
+
+    async with AsyncClient(app=test_app, base_url="http://test") as ac:
+        plain = await ac.get("/work")
+        forged = await ac.get("/work", headers={"X-Profile": "9999999999.deadbeef"})
+        profiled = await ac.get("/work", headers={"X-Profile": sign_profile_header(60)[0]})
+
+    assert "x-profile-file" not in plain.headers
+    assert "x-profile-file" not in forged.headers
+    assert os.listdir(tmp_path) == [profiled.headers["x-profile-file"]]
@@ -0,0 +1,132 @@
+import asyncio
+import pytest
+from redis.exceptions import ConnectionError as RedisConnectionError
+from app.core import jobs, security
+from app.core.circuit_breaker import CircuitBreaker, CLOSED, HALF_OPEN, OPEN, breaker_transitions
+from app.core.memory_redis import InMemoryRedis
+from app.core.redis import RedisClient
+from app.core.security import RevocationCache, blacklist_token, is_token_blacklisted
+
+class DownPipeline:
+    def set(self, *args, **kwargs):
+        return self
+
+    async def execute(self):
+        raise RedisConnectionError("Connection refused")
+
+class DownRedis:
+    """Client whose every command fails as if Redis were unreachable"""
+
+    def pipeline(self, transaction=True):
+        return DownPipeline()
+
+    def __getattr__(self, name):
+        async def command(*args, **kwargs):
+            raise RedisConnectionError("Connection refused")
+        return command
+
+def make_client(reset_timeout: float = 60.0) -> RedisClient:
+    client = RedisClient()
+    client.breaker = CircuitBreaker("test", failure_threshold=2, reset_timeout=reset_timeout, on_close=client._schedule_replay)
+    client.client = DownRedis()
+    return client
+
+def test_breaker_opens_and_probes_once():
+    """Test the breaker opens after consecutive failures and half-opens for one probe"""
+    breaker = CircuitBreaker("unit", failure_threshold=2, reset_timeout=0.0)
+    opened = breaker_transitions.get(name="unit", to=OPEN)
+    breaker.record_failure()
+    assert breaker.state == CLOSED
+    breaker.record_failure()
+    assert breaker.state == OPEN
+    assert breaker.allow()
+    assert breaker.state == HALF_OPEN
+    assert not breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == OPEN
+    assert breaker_transitions.get(name="unit", to=OPEN) == opened + 2
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.state == CLOSED
+
+@pytest.mark.asyncio
+async def test_reads_fall_back_and_writes_are_dropped_when_down():
+    """Test reads return misses and the breaker stops calls after the threshold"""
+    client = make_client()
+    assert await client.get("user:alice") is None
+    assert await client.mget(["a", "b"]) == [None, None]
+    assert client.breaker.state == OPEN
+    await client.set_value("user:alice", {"id": 1})
+    assert await client.exists("user:alice") is False
+    assert not client.available
+    assert len(client._pending) == 0
+
+@pytest.mark.asyncio
+async def test_invalidations_replayed_after_recovery():
+    """Test deletes issued while Redis is down are applied once the breaker closes"""
+    client = make_client(reset_timeout=0.0)
+    await client.delete("task:1")
+    await client.delete_matching("tasks:7:page:*")
+    assert len(client._pending) == 2
+
+    memory = InMemoryRedis()
+    for key in ("task:1", "tasks:7:page:0:50", "tasks:7:summary"):
+        await memory.set(key, "{}")
+    client.client = memory
+    assert await client.get("tasks:7:summary") == "{}"
+    await client._replay_task
+    assert await memory.keys("*") == ["tasks:7:summary"]
+    assert not client._pending
+
+@pytest.mark.asyncio
+async def test_revoked_token_rejected_while_redis_down(monkeypatch):
+    """Test logout on this worker is honoured even when Redis cannot be reached"""
+    client = make_client()
+    monkeypatch.setattr(security, "redis_client", client)
+    monkeypatch.setattr(security, "revoked_tokens", RevocationCache(10))
+    await blacklist_token("token-a")
+    assert await is_token_blacklisted("token-a")
+    assert not await is_token_blacklisted("token-b")
+    assert len(client._pending) == 1
+
+def test_revocation_cache_evicts_oldest_and_expired():
+    """Test the local revocation cache stays bounded and forgets expired tokens"""
+    cache = RevocationCache(2)
+    cache.add("a", 60)
+    cache.add("b", 60)
+    cache.add("c", 60)
+    cache.add("gone", -1)
+    assert "a" not in cache and "b" not in cache and "c" in cache and "gone" not in cache
+
+@pytest.mark.asyncio
+async def test_deferred_job_runs_inline_while_redis_down(monkeypatch):
+    """Test a job that can't be queued runs in the request instead of failing it"""
+    client = make_client()
+    monkeypatch.setattr(jobs, "redis_client", client)
+    monkeypatch.setattr(jobs, "JOBS_ENABLED", True)
+    seen = []
+
+    async def record(payload):
+        seen.append(payload)
+
+    monkeypatch.setitem(jobs._handlers, "test_inline", record)
+    for user_id in (1, 2, 3):
+        await jobs.defer("test_inline", user_id=user_id)
+    assert seen == [{"user_id": 1}, {"user_id": 2}, {"user_id": 3}]
+    assert client.breaker.state == OPEN
+
+@pytest.mark.asyncio
+async def test_skipped_write_through_deletes_the_old_value_later():
+    """Test a SET that can't be sent is replaced by a buffered DEL so the old body does not outlive the outage"""
+    client = make_client(reset_timeout=0.0)
+    await client.set_values({"task:1": {"title": "new"}})
+    await client.set_values({"task:1": {"title": "newer"}})
+    assert client.breaker.state == OPEN
+    assert len(client._pending) == 2
+
+    memory = InMemoryRedis()
+    await memory.set("task:1", "old")
+    client.client = memory
+    await client.get("task:2")
+    await client._replay_task
+    assert await memory.get("task:1") is None
@@ -0,0 +1,176 @@
+import pytest
+from collections import Counter
+from contextlib import asynccontextmanager
+from app.core import archiver, change_stream, job_handlers
+from app.core.archiver import TaskArchiver
+from app.core.change_stream import ChangeStreamBroker
+from app.database.sharding import PRIMARY, HashRing, ShardRouter, UserMovingError
+
+class FakeShard:
+    """Answers fetch/fetchrow like a shard holding the given rows, records execute() arguments"""
+
+    def __init__(self, rows=()) -> None:
+        self.rows = list(rows)
+        self.executed = []
+
+    async def fetch(self, query, *args):
+        return self.rows
+
+    async def fetchrow(self, query, *args):
+        return {"total": len(self.rows), "completed": sum(row["status"] == "completed" for row in self.rows)}
+
+    async def fetchval(self, query, *args):
+        return 7
+
+    async def execute(self, query, *args):
+        self.executed.append(args)
+
+def sharded_router(primary, names, directory=None):
+    router = ShardRouter(primary, {}, vnodes=64, refresh_interval=5)
+    router.enabled = True
+    router.shards = {name: FakeShard() for name in names}
+    router.ring = HashRing(names, 64)
+    router.directory = dict(directory or {})
+    return router
+
+def test_ring_spreads_users_and_adding_a_shard_moves_few():
+    """Test users split roughly evenly and a fourth shard only takes users from the others"""
+    before = HashRing(["a", "b", "c"], 64)
+    after = HashRing(["a", "b", "c", "d"], 64)
+    users = range(30_000)
+    counts = Counter(before.node(user_id) for user_id in users)
+    assert min(counts.values()) > 6_000
+
+    moved = [user_id for user_id in users if before.node(user_id) != after.node(user_id)]
+    assert all(after.node(user_id) == "d" for user_id in moved)
+    assert 0.15 < len(moved) / len(users) < 0.35
+
+def test_unsharded_router_uses_primary():
+    """Test with no shard URLs every user routes to the primary database"""
+    primary = FakeShard()
+    router = ShardRouter(primary, {}, vnodes=8, refresh_interval=5)
+    assert router.shard_name(42) == PRIMARY
+    assert router.for_user(42) is primary
+    assert router.all() == [primary]
+
+def test_directory_overrides_ring_and_blocks_moving_writes():
+    """Test pinned users route to their directory shard and moving users can't write"""
+    router = sharded_router(FakeShard(), ["a", "b"])
+    user_id = next(user_id for user_id in range(100) if router.ring.node(user_id) == "a")
+    router.directory[user_id] = "b"
+    assert router.for_user(user_id) is router.shards["b"]
+
+    router.moving.add(user_id)
+    assert router.for_user(user_id) is router.shards["b"]
+    with pytest.raises(UserMovingError):
+        router.for_write(user_id)
+
+@pytest.mark.asyncio
+async def test_refresh_reports_moved_users():
+    """Test a directory flip is reported to on_move listeners"""
+    primary = FakeShard()
+    router = sharded_router(primary, ["a", "b"])
+    user_id = next(user_id for user_id in range(100) if router.ring.node(user_id) == "a")
+    moved = []
+    router.on_move.append(moved.append)
+
+    primary.rows = [{"user_id": user_id, "shard": "a", "moving": True}]
+    await router.refresh()
+    assert moved == [] and router.moving == {user_id}
+
+    primary.rows = [{"user_id": user_id, "shard": "b", "moving": False}]
+    await router.refresh()
+    assert moved == [{user_id}] and router.moving == set()
+
+@pytest.mark.asyncio
+async def test_admin_stats_sum_task_counts_across_shards(monkeypatch):
+    """Test admin stats count users once and add up every shard's tasks"""
+    router = sharded_router(FakeShard(), ["a", "b"])
+    router.shards["a"].rows = [{"status": "completed"}, {"status": "pending"}]
+    router.shards["b"].rows = [{"status": "completed"}]
+    monkeypatch.setattr(job_handlers, "shards", router)
+    monkeypatch.setattr(job_handlers, "database", FakeShard())
+
+    stats = await job_handlers.compute_admin_stats()
+    assert stats == {"total_users": 7, "total_tasks": 3, "completed_tasks": 2}
+
+@pytest.mark.asyncio
+async def test_replay_only_compares_ids_within_the_users_shard(monkeypatch):
+    """Test Last-Event-ID replay reads the buffer of the shard the user lives on"""
+    router = sharded_router(FakeShard(), ["a", "b"])
+    user_id = next(user_id for user_id in range(100) if router.ring.node(user_id) == "a")
+    monkeypatch.setattr(change_stream, "shards", router)
+
+    broker = ChangeStreamBroker(queue_size=10, buffer_size=10, max_subscribers=10)
+    for event_id in (5, 6, 7):
+        broker.publish({"id": event_id, "op": "updated", "task_id": 1, "user_id": user_id}, "a")
+    broker.publish({"id": 1, "op": "updated", "task_id": 2, "user_id": user_id + 1000}, "b")
+    assert [event["id"] for event in broker.replay(user_id, 5)] == [6, 7]
+
+class SequenceShard:
+    """Answers the tasks_id_seq query for one shard"""
+
+    def __init__(self, increment_by, last_value) -> None:
+        self.row = {"increment_by": increment_by, "last_value": last_value}
+
+    async def fetchrow(self, query, *args):
+        return self.row
+
+@pytest.mark.asyncio
+async def test_overlapping_task_id_sequences_refuse_to_start():
+    """Test startup fails until every shard's task ids stride by the same step from a distinct residue"""
+    router = sharded_router(FakeShard(), ["a", "b"])
+    router.shards = {"a": SequenceShard(1, 500), "b": SequenceShard(1, 20)}
+    with pytest.raises(RuntimeError, match="init-sequences"):
+        await router.check_sequences()
+
+    router.shards = {"a": SequenceShard(64, 100_033), "b": SequenceShard(64, 100_034)}
+    await router.check_sequences()
+
+    router.shards["b"] = SequenceShard(64, 100_097)
+    with pytest.raises(RuntimeError):
+        await router.check_sequences()
+
+@pytest.mark.asyncio
+async def test_ensure_users_copies_missing_rows_to_their_shards():
+    """Test users known only by id are copied from the primary to the shard they route to"""
+    primary = FakeShard()
+    router = sharded_router(primary, ["a", "b"])
+    user_id = next(user_id for user_id in range(100) if router.ring.node(user_id) == "b")
+    primary.rows = [{"id": user_id, "username": "seeded", "email": "s@example.com", "role": "admin",
+                     "is_active": True, "created_at": None}]
+    await router.ensure_users([user_id, user_id])
+    assert [args[:2] for args in router.shards["b"].executed] == [(user_id, "seeded")]
+    assert router.shards["a"].executed == []
+
+@pytest.mark.asyncio
+async def test_archiver_skips_moving_users(monkeypatch):
+    """Test an archive batch leaves the tasks of users being moved between shards in place"""
+    calls = []
+
+    class Connection:
+        @asynccontextmanager
+        async def transaction(self):
+            yield
+
+        async def fetchval(self, query, *args):
+            return True
+
+        async def execute(self, query, *args):
+            pass
+
+        async def fetch(self, query, *args):
+            calls.append(args)
+            return []
+
+    class Shard:
+        @asynccontextmanager
+        async def acquire(self):
+            yield Connection()
+
+    router = ShardRouter(FakeShard(), {}, vnodes=8, refresh_interval=5)
+    router.moving = {4, 9}
+    monkeypatch.setattr(archiver, "shards", router)
+    assert await TaskArchiver(after_days=30, batch_size=10, interval=60, pause=0).run_batch(Shard()) == 0
+    assert sorted(calls[0][2]) == [4, 9]
+    assert "<> ALL($3::int[])" in archiver.MOVE_BATCH
@@ -0,0 +1,54 @@
+import json
+import os
+import subprocess
+import sys
+import pytest
+from alembic.config import Config
+from alembic.script import ScriptDirectory
+from app.core.config import Environment
+from app.database import schema
+from app.database.connection import database
+from app.database.schema import SCHEMA_VERSION, check_schema_version
+from app.schemas.schemas import TaskPriority, TaskStatus
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Budgets for a cold worker, override through the environment on slow CI machines
+IMPORT_BUDGET_S = float(os.getenv("STARTUP_IMPORT_BUDGET_S", "5"))
+FIRST_REQUEST_BUDGET_S = float(os.getenv("STARTUP_FIRST_REQUEST_BUDGET_S", "1"))
+
+def test_schema_version_matches_alembic_head():
+    """Test the startup check expects the latest migration"""
+    config = Config(os.path.join(BACKEND_DIR, "alembic.ini"))
+    config.set_main_option("script_location", os.path.join(BACKEND_DIR, "migrations"))
+    assert ScriptDirectory.from_config(config).get_current_head() == SCHEMA_VERSION
+
+@pytest.mark.asyncio
+async def test_schema_mismatch_is_fatal_outside_development(monkeypatch):
+    """Test a worker refuses to start on an unmigrated database unless in development"""
+    async def fetchval(query):
+        return "001_initial_schema"
+
+    monkeypatch.setattr(database, "fetchval", fetchval)
+    with pytest.raises(RuntimeError):
+        await check_schema_version()
+    monkeypatch.setattr(schema, "ENVIRONMENT", Environment.development)
+    await check_schema_version()
+
+def test_task_enum_labels_match_api_enums():
+    """Test the Postgres enums from migration 007 hold exactly the API's status and priority values"""
+    config = Config(os.path.join(BACKEND_DIR, "alembic.ini"))
+    config.set_main_option("script_location", os.path.join(BACKEND_DIR, "migrations"))
+    migration = ScriptDirectory.from_config(config).get_revision("007_task_enums").module
+    assert migration.TASK_STATUSES == tuple(status.value for status in TaskStatus)
+    assert migration.TASK_PRIORITIES == tuple(priority.value for priority in TaskPriority)
+
+def test_startup_time_within_budget():
+    """Test a fresh interpreter imports the app and answers its first request in budget"""
+    result = subprocess.run(
+        [sys.executable, "-m", "benchmarks.startup_time", "--skip-lifespan", "--json"],
+        cwd=BACKEND_DIR, capture_output=True, text=True, check=True
+    )
+    timings = json.loads(result.stdout.strip().splitlines()[-1])
+    assert timings["import_s"] < IMPORT_BUDGET_S, timings
+    assert timings["first_request_s"] < FIRST_REQUEST_BUDGET_S, timings
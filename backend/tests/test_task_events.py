@@ -0,0 +1,75 @@
+import asyncio
+import json
+from contextlib import asynccontextmanager
+import pytest
+from app.core import task_events
+from app.core.task_events import TaskEventBuffer
+from app.database.sharding import ShardRouter
+
+class RecordingShard:
+    """Stands in for a shard pool, keeps each COPY's rows"""
+
+    def __init__(self) -> None:
+        self.copies = []
+        self.release = asyncio.Event()
+        self.release.set()
+
+    @asynccontextmanager
+    async def acquire(self):
+        yield self
+
+    async def copy_records_to_table(self, table, records, columns):
+        await self.release.wait()
+        self.copies.append(list(records))
+
+@pytest.fixture
+def shard(monkeypatch):
+    shard = RecordingShard()
+    monkeypatch.setattr(task_events, "shards", ShardRouter(shard, {}, vnodes=8, refresh_interval=5))
+    return shard
+
+@pytest.mark.asyncio
+async def test_full_batch_is_copied_before_the_window(shard):
+    """Test reaching the row limit flushes without waiting out the window"""
+    buffer = TaskEventBuffer(flush_ms=10_000, flush_rows=3, queue_size=100)
+    buffer.start()
+    for task_id in range(3):
+        await buffer.record(task_id, 1, "created", {"title": f"task {task_id}"})
+    for _ in range(50):
+        if shard.copies:
+            break
+        await asyncio.sleep(0.01)
+    assert [[row[0] for row in rows] for rows in shard.copies] == [[0, 1, 2]]
+    assert json.loads(shard.copies[0][0][3]) == {"title": "task 0"}
+    await buffer.stop()
+
+@pytest.mark.asyncio
+async def test_stop_flushes_pending_events(shard):
+    """Test shutdown writes what is queued and later events are not recorded"""
+    buffer = TaskEventBuffer(flush_ms=10_000, flush_rows=100, queue_size=100)
+    buffer.start()
+    await buffer.record(1, 1, "updated", {"status": "completed"})
+    await buffer.record(1, 1, "deleted")
+    await asyncio.wait_for(buffer.stop(), timeout=1)
+    assert [(row[2], row[3]) for row in shard.copies[0]] == [("updated", '{"status": "completed"}'), ("deleted", None)]
+
+    await buffer.record(2, 1, "created", {})
+    assert len(shard.copies) == 1
+
+@pytest.mark.asyncio
+async def test_full_queue_makes_writers_wait(shard):
+    """Test record() blocks while the queue is full and resumes once COPY catches up"""
+    shard.release.clear()
+    buffer = TaskEventBuffer(flush_ms=1, flush_rows=1, queue_size=1)
+    buffer.start()
+    await buffer.record(1, 1, "created")  # taken by the flusher, stuck in COPY
+    await asyncio.sleep(0.01)
+    await buffer.record(2, 1, "created")  # fills the queue
+    blocked = asyncio.ensure_future(buffer.record(3, 1, "created"))
+    await asyncio.sleep(0.05)
+    assert not blocked.done()
+
+    shard.release.set()
+    await asyncio.wait_for(blocked, timeout=1)
+    await buffer.stop()
+    assert [row[0] for rows in shard.copies for row in rows] == [1, 2, 3]
@@ -2,6 +2,9 @@ import pytest
 from httpx import AsyncClient
 from app.main import app
 from app.database.connection import database
+from app.core.cache import cache_task_page, invalidate_user_tasks_cache, stale_page_key, task_page_key
+from app.core.redis import redis_client
+from app.core.task_events import task_event_buffer
 
 @pytest.mark.asyncio
 async def test_create_task(test_user_data, test_task_data):
@@ -186,3 +189,185 @@ async def test_unauthorized_access():
     async with AsyncClient(app=app, base_url="http://test") as client:
         response = await client.get("/api/v1/tasks")
         assert response.status_code == 403  # Forbidden without token
+
+@pytest.mark.asyncio
+async def test_task_summary(test_user_data, test_task_data):
+    """Test summary counts follow creates and updates"""
+    async with AsyncClient(app=app, base_url="http://test") as client:
+        await database.connect()
+        try:
+            # Register and login
+            await client.post("/api/v1/auth/register", json=test_user_data)
+            login_response = await client.post(
+                "/api/v1/auth/login",
+                json={
+                    "username": test_user_data["username"],
+                    "password": test_user_data["password"]
+                }
+            )
+            token = login_response.json()["access_token"]
+            headers = {"Authorization": f"Bearer {token}"}
+            
+            before = (await client.get("/api/v1/tasks/summary", headers=headers)).json()
+            
+            # Create task and complete it
+            create_response = await client.post("/api/v1/tasks", json=test_task_data, headers=headers)
+            task_id = create_response.json()["id"]
+            await client.put(f"/api/v1/tasks/{task_id}", json={"status": "completed"}, headers=headers)
+            
+            response = await client.get("/api/v1/tasks/summary", headers=headers)
+            
+            assert response.status_code == 200
+            data = response.json()
+            assert data["total"] == before["total"] + 1
+            assert data["by_status"]["completed"] == before["by_status"]["completed"] + 1
+            assert data["by_status"]["pending"] == before["by_status"]["pending"]
+            assert data["last_updated_at"] is not None
+        finally:
+            await database.disconnect()
+
+@pytest.mark.asyncio
+async def test_batch_get_tasks(test_user_data, test_task_data):
+    """Test batch lookup keeps request order and marks missing ids"""
+    async with AsyncClient(app=app, base_url="http://test") as client:
+        await database.connect()
+        try:
+            # Register and login
+            await client.post("/api/v1/auth/register", json=test_user_data)
+            login_response = await client.post(
+                "/api/v1/auth/login",
+                json={
+                    "username": test_user_data["username"],
+                    "password": test_user_data["password"]
+                }
+            )
+            token = login_response.json()["access_token"]
+            headers = {"Authorization": f"Bearer {token}"}
+            
+            first = (await client.post("/api/v1/tasks", json=test_task_data, headers=headers)).json()["id"]
+            second = (await client.post("/api/v1/tasks", json=test_task_data, headers=headers)).json()["id"]
+            
+            # Second call is served from the per-task cache
+            for _ in range(2):
+                response = await client.get(f"/api/v1/tasks/batch?ids={second},999999999,{first}", headers=headers)
+                assert response.status_code == 200
+                data = response.json()
+                assert [item["id"] for item in data] == [second, 999999999, first]
+                assert [item["found"] for item in data] == [True, False, True]
+                assert data[0]["task"]["id"] == second
+            
+            response = await client.post("/api/v1/tasks/batch", json={"ids": [first]}, headers=headers)
+            assert response.json()[0]["task"]["id"] == first
+        finally:
+            await database.disconnect()
+
+@pytest.mark.asyncio
+async def test_list_tasks_sparse_fields(test_user_data, test_task_data):
+    """Test ?fields= trims each task to the requested keys"""
+    async with AsyncClient(app=app, base_url="http://test") as client:
+        await database.connect()
+        try:
+            # Register and login
+            await client.post("/api/v1/auth/register", json=test_user_data)
+            login_response = await client.post(
+                "/api/v1/auth/login",
+                json={
+                    "username": test_user_data["username"],
+                    "password": test_user_data["password"]
+                }
+            )
+            token = login_response.json()["access_token"]
+            headers = {"Authorization": f"Bearer {token}"}
+            
+            await client.post("/api/v1/tasks", json=test_task_data, headers=headers)
+            
+            # Second request is served from the per-fieldset cache entry
+            for _ in range(2):
+                response = await client.get("/api/v1/tasks?fields=title,id,status", headers=headers)
+                assert response.status_code == 200
+                assert set(response.json()[0]) == {"id", "title", "status"}
+            
+            response = await client.get("/api/v1/tasks?fields=title,hashed_password", headers=headers)
+            assert response.status_code == 422
+        finally:
+            await database.disconnect()
+
+@pytest.mark.asyncio
+async def test_update_visible_in_cached_list(test_user_data, test_task_data):
+    """Test an update rewrites the cached task instead of leaving the page stale"""
+    async with AsyncClient(app=app, base_url="http://test") as client:
+        await database.connect()
+        try:
+            # Register and login
+            await client.post("/api/v1/auth/register", json=test_user_data)
+            login_response = await client.post(
+                "/api/v1/auth/login",
+                json={
+                    "username": test_user_data["username"],
+                    "password": test_user_data["password"]
+                }
+            )
+            token = login_response.json()["access_token"]
+            headers = {"Authorization": f"Bearer {token}"}
+            
+            task_id = (await client.post("/api/v1/tasks", json=test_task_data, headers=headers)).json()["id"]
+            await client.get("/api/v1/tasks", headers=headers)
+            
+            await client.put(f"/api/v1/tasks/{task_id}", json={"title": "Renamed"}, headers=headers)
+            
+            tasks = (await client.get("/api/v1/tasks", headers=headers)).json()
+            assert next(task for task in tasks if task["id"] == task_id)["title"] == "Renamed"
+            assert (await client.get(f"/api/v1/tasks/{task_id}", headers=headers)).json()["title"] == "Renamed"
+        finally:
+            await database.disconnect()
+
+@pytest.mark.asyncio
+async def test_task_history(test_user_data, test_task_data):
+    """Test create, update and delete show up in the task's history, which outlives the task"""
+    async with AsyncClient(app=app, base_url="http://test") as client:
+        await database.connect()
+        task_event_buffer.start()
+        try:
+            await client.post("/api/v1/auth/register", json=test_user_data)
+            login_response = await client.post(
+                "/api/v1/auth/login",
+                json={
+                    "username": test_user_data["username"],
+                    "password": test_user_data["password"]
+                }
+            )
+            headers = {"Authorization": f"Bearer {login_response.json()['access_token']}"}
+
+            task_id = (await client.post("/api/v1/tasks", json=test_task_data, headers=headers)).json()["id"]
+            await client.put(f"/api/v1/tasks/{task_id}", json={"status": "completed"}, headers=headers)
+            await client.delete(f"/api/v1/tasks/{task_id}", headers=headers)
+            # Write out the buffered events
+            await task_event_buffer.stop()
+
+            response = await client.get(f"/api/v1/tasks/{task_id}/history", headers=headers)
+            assert response.status_code == 200
+            events = response.json()
+            assert [event["event"] for event in events] == ["created", "updated", "deleted"]
+            assert events[1]["changes"] == {"status": "completed"}
+            assert events[2]["changes"] is None
+
+            missing = await client.get(f"/api/v1/tasks/{task_id + 1}/history", headers=headers)
+            assert missing.status_code == 404
+
+            # Recording is off again, a task without events yet still exists
+            unrecorded_id = (await client.post("/api/v1/tasks", json=test_task_data, headers=headers)).json()["id"]
+            unrecorded = await client.get(f"/api/v1/tasks/{unrecorded_id}/history", headers=headers)
+            assert unrecorded.status_code == 200
+            assert unrecorded.json() == []
+        finally:
+            await task_event_buffer.stop()
+            await database.disconnect()
+
+@pytest.mark.asyncio
+async def test_page_invalidation_keeps_stale_copy():
+    """Test a create or delete drops the fresh page but leaves the overload fallback"""
+    cache_key = task_page_key(7, 0, 50) + ":archived"
+    await cache_task_page(cache_key, 7, [{"id": 1, "title": "kept"}])
+    await invalidate_user_tasks_cache(7)
+    assert await redis_client.get_value(cache_key) is None
+    assert await redis_client.get_value(stale_page_key(cache_key)) == [{"id": 1, "title": "kept"}]
@@ -22,6 +22,9 @@ async function initDashboard() {
     // Load tasks
     await loadTasks(0);
 
+    // Refresh when tasks change elsewhere (other tabs, devices)
+    subscribeToTaskChanges();
+
     // Add task form listener
     document.getElementById('taskForm').addEventListener('submit', async (e) => {
         e.preventDefault();
@@ -49,6 +52,65 @@ async function loadTasks(page = 0) {
     }
 }
 
+// Task change stream (Server-Sent Events over fetch, EventSource cannot send the auth header)
+let lastEventId = null;
+let refreshTimer = null;
+
+function scheduleRefresh() {
+    // Coalesce bursts of events into one reload
+    clearTimeout(refreshTimer);
+    refreshTimer = setTimeout(() => loadTasks(currentPage), 250);
+}
+
+async function subscribeToTaskChanges() {
+    while (authToken) {
+        try {
+            const headers = { 'Authorization': `Bearer ${authToken}` };
+            if (lastEventId) {
+                headers['Last-Event-ID'] = lastEventId;
+            }
+            const response = await fetch(`${API_URL}/tasks/stream`, { headers });
+            if (response.status === 401) {
+                logout();
+                return;
+            }
+            if (!response.ok) {
+                throw new Error(`Stream error: ${response.status}`);
+            }
+
+            const reader = response.body.pipeThrough(new TextDecoderStream()).getReader();
+            let buffer = '';
+            while (true) {
+                const { value, done } = await reader.read();
+                if (done) break;
+                buffer += value;
+                const messages = buffer.split('\n\n');
+                buffer = messages.pop();
+                for (const message of messages) {
+                    handleStreamMessage(message);
+                }
+            }
+        } catch (error) {
+            // Fall through and reconnect
+        }
+        await new Promise(resolve => setTimeout(resolve, 3000));
+    }
+}
+
+function handleStreamMessage(message) {
+    let eventType = 'message';
+    for (const line of message.split('\n')) {
+        if (line.startsWith('id: ')) lastEventId = line.slice(4);
+        if (line.startsWith('event: ')) eventType = line.slice(7);
+    }
+    if (eventType === 'reset') {
+        lastEventId = null;
+        scheduleRefresh();
+    } else if (eventType.startsWith('task_')) {
+        scheduleRefresh();
+    }
+}
+
 function displayTasks(tasks) {
     const tasksList = document.getElementById('tasksList');
     